@@ -1,256 +1,45 @@
 import os
 import json
-import networkx as nx
-import matplotlib.pyplot as plt
-import threading
 import re
+import webbrowser
+import sys
+import importlib.util
+from collections import OrderedDict
 
 # --- GUI ---
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox, simpledialog, filedialog
-from PIL import Image, ImageTk # Pillow library is required for image handling
-
-# --- LLM Processing ---
-import requests
-
-class LLMProcessor:
-    """Handles interaction with the Gemini LLM for data parsing and generation."""
-    def __init__(self, api_key):
-        self.api_key = api_key
-        self.api_url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={self.api_key}"
-
-    def create_parsing_prompt(self):
-        """Creates the detailed instruction prompt for parsing raw data."""
-        return """
-You are an expert data parsing assistant. Your task is to read raw text containing behavioral theory data and convert it into a structured JSON object. The JSON object must have three keys: "constructs", "triples", and "annotations".
-
-1.  **Parse "Theory triples"**:
-    * This section starts with the line "Theory triples".
-    * Each line represents a relationship: "Subject Predicate Object".
-    * Convert each line into a JSON object `{"subject": "...", "predicate": "...", "object": "..."}`.
-    * For complex relationships like "Subject influences the 'ObjectA' to 'ObjectB' Predicate relationship", the object is the entire quoted phrase. Example: `{"subject": "Situational Forces", "predicate": "influences", "object": "the 'Performance of goal-directed behaviours' to 'Goal attainment / failure' Influences relationship"}`.
-    * The output should be a JSON list under the key "triples".
-
-2.  **Parse "Theory constructs and annotations"**:
-    * This section starts with "Theory constructs and annotations".
-    * From this section, you will populate TWO JSON lists: "constructs" and "annotations".
-    * **"constructs" list**: Create a list of all unique construct names found in this section. Each item should be a JSON object `{"name": "Construct Name", "description": ""}`. The description will be empty.
-    * **"annotations" list**: Each line in the raw text represents one or more annotations for a construct. A line looks like: `ConstructName [ ID (Value) SourceNumbers , ID2 (Value2) SourceNumbers2 ]`.
-    * For each annotation block `[ ... ]`, create a separate JSON object.
-    * Each annotation object must have the keys: "construct", "relation", "value", "source".
-    * `"construct"`: The name of the construct on that line.
-    * `"relation"`: The identifier string (e.g., "BCIO:050564").
-    * `"value"`: The text inside the parentheses (e.g., "Affective attitude acquired through association").
-    * `"source"`: All the numbers following the value, joined into a single string (e.g., "1 82 69 22 5"). If there is only one number, it is the source.
-
-Example: `Desire [ MF:0000045 (Wanting) 1 , BCIO:006075 (Subjective need) 1 82 69 22 5 ]` should produce TWO annotation objects:
-- `{"construct": "Desire", "relation": "MF:0000045", "value": "Wanting", "source": "1"}`
-- `{"construct": "Desire", "relation": "BCIO:006075", "value": "Subjective need", "source": "1 82 69 22 5"}`
-
-Output ONLY the final, validated JSON object and nothing else.
-"""
-
-    def create_description_prompt(self, theory_name, constructs, triples):
-        """Creates a prompt for the LLM to generate a theory description."""
-        construct_list = "\n".join([f"- {c['name']}" for c in constructs])
-        triple_list = "\n".join([f"- {t['subject']} {t['predicate']} {t['object']}" for t in triples])
-        
-        return f"""
-You are a behavioral science expert. Based on the provided components of a theory, write a concise, academic paragraph summarizing it. The summary should explain the core idea of the theory by integrating its constructs and their relationships.
-
-**Theory Name:** {theory_name}
-**Core Constructs:**
-{construct_list}
-**Relationships (Triples):**
-{triple_list}
-
-**Generated Summary:**
-"""
-
-    def create_chat_prompt(self):
-        """Creates the system prompt for the conversational chat agent."""
-        return """
-You are a conversational AI assistant embedded in a data entry tool for behavioral theories.
-Your capabilities are:
-1.  **Answering Questions**: You can answer questions about any of the theories provided in the context.
-2.  **Modifying Data**: You can modify the data for the **currently selected theory ONLY**. The current theory is identified by its ID.
-
-**Input Format:**
-The user's prompt will be preceded by the full JSON data of all theories and the ID of the currently selected one.
-
-**Output Format:**
-You MUST respond with a single JSON object. Your response format depends on the user's request:
-
-A) **For simple conversation or questions** (e.g., "Hello", "What is Theory of Planned Behavior?", "Compare theory 1 and 2"):
-   Respond with a JSON object containing a single "response" key.
-   Example:
-   {
-     "response": "Hello! I am ready to assist you with your behavioral theories. How can I help?"
-   }
-
-B) **For modification requests** (e.g., "change the name to 'New Name'", "add a construct for 'self-efficacy'", "remove the triple about desire", "update the description"):
-   1. Perform the requested change on the JSON data of the **currently selected theory**.
-   2. Respond with a JSON object containing a single "updated_theory_data" key.
-   3. The value of this key MUST be the **complete, entire JSON object for the modified theory**, reflecting the changes. Do not just return the changed part.
-
-**Example Modification Request:**
-- User asks: "For the current theory, add a construct named 'Test Construct' with the description 'A test.'"
-- Your response should be:
-  {
-    "updated_theory_data": {
-      "id": 1,
-      "name": "Theory 1",
-      "description": "...",
-      "picture_path": "...",
-      "complete": false,
-      "constructs": [
-         ... existing constructs ...,
-        {"name": "Test Construct", "description": "A test."}
-      ],
-      "triples": [...],
-      "annotations": [...]
-    }
-  }
-
-If a request is ambiguous, ask for clarification. Do not make assumptions. Always adhere to the JSON output format.
-"""
-
-    def make_api_call(self, prompt_text):
-        """Generic method to make an API call to the LLM."""
-        payload = {"contents": [{"parts": [{"text": prompt_text}]}]}
-        headers = {'Content-Type': 'application/json'}
-        try:
-            response = requests.post(self.api_url, headers=headers, json=payload, timeout=90)
-            response.raise_for_status()
-            result_json = response.json()
-            content_text = result_json['candidates'][0]['content']['parts'][0]['text']
-            return content_text
-        except requests.exceptions.RequestException as e:
-            messagebox.showerror("Network Error", f"Failed to connect to the API: {e}")
-            return None
-        except (KeyError, IndexError) as e:
-            messagebox.showerror("API Error", f"Could not parse the API's response: {e}\n\nResponse was:\n{result_json}")
-            return None
-
-    def parse_raw_text(self, raw_text):
-        """Sends the raw text to the LLM and gets structured data back."""
-        prompt = self.create_parsing_prompt() + "\n\nHere is the raw data to parse:\n\n" + raw_text
-        content_text = self.make_api_call(prompt)
-        if content_text:
-            try:
-                cleaned_json_text = content_text.strip().replace('```json', '').replace('```', '').strip()
-                return json.loads(cleaned_json_text)
-            except json.JSONDecodeError as e:
-                messagebox.showerror("Parsing Error", f"Could not parse the LLM's JSON response: {e}\n\nResponse was:\n{content_text}")
-                return None
-        return None
-        
-    def generate_description(self, theory_name, constructs, triples):
-        """Sends theory data to LLM to generate a description."""
-        prompt = self.create_description_prompt(theory_name, constructs, triples)
-        return self.make_api_call(prompt)
-
-    def chat(self, user_message, all_theories_json, current_theory_id):
-        """Handles a conversational chat turn."""
-        prompt = (f"{self.create_chat_prompt()}\n\n"
-                  f"--- Full Data Context ---\n{all_theories_json}\n\n"
-                  f"--- Current Theory ID for Modification ---\n{current_theory_id}\n\n"
-                  f"--- User Message ---\n{user_message}")
-        content_text = self.make_api_call(prompt)
-        if content_text:
-            try:
-                cleaned_json_text = content_text.strip().replace('```json', '').replace('```', '').strip()
-                return json.loads(cleaned_json_text)
-            except json.JSONDecodeError as e:
-                messagebox.showerror("Chat Error", f"Could not parse the LLM's chat response: {e}\n\nResponse was:\n{content_text}")
-                return None
-        return None
-
-class TheoryDataManager:
-    def __init__(self, filepath="theory_data.json"):
-        self.filepath = filepath
-        self.theories = []
-        self.graph = nx.DiGraph()
-        self.load_data()
-
-    def load_data(self):
-        if os.path.exists(self.filepath):
-            with open(self.filepath, 'r', encoding='utf-8') as f:
-                self.theories = json.load(f)
-        else:
-            self.theories = [{"id": i, "name": f"Theory {i}", "description": "", "picture_path": "", "complete": False, "constructs": [], "triples": [], "annotations": []} for i in range(1, 77)]
-            self.save_data()
-
-    def save_data(self):
-        with open(self.filepath, 'w', encoding='utf-8') as f:
-            json.dump(self.theories, f, indent=4)
-
-    def get_theory(self, theory_id):
-        return self.theories[theory_id - 1]
-
-    def update_theory(self, theory_id, data):
-        self.theories[theory_id - 1] = data
-        self.save_data()
-
-    def build_graph(self):
-        self.graph = nx.DiGraph()
-        all_constructs = {}
-        for theory in self.theories:
-            for construct in theory.get('constructs', []):
-                all_constructs[construct['name']] = construct['description']
-        
-        for name, desc in all_constructs.items():
-            self.graph.add_node(name, type='construct', description=desc)
+from PIL import ImageTk # Pillow library is required for image handling
 
-        for theory in self.theories:
-            if not theory.get('complete'): continue
-            theory_name = theory['name']
-            self.graph.add_node(theory_name, type='theory', description=theory.get('description', ''))
-            
-            for construct in theory.get('constructs', []): self.graph.add_edge(theory_name, construct['name'], label='has_construct')
-            for triple in theory.get('triples', []):
-                subj, pred, obj = triple['subject'], triple['predicate'], triple['object']
-                if not self.graph.has_node(subj): self.graph.add_node(subj, type='construct')
-                if not self.graph.has_node(obj): self.graph.add_node(obj, type='construct')
-                self.graph.add_edge(subj, obj, label=pred)
-            for annotation in theory.get('annotations', []):
-                node_name = annotation['construct']
-                if self.graph.has_node(node_name):
-                    if 'annotations' not in self.graph.nodes[node_name]:
-                        self.graph.nodes[node_name]['annotations'] = []
-                    self.graph.nodes[node_name]['annotations'].append(f"{annotation['relation']}: {annotation['value']} (Source: {annotation['source']})")
-
-    def visualize_graph(self):
-        if self.graph.number_of_nodes() == 0:
-            messagebox.showwarning("Graph Empty", "No completed theories to visualize.")
-            return
-        
-        messagebox.showinfo("Visualize Graph", "The graph will be generated in a new window.")
-        plt.figure(figsize=(40, 40))
-        try:
-            from networkx.drawing.nx_pydot import graphviz_layout
-            pos = graphviz_layout(self.graph, prog='neato')
-        except ImportError:
-            pos = nx.spring_layout(self.graph, k=0.15, iterations=20)
-        
-        node_colors = ['red' if n[1]['type'] == 'theory' else 'skyblue' for n in self.graph.nodes(data=True)]
-        nx.draw(self.graph, pos, with_labels=True, node_color=node_colors, node_size=2000, font_size=8, arrows=True)
-        edge_labels = nx.get_edge_attributes(self.graph, 'label')
-        nx.draw_networkx_edge_labels(self.graph, pos, edge_labels=edge_labels, font_size=7, font_color='green')
-        
-        plt.title("Behavioral Theory Relational Graph", size=40)
-        if not os.path.exists("output"): os.makedirs("output")
-        plt.savefig("output/behavioral_theory_relational_graph.png", bbox_inches='tight', dpi=300)
-        plt.show()
+# --- Storage, graph and LLM processing (headless, see the theory_core package) ---
+from theory_core import (TheoryDataManager, SQLiteTheoryDataManager, IndexedTheoryDataManager, LLMProcessor, RawTheoryParser, LLMResponseCache, ThumbnailCache, ChatContextBuilder,
+                         GraphRenderer, CypherExporter, TableExporter, GraphEmptyError, TheoryToolError, TheoryPatch, PatchError, TheoryValidator, JobScheduler, build_parser, run_command, metrics)
 
 class TheoryDataEntryGUI:
+    TRACE_LOG = "theory_tool_trace.log"
+    PUMP_MS = 50
+    PHOTO_CACHE_SIZE = 32  # Decoded thumbnails kept as PhotoImages; the least recently shown is dropped first.
+    PREFETCH_NEIGHBOURS = 2  # Theories above and below the selection whose pictures are decoded ahead.
+    DEFAULT_IMAGE_BOX = (400, 300)
+    SEVERITY_COLOURS = {"error": "#b00020", "warning": "#9a5b00"}
+
     def __init__(self, root):
         self.root = root
         self.root.title("Behavioral Theory Data Entry Tool")
         self.root.geometry("1400x900")
-        self.data_manager = TheoryDataManager()
+        self.data_manager = self.create_data_manager()
+        self.graph_renderer = GraphRenderer()
+        self.response_cache = LLMResponseCache()
+        self.use_response_cache = self._read_config().get("use_response_cache", True)
+        if self._read_config().get("metrics_enabled"): metrics.enable(self.TRACE_LOG)
+        # Background work goes through one bounded scheduler; its results reach Tk only via pump_jobs.
+        self.jobs = JobScheduler(max_workers=self._read_config().get("background_workers", 3))
+        self.job_list_version = None
+        self.chat_job = None
         self.current_theory_id = None
         self.current_image_path = ""
+        self.thumbnails = ThumbnailCache()
+        self.photos = OrderedDict()  # (picture signature, box) -> PhotoImage
         
         self.main_pane = ttk.PanedWindow(root, orient=tk.HORIZONTAL)
         self.main_pane.pack(fill=tk.BOTH, expand=True)
@@ -259,6 +48,33 @@ class TheoryDataEntryGUI:
         self.main_pane.add(self.left_frame, weight=1)
         
         ttk.Button(self.left_frame, text="Show Incomplete Theories", command=self.show_incomplete_theories).pack(pady=(10,0), padx=10, fill=tk.X)
+        ttk.Button(self.left_frame, text="Validate All Theories", command=self.show_validation_report).pack(pady=(5,0), padx=10, fill=tk.X)
+
+        search_frame = ttk.Frame(self.left_frame)
+        search_frame.pack(fill=tk.X, padx=5, pady=(10, 0))
+        ttk.Label(search_frame, text="Search:").pack(side=tk.LEFT)
+        self.search_var = tk.StringVar()
+        search_entry = ttk.Entry(search_frame, textvariable=self.search_var)
+        search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(5, 0))
+        search_entry.bind('<KeyRelease>', self.schedule_search)
+        self.search_job = None
+        self.search_hits = []
+        self.search_results = ttk.Treeview(self.left_frame, columns=('where',), height=8, selectmode='browse')
+        self.search_results.heading('#0', text='Match')
+        self.search_results.heading('where', text='Theory / Row')
+        self.search_results.column('where', width=110)
+        self.search_results.bind('<<TreeviewSelect>>', self.go_to_search_hit)
+
+        jobs_frame = ttk.LabelFrame(self.left_frame, text="Background Jobs")
+        jobs_frame.pack(side=tk.BOTTOM, fill=tk.X, padx=5, pady=5)
+        self.job_list = ttk.Treeview(jobs_frame, columns=('state', 'time'), height=4, selectmode='browse')
+        self.job_list.heading('#0', text='Job')
+        self.job_list.heading('state', text='State')
+        self.job_list.heading('time', text='Time')
+        self.job_list.column('state', width=80, anchor='center')
+        self.job_list.column('time', width=50, anchor='e')
+        self.job_list.pack(fill=tk.X, padx=5, pady=(5, 0))
+        ttk.Button(jobs_frame, text="Cancel Selected Job", command=self.cancel_selected_job).pack(pady=5)
 
         self.tree = ttk.Treeview(self.left_frame, columns=('status',))
         self.tree.heading('#0', text='Theory')
@@ -273,6 +89,53 @@ class TheoryDataEntryGUI:
         
         self.setup_right_pane()
         self.set_entry_state('disabled')
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.root.after(self.PUMP_MS, self.pump_jobs)
+
+    def create_data_manager(self):
+        """Uses the SQLite store when config.json sets "storage": "sqlite", the indexed (lazily loaded)
+        JSON file for "storage": "lazy", and the fully loaded JSON file otherwise."""
+        storage = self._read_config().get("storage")
+        if storage == "sqlite": return SQLiteTheoryDataManager()
+        if storage == "lazy": return IndexedTheoryDataManager()
+        return TheoryDataManager()
+
+    def _read_config(self):
+        if not os.path.exists("config.json"): return {}
+        with open("config.json", 'r') as f: return json.load(f)
+
+    def pump_jobs(self):
+        """The one place background results enter Tk: runs queued callbacks and refreshes the job list."""
+        try:
+            self.jobs.drain()
+            running = any(job['state'] == 'running' for job in self.jobs.snapshot())
+            if self.jobs.version != self.job_list_version or running: self.refresh_job_list()
+        finally:
+            self.root.after(self.PUMP_MS, self.pump_jobs)
+
+    def refresh_job_list(self):
+        self.job_list_version = self.jobs.version
+        selected = self.job_list.selection()
+        self.job_list.delete(*self.job_list.get_children())
+        for job in reversed(self.jobs.snapshot()):
+            state = job['detail'] if job['detail'] == 'cancelling' else job['state']
+            self.job_list.insert('', tk.END, iid=str(job['id']), text=job['label'], values=(state, f"{job['elapsed']:.1f}s"))
+        if selected and self.job_list.exists(selected[0]): self.job_list.selection_set(selected[0])
+
+    def cancel_selected_job(self):
+        selected = self.job_list.selection()
+        job = self.jobs.jobs.get(int(selected[0])) if selected else None
+        if job is not None: self.jobs.cancel(job)
+
+    def show_job_error(self, error):
+        messagebox.showerror("Background Job Failed", str(error))
+
+    def on_close(self):
+        self.jobs.shutdown()
+        metrics.stop_serving()
+        self.data_manager.compact()
+        self.graph_renderer.shutdown()
+        self.root.destroy()
 
     def setup_right_pane(self):
         top_controls_frame = ttk.Frame(self.right_frame)
@@ -280,7 +143,11 @@ class TheoryDataEntryGUI:
         
         ttk.Button(top_controls_frame, text="Save Changes for This Theory", command=self.save_current_theory).pack(side=tk.LEFT)
         ttk.Button(top_controls_frame, text="Export to Cypher", command=self.export_theory_to_cypher).pack(side=tk.LEFT, padx=5)
+        ttk.Button(top_controls_frame, text="Export All to Cypher", command=self.export_corpus_to_cypher).pack(side=tk.LEFT)
+        ttk.Button(top_controls_frame, text="Export Tables", command=self.export_corpus_tables).pack(side=tk.LEFT, padx=5)
         ttk.Button(top_controls_frame, text="Build & Visualize Final Graph", command=self.build_and_visualize).pack(side=tk.RIGHT)
+        ttk.Button(top_controls_frame, text="Visualize Neighbourhood", command=self.visualize_neighbourhood).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(top_controls_frame, text="Visualize This Theory", command=self.visualize_current_theory).pack(side=tk.RIGHT)
         
         self.notebook = ttk.Notebook(self.right_frame)
         self.notebook.pack(pady=10, padx=10, fill=tk.BOTH, expand=True)
@@ -289,8 +156,10 @@ class TheoryDataEntryGUI:
         self.setup_constructs_tab()
         self.setup_triples_tab()
         self.setup_annotations_tab()
+        self.setup_influence_tab()
         self.setup_llm_entry_tab()
         self.setup_settings_tab()
+        self.setup_diagnostics_tab()
 
     def setup_general_tab(self):
         tab = ttk.Frame(self.notebook)
@@ -308,6 +177,9 @@ class TheoryDataEntryGUI:
         ttk.Label(text_frame, text="Theory Name:").pack(anchor='w', padx=5, pady=(5,0))
         self.theory_name_var = tk.StringVar()
         ttk.Entry(text_frame, textvariable=self.theory_name_var).pack(fill=tk.X, padx=5)
+        self.validation_var = tk.StringVar()
+        self.validation_label = ttk.Label(text_frame, textvariable=self.validation_var, wraplength=500)
+        self.validation_label.pack(anchor='w', padx=5, pady=(5,0))
 
         ttk.Label(text_frame, text="Theory Description:").pack(anchor='w', padx=5, pady=(5,0))
         self.theory_desc_text = scrolledtext.ScrolledText(text_frame, wrap=tk.WORD, height=5)
@@ -336,6 +208,7 @@ class TheoryDataEntryGUI:
         self.chat_entry.pack(fill=tk.X, expand=True, side=tk.LEFT)
         self.chat_entry.bind("<Return>", self.send_chat_message)
         
+        ttk.Button(chat_input_frame, text="Stop", command=self.stop_chat).pack(side=tk.RIGHT)
         self.send_button = ttk.Button(chat_input_frame, text="Send", command=self.send_chat_message)
         self.send_button.pack(side=tk.RIGHT, padx=5)
         
@@ -345,16 +218,16 @@ class TheoryDataEntryGUI:
     def setup_llm_entry_tab(self):
         tab = ttk.Frame(self.notebook)
         self.notebook.add(tab, text='LLM Bulk Entry')
-        llm_frame = ttk.LabelFrame(tab, text="Parse Raw Data with LLM")
+        llm_frame = ttk.LabelFrame(tab, text="Parse Raw Data (unreadable lines go to the LLM)")
         llm_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         controls = ttk.Frame(llm_frame)
         controls.pack(fill=tk.X, pady=5)
         ttk.Label(controls, text="Target Theory:").pack(side=tk.LEFT)
         self.llm_target_theory_var = tk.StringVar()
-        theory_names = [t['name'] for t in self.data_manager.theories]
+        theory_names = [name for _, name, _ in self.data_manager.theory_summaries()]
         self.llm_target_theory_combo = ttk.Combobox(controls, textvariable=self.llm_target_theory_var, values=theory_names, state='readonly')
         self.llm_target_theory_combo.pack(side=tk.LEFT, padx=5)
-        ttk.Button(controls, text="Process Data with LLM", command=self.process_with_llm).pack(side=tk.RIGHT)
+        ttk.Button(controls, text="Process Data", command=self.process_with_llm).pack(side=tk.RIGHT)
         self.llm_input_text = scrolledtext.ScrolledText(llm_frame, wrap=tk.WORD)
         self.llm_input_text.pack(fill=tk.BOTH, expand=True, pady=5)
 
@@ -369,6 +242,104 @@ class TheoryDataEntryGUI:
         ttk.Button(settings_frame, text="Save Key", command=self.save_api_key).pack(side=tk.LEFT, padx=5)
         self.load_api_key()
 
+        cache_frame = ttk.LabelFrame(tab, text="LLM Response Cache")
+        cache_frame.pack(fill=tk.X, padx=10, pady=10)
+        self.use_cache_var = tk.BooleanVar(value=self.use_response_cache)
+        ttk.Checkbutton(cache_frame, text="Reuse cached responses for identical requests", variable=self.use_cache_var, command=self.toggle_response_cache).pack(side=tk.LEFT, padx=5)
+        ttk.Button(cache_frame, text="Clear Cache", command=self.clear_response_cache).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(cache_frame, text="Refresh", command=self.refresh_cache_stats).pack(side=tk.RIGHT)
+        self.cache_stats_var = tk.StringVar()
+        ttk.Label(cache_frame, textvariable=self.cache_stats_var).pack(side=tk.RIGHT, padx=10)
+        self.refresh_cache_stats()
+
+    def setup_diagnostics_tab(self):
+        tab = ttk.Frame(self.notebook)
+        self.notebook.add(tab, text='Diagnostics')
+        controls = ttk.Frame(tab)
+        controls.pack(fill=tk.X, padx=10, pady=10)
+        self.metrics_enabled_var = tk.BooleanVar(value=metrics.enabled)
+        ttk.Checkbutton(controls, text=f"Record timings (log: {self.TRACE_LOG})", variable=self.metrics_enabled_var, command=self.toggle_metrics).pack(side=tk.LEFT)
+        ttk.Label(controls, text="Metrics port:").pack(side=tk.LEFT, padx=(15, 0))
+        self.metrics_port_var = tk.StringVar(value=str(self._read_config().get("metrics_port", "")))
+        ttk.Entry(controls, textvariable=self.metrics_port_var, width=7).pack(side=tk.LEFT, padx=5)
+        ttk.Button(controls, text="Serve", command=self.serve_metrics).pack(side=tk.LEFT)
+        ttk.Button(controls, text="Reset", command=self.reset_metrics).pack(side=tk.RIGHT)
+        ttk.Button(controls, text="Refresh", command=self.refresh_diagnostics).pack(side=tk.RIGHT, padx=5)
+        self.metrics_table = ttk.Treeview(tab, columns=('count', 'mean', 'max', 'total'), height=14)
+        self.metrics_table.heading('#0', text='Metric')
+        for column, heading in (('count', 'Count'), ('mean', 'Mean'), ('max', 'Max'), ('total', 'Total')):
+            self.metrics_table.heading(column, text=heading)
+            self.metrics_table.column(column, width=90, anchor='e')
+        self.metrics_table.pack(fill=tk.BOTH, expand=True, padx=10)
+        ttk.Label(tab, text="Recent spans:").pack(anchor='w', padx=10, pady=(10, 0))
+        self.recent_spans_text = scrolledtext.ScrolledText(tab, height=10, wrap=tk.NONE, state='disabled', font=("Courier", 9))
+        self.recent_spans_text.pack(fill=tk.BOTH, expand=True, padx=10, pady=(0, 10))
+        self.notebook.bind('<<NotebookTabChanged>>', lambda e: self.notebook.select() == str(tab) and self.refresh_diagnostics(), add='+')
+        if self.metrics_port_var.get().isdigit(): self.serve_metrics(quiet=True)
+
+    def toggle_metrics(self):
+        if self.metrics_enabled_var.get(): metrics.enable(self.TRACE_LOG)
+        else: metrics.disable()
+        config = self._read_config()
+        config["metrics_enabled"] = metrics.enabled
+        with open("config.json", 'w') as f: json.dump(config, f)
+
+    def serve_metrics(self, quiet=False):
+        port = self.metrics_port_var.get().strip()
+        if not port.isdigit(): messagebox.showerror("Error", "Enter a port number."); return
+        try: bound = metrics.serve(int(port))
+        except OSError as e: messagebox.showerror("Error", f"Could not serve metrics on port {port}: {e}"); return
+        config = self._read_config()
+        config["metrics_port"] = bound
+        with open("config.json", 'w') as f: json.dump(config, f)
+        if not quiet: messagebox.showinfo("Metrics", f"Serving http://127.0.0.1:{bound}/metrics and /metrics.json")
+
+    def reset_metrics(self):
+        metrics.reset()
+        self.refresh_diagnostics()
+
+    def refresh_diagnostics(self):
+        snapshot = metrics.snapshot()
+        self.metrics_table.delete(*self.metrics_table.get_children())
+        for summary in snapshot["summaries"]:
+            labels = ", ".join(f"{k}={v}" for k, v in summary["labels"].items())
+            name = summary["name"] + (f" ({labels})" if labels else "")
+            if summary["name"].endswith("_seconds"):
+                values = (summary["count"], f"{summary['mean'] * 1000:.1f} ms", f"{summary['max'] * 1000:.1f} ms", f"{summary['sum']:.2f} s")
+            else:
+                values = (summary["count"], f"{summary['mean']:,.1f}", f"{summary['max']:,.0f}", f"{summary['sum']:,.0f}")
+            self.metrics_table.insert('', tk.END, text=name, values=values)
+        for counter in snapshot["counters"]:
+            labels = ", ".join(f"{k}={v}" for k, v in counter["labels"].items())
+            self.metrics_table.insert('', tk.END, text=counter["name"] + (f" ({labels})" if labels else ""), values=(counter["value"], "", "", ""))
+        self.recent_spans_text.config(state='normal')
+        self.recent_spans_text.delete(1.0, tk.END)
+        if not snapshot["enabled"]: self.recent_spans_text.insert(tk.END, "Recording is off.\n")
+        for record in reversed(snapshot["recent"]): self.recent_spans_text.insert(tk.END, json.dumps(record, default=str) + "\n")
+        self.recent_spans_text.config(state='disabled')
+
+    def toggle_response_cache(self):
+        self.use_response_cache = self.use_cache_var.get()
+        config = self._read_config()
+        config["use_response_cache"] = self.use_response_cache
+        with open("config.json", 'w') as f: json.dump(config, f)
+
+    def clear_response_cache(self):
+        if messagebox.askyesno("Confirm", "Delete all cached LLM responses?"):
+            self.response_cache.clear()
+            self.refresh_cache_stats()
+
+    def refresh_cache_stats(self):
+        stats = self.response_cache.stats()
+        self.cache_stats_var.set(f"{stats['entries']} entries, {stats['bytes'] / 1e6:.1f} MB; this session: {stats['hits']} hits, {stats['misses']} misses, {stats['evictions']} evicted")
+
+    def new_llm_processor(self, api_key):
+        """Safe to call from worker threads: reads only plain attributes, not Tk variables."""
+        return LLMProcessor(api_key, error_handler=self.show_error_later, cache=self.response_cache if self.use_response_cache else None)
+
+    def show_error_later(self, title, message):
+        self.jobs.call_soon(messagebox.showerror, title, message)
+
     def setup_constructs_tab(self):
         tab = ttk.Frame(self.notebook)
         self.notebook.add(tab, text='2. Constructs')
@@ -377,10 +348,8 @@ class TheoryDataEntryGUI:
         ttk.Button(controls, text="Add Construct", command=self.add_construct).pack(side=tk.LEFT)
         ttk.Button(controls, text="Edit Selected", command=self.edit_construct).pack(side=tk.LEFT, padx=5)
         ttk.Button(controls, text="Remove Selected", command=self.remove_construct).pack(side=tk.LEFT)
-        self.constructs_tree = ttk.Treeview(tab, columns=('name', 'desc'), show='headings')
-        self.constructs_tree.heading('name', text='Construct Name')
-        self.constructs_tree.heading('desc', text='Description')
-        self.constructs_tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.constructs_table = VirtualTable(tab, [('name', 'Construct Name'), ('description', 'Description')])
+        self.constructs_table.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
 
     def setup_triples_tab(self):
         tab = ttk.Frame(self.notebook)
@@ -389,11 +358,8 @@ class TheoryDataEntryGUI:
         controls.pack(fill=tk.X, padx=5, pady=5)
         ttk.Button(controls, text="Add Triple", command=self.add_triple).pack(side=tk.LEFT)
         ttk.Button(controls, text="Remove Selected", command=self.remove_triple).pack(side=tk.LEFT, padx=5)
-        self.triples_tree = ttk.Treeview(tab, columns=('subject', 'predicate', 'object'), show='headings')
-        self.triples_tree.heading('subject', text='Subject')
-        self.triples_tree.heading('predicate', text='Predicate')
-        self.triples_tree.heading('object', text='Object')
-        self.triples_tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.triples_table = VirtualTable(tab, [('subject', 'Subject'), ('predicate', 'Predicate'), ('object', 'Object')])
+        self.triples_table.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
 
     def setup_annotations_tab(self):
         tab = ttk.Frame(self.notebook)
@@ -402,24 +368,118 @@ class TheoryDataEntryGUI:
         controls.pack(fill=tk.X, padx=5, pady=5)
         ttk.Button(controls, text="Add Annotation", command=self.add_annotation).pack(side=tk.LEFT)
         ttk.Button(controls, text="Remove Selected", command=self.remove_annotation).pack(side=tk.LEFT, padx=5)
-        self.annotations_tree = ttk.Treeview(tab, columns=('construct', 'relation', 'value', 'source'), show='headings')
-        self.annotations_tree.heading('construct', text='Construct')
-        self.annotations_tree.heading('relation', text='Relation')
-        self.annotations_tree.heading('value', text='Value')
-        self.annotations_tree.heading('source', text='Source')
-        self.annotations_tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.annotations_table = VirtualTable(tab, [('construct', 'Construct'), ('relation', 'Relation'), ('value', 'Value'), ('source', 'Source')])
+        self.annotations_table.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
     
+    def setup_influence_tab(self):
+        tab = ttk.Frame(self.notebook)
+        self.notebook.add(tab, text='Influence')
+        controls = ttk.Frame(tab)
+        controls.pack(fill=tk.X, padx=5, pady=5)
+        ttk.Label(controls, text="Construct:").pack(side=tk.LEFT)
+        self.influence_node_var, self.influence_target_var = tk.StringVar(), tk.StringVar()
+        node_combo = ttk.Combobox(controls, textvariable=self.influence_node_var, width=35)
+        node_combo.configure(postcommand=lambda: node_combo.configure(values=self.influence_index().nodes()))
+        node_combo.pack(side=tk.LEFT, padx=5)
+        ttk.Label(controls, text="Target:").pack(side=tk.LEFT)
+        target_combo = ttk.Combobox(controls, textvariable=self.influence_target_var, width=35)
+        target_combo.configure(postcommand=lambda: target_combo.configure(values=self.influence_index().nodes()))
+        target_combo.pack(side=tk.LEFT, padx=5)
+        ttk.Label(controls, text="Paths:").pack(side=tk.LEFT)
+        self.influence_k_var = tk.IntVar(value=5)
+        ttk.Spinbox(controls, from_=1, to=50, textvariable=self.influence_k_var, width=4).pack(side=tk.LEFT, padx=5)
+        buttons = ttk.Frame(tab)
+        buttons.pack(fill=tk.X, padx=5)
+        ttk.Button(buttons, text="Upstream", command=lambda: self.show_influence('ancestors')).pack(side=tk.LEFT)
+        ttk.Button(buttons, text="Downstream", command=lambda: self.show_influence('descendants')).pack(side=tk.LEFT, padx=5)
+        ttk.Button(buttons, text="Influence Paths", command=self.show_influence_paths).pack(side=tk.LEFT)
+        ttk.Button(buttons, text="Feedback Loops", command=self.show_feedback_loops).pack(side=tk.LEFT, padx=5)
+        simulation = ttk.LabelFrame(tab, text="Simulation")
+        simulation.pack(fill=tk.X, padx=5, pady=5)
+        ttk.Label(simulation, text="Intervention strength:").pack(side=tk.LEFT, padx=5)
+        self.simulation_value_var = tk.DoubleVar(value=1.0)
+        ttk.Spinbox(simulation, from_=-1.0, to=1.0, increment=0.1, textvariable=self.simulation_value_var, width=5).pack(side=tk.LEFT)
+        self.simulation_theory_only_var = tk.BooleanVar()
+        ttk.Checkbutton(simulation, text="Current theory only", variable=self.simulation_theory_only_var).pack(side=tk.LEFT, padx=10)
+        ttk.Button(simulation, text="Simulate Intervention", command=self.simulate_intervention).pack(side=tk.LEFT)
+        ttk.Button(simulation, text="What-if Sweep", command=self.run_what_if_sweep).pack(side=tk.LEFT, padx=5)
+        self.influence_text = scrolledtext.ScrolledText(tab, wrap=tk.WORD, state='disabled')
+        self.influence_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+
+    def influence_index(self):
+        return self.data_manager.build_influence_index()
+
+    def _influence_node(self, var):
+        node = var.get().strip()
+        if node not in self.influence_index().graph: messagebox.showerror("Error", f"'{node}' has no influence edges in the graph."); return None
+        return node
+
+    def _show_influence_text(self, text):
+        self.influence_text.config(state='normal')
+        self.influence_text.delete('1.0', tk.END)
+        self.influence_text.insert(tk.END, text)
+        self.influence_text.config(state='disabled')
+
+    def show_influence(self, direction):
+        node = self._influence_node(self.influence_node_var)
+        if node is None: return
+        related = getattr(self.influence_index(), direction)(node)
+        heading = "Upstream of" if direction == 'ancestors' else "Downstream of"
+        self._show_influence_text(f"{heading} {node} ({len(related)}):\n" + "\n".join(related))
+
+    def show_influence_paths(self):
+        source, target = self._influence_node(self.influence_node_var), self._influence_node(self.influence_target_var)
+        if source is None or target is None: return
+        index = self.influence_index()
+        paths = index.influence_paths(source, target, self.influence_k_var.get())
+        if not paths: self._show_influence_text(f"{source} does not influence {target}."); return
+        self._show_influence_text("\n\n".join(index.describe_path(path) for path in paths))
+
+    def show_feedback_loops(self):
+        node = self.influence_node_var.get().strip() or None
+        loops = self.influence_index().feedback_loops(node)
+        if not loops: self._show_influence_text("No feedback loops found."); return
+        self._show_influence_text("\n\n".join(f"Loop of {len(loop)}: {', '.join(loop)}" for loop in loops))
+
+    def _simulation_scope(self):
+        return self.current_theory_id if self.simulation_theory_only_var.get() else None
+
+    def simulate_intervention(self):
+        node = self.influence_node_var.get().strip()
+        try:
+            simulator = self.data_manager.build_simulator(self._simulation_scope())
+            ranked = simulator.simulate({node: self.simulation_value_var.get()}, k=25)
+        except (TheoryToolError, tk.TclError) as e: messagebox.showerror("Simulation Error", str(e)); return
+        lines = [f"{activation:+.3f}  {construct}" for construct, activation in ranked]
+        self._show_influence_text(f"Setting {node} to {self.simulation_value_var.get():+.2f} moves:\n" + ("\n".join(lines) or "nothing."))
+
+    def run_what_if_sweep(self):
+        try: value = self.simulation_value_var.get()
+        except tk.TclError: messagebox.showerror("Simulation Error", "Intervention strength must be a number."); return
+        # Compile on the Tk thread (it reads the graph), then sweep the matrix in the background.
+        try:
+            scope = self._simulation_scope()
+            simulator = self.data_manager.build_simulator(scope)
+        except (TheoryToolError, tk.TclError) as e: messagebox.showerror("Simulation Error", str(e)); return
+        self._show_influence_text(f"Sweeping {len(simulator.nodes)} interventions...")
+        self.jobs.submit("What-if sweep", self._sweep_worker, simulator, value, key=("sweep", scope, value),
+                         on_done=self._show_influence_text, on_error=self.show_job_error)
+
+    def _sweep_worker(self, job, simulator, value):
+        results = simulator.sweep(value, k=3)
+        lines = [f"{r['total_effect']:8.2f}  {r['intervention']}  ->  " + ", ".join(f"{n} {a:+.2f}" for n, a in r['top']) for r in results[:100]]
+        return "Interventions ranked by total effect:\n" + "\n".join(lines)
+
     def save_api_key(self):
         api_key = self.api_key_var.get()
         if not api_key: messagebox.showwarning("Warning", "API Key field is empty."); return
-        with open("config.json", 'w') as f: json.dump({"api_key": api_key}, f)
+        config = self._read_config()
+        config["api_key"] = api_key
+        with open("config.json", 'w') as f: json.dump(config, f)
         messagebox.showinfo("Success", "API Key saved.")
 
     def load_api_key(self):
-        if os.path.exists("config.json"):
-            with open("config.json", 'r') as f:
-                config = json.load(f)
-                self.api_key_var.set(config.get("api_key", ""))
+        self.api_key_var.set(self._read_config().get("api_key", ""))
 
     def send_chat_message(self, event=None):
         user_message = self.chat_entry.get()
@@ -427,26 +487,150 @@ class TheoryDataEntryGUI:
         if self.current_theory_id is None: messagebox.showerror("Error", "Please select a theory before starting a chat."); return
         api_key = self.api_key_var.get()
         if not api_key: messagebox.showerror("Error", "API Key is missing. Please set it in the Settings tab."); return
+        key = ("chat", self.current_theory_id, user_message)
+        if self.jobs.in_flight(key): return  # The same message is already being answered.
         self._add_text_to_chat(f"You: {user_message}\n")
         self.chat_entry.delete(0, tk.END)
-        all_theories_json = json.dumps(self.data_manager.theories, indent=2)
-        threading.Thread(target=self._chat_worker, args=(api_key, user_message, all_theories_json, self.current_theory_id), daemon=True).start()
+        token_budget = self._read_config().get("chat_context_tokens", ChatContextBuilder.DEFAULT_TOKEN_BUDGET)
+        context_json, stats = ChatContextBuilder(self.data_manager, token_budget).build(self.current_theory_id, user_message)
+        prompt_tokens = ChatContextBuilder.estimate_tokens(LLMProcessor(api_key).create_chat_turn_prompt(user_message, context_json, self.current_theory_id))
+        self._add_text_to_chat(f"[Context: {stats['full']} full + {stats['abbreviated']} abbreviated theories, {stats['dropped']} over budget; "
+                               f"~{stats['context_tokens']:,} context / ~{prompt_tokens:,} prompt tokens]\n")
+        self.chat_history.mark_set("stream_start", "end-1c")
+        self.chat_history.mark_gravity("stream_start", tk.LEFT)
+        if self.chat_job: self.jobs.cancel(self.chat_job)  # A new message supersedes any reply still streaming.
+        theory_id = self.current_theory_id
+        self.chat_job = self.jobs.submit("Chat reply", self._chat_worker, api_key, user_message, context_json, theory_id,
+                                         self.data_manager.get_theory(theory_id), key=key, priority=JobScheduler.CHAT,
+                                         on_done=lambda response: self._handle_chat_response(response, theory_id), on_error=self.show_job_error)
+
+    def stop_chat(self):
+        if self.chat_job: self.jobs.cancel(self.chat_job)
+        self._clear_chat_stream()
+
+    def _chat_worker(self, job, api_key, user_message, context_json, current_theory_id, theory):
+        processor = self.new_llm_processor(api_key)
+        on_text = lambda text: self.jobs.call_soon(self._show_chat_stream, text, job)
+        return processor.chat(user_message, context_json, current_theory_id, on_text, job.cancel_event, theory)
+
+    @staticmethod
+    def _chat_stream_preview(partial):
+        """Best-effort readable view of a partially received chat JSON reply."""
+        if '"updated_theory_data"' in partial or '"patch"' in partial: return f"(editing the theory... {len(partial):,} characters received)"
+        match = re.search(r'"response"\s*:\s*"', partial)
+        if not match: return "..."
+        escapes = {'n': '\n', 't': '\t', 'r': '', 'b': '', 'f': ''}
+        body, out, i = partial[match.end():], [], 0
+        while i < len(body):
+            ch = body[i]
+            if ch == '"': break
+            if ch == '\\':
+                if i + 1 >= len(body) or (body[i + 1] == 'u' and i + 6 > len(body)): break
+                if body[i + 1] == 'u':
+                    out.append(chr(int(body[i + 2:i + 6], 16)))
+                    i += 6
+                    continue
+                out.append(escapes.get(body[i + 1], body[i + 1]))
+                i += 2
+                continue
+            out.append(ch)
+            i += 1
+        return "".join(out)
+
+    def _show_chat_stream(self, text, job):
+        if job is not self.chat_job or job.cancelled: return
+        self.chat_history.config(state='normal')
+        self.chat_history.delete("stream_start", "end-1c")
+        self.chat_history.insert("end-1c", f"AI: {self._chat_stream_preview(text)}")
+        self.chat_history.config(state='disabled')
+        self.chat_history.see(tk.END)
 
-    def _chat_worker(self, api_key, user_message, all_theories_json, current_theory_id):
-        processor = LLMProcessor(api_key)
-        response = processor.chat(user_message, all_theories_json, current_theory_id)
-        if response: self.root.after(0, self._handle_chat_response, response)
+    def _clear_chat_stream(self):
+        self.chat_history.config(state='normal')
+        self.chat_history.delete("stream_start", "end-1c")
+        self.chat_history.config(state='disabled')
 
-    def _handle_chat_response(self, response):
+    def _handle_chat_response(self, response, theory_id):
+        self._clear_chat_stream()
+        if not response: return  # The failure was already reported.
         if "response" in response: self._add_text_to_chat(f"AI: {response['response']}\n\n")
+        elif "patch" in response: self.apply_chat_patch(response, theory_id)
         elif "updated_theory_data" in response:
             updated_data = response['updated_theory_data']
+            errors = self.llm_data_errors(updated_data, theory_id)
+            if errors:
+                self._add_text_to_chat(f"AI: The updated theory does not fit the data format, so nothing was changed ({'; '.join(errors[:3])}).\n\n")
+                return
             self._add_text_to_chat("AI: I have updated the theory data as requested. Please review the changes in the tabs and click 'Save Changes for This Theory' to persist them.\n\n")
-            self.data_manager.theories[updated_data['id'] - 1] = updated_data
+            self.data_manager.stage_theory(updated_data)
             self.tree.selection_set(str(updated_data['id']))
             self.on_theory_select()
         else: self._add_text_to_chat("AI: I received an unexpected response format. Please try again.\n\n")
 
+    def apply_chat_patch(self, response, theory_id):
+        """Stages a patch edit and replays its row changes on the visible tables, highlighting them."""
+        try: updated, changes = TheoryPatch(response['patch']).apply(self.data_manager.get_theory(theory_id))
+        except PatchError as e:
+            self._add_text_to_chat(f"AI: The edit no longer fits the theory, so nothing was changed ({e}).\n\n")
+            return
+        errors = self.llm_data_errors(updated, theory_id)
+        if errors:
+            self._add_text_to_chat(f"AI: The edit would leave the theory in an invalid format, so nothing was changed ({'; '.join(errors[:3])}).\n\n")
+            return
+        self.data_manager.stage_theory(updated)
+        tables = {"constructs": self.constructs_table, "triples": self.triples_table, "annotations": self.annotations_table}
+        touched = {change[1] for change in changes if change[0] != "field"}
+        if theory_id != self.current_theory_id or any(tables[section].has_changes() for section in touched):
+            # Row indices only line up with the staged theory, so views holding other rows are reloaded instead.
+            self.tree.selection_set(str(theory_id))
+            self.on_theory_select()
+        else:
+            for change in changes: self._replay_change(change, tables)
+            self.show_validation(theory_id)
+        summary = response.get('summary') or "I have updated the theory data as requested."
+        self._add_text_to_chat(f"AI: {summary} ({len(changes)} changes; edited rows are highlighted. "
+                               f"Click 'Save Changes for This Theory' to persist them.)\n\n")
+
+    def _replay_change(self, change, tables):
+        kind, target = change[0], change[1]
+        if kind == "field":
+            value = change[2]
+            if target == "name": self.theory_name_var.set(value)
+            elif target == "complete": self.theory_complete_var.set(value)
+            elif target == "picture_path":
+                self.current_image_path = value
+                self.display_image(value)
+            else:
+                self.theory_desc_text.delete(1.0, tk.END)
+                self.theory_desc_text.insert(tk.END, value)
+            return
+        table = tables[target]
+        if kind == "insert": table.insert_values(change[2], [change[3].get(key, '') for key in table.keys])
+        elif kind == "replace": table.replace_values(change[2], [change[3].get(key, '') for key in table.keys])
+        elif kind == "delete": table.delete(change[2])
+        else: table.set_rows(change[2])
+
+    @staticmethod
+    def llm_data_errors(theory, theory_id):
+        """Messages for the schema errors in LLM-produced theory data, which is refused rather than staged if there are any."""
+        return [issue['message'] for issue in TheoryValidator().check(theory, theory_id) if issue['severity'] == "error"]
+
+    def show_validation(self, theory_id):
+        """Colours the rows validation found problems in and summarizes the issues on the General tab."""
+        issues = self.data_manager.theory_issues(theory_id)
+        tables = {"constructs": self.constructs_table, "triples": self.triples_table, "annotations": self.annotations_table}
+        flags = {section: {} for section in tables}
+        for issue in issues:
+            if issue['section'] in flags and issue['row'] is not None and flags[issue['section']].get(issue['row']) != "error":
+                flags[issue['section']][issue['row']] = issue['severity']
+        for section, table in tables.items(): table.flag_rows(flags[section])
+        errors = sum(issue['severity'] == "error" for issue in issues)
+        if not issues: self.validation_var.set("Validation: no problems found.")
+        else:
+            first = next((issue for issue in issues if issue['severity'] == "error"), issues[0])
+            self.validation_var.set(f"Validation: {errors} errors, {len(issues) - errors} warnings (flagged rows are coloured). {first['message']}")
+        self.validation_label.config(foreground=self.SEVERITY_COLOURS["error" if errors else "warning"] if issues else "")
+
     def _add_text_to_chat(self, text):
         self.chat_history.config(state='normal')
         self.chat_history.insert(tk.END, text)
@@ -460,39 +644,87 @@ class TheoryDataEntryGUI:
             self.display_image(path)
 
     def display_image(self, path):
-        if not path or not os.path.exists(path):
+        """Shows a cached thumbnail at once, or a placeholder while a worker decodes one."""
+        signature = ThumbnailCache.signature(path) if path else None
+        if signature is None:
             self.image_label.config(image='', text="No Image Selected")
             self.current_image_path = ""
             return
-        try:
-            self.image_label.update_idletasks()
-            w, h = self.image_label.winfo_width(), self.image_label.winfo_height()
-            img = Image.open(path)
-            img.thumbnail((w - 20, h - 20), Image.Resampling.LANCZOS)
-            photo = ImageTk.PhotoImage(img)
-            self.image_label.config(image=photo, text="")
-            self.image_label.image = photo
-        except Exception as e:
-            messagebox.showerror("Image Error", f"Could not display image: {e}")
-            self.image_label.config(image='', text="Error displaying image")
+        key = (signature, ThumbnailCache.quantize(self._image_box()))
+        photo = self.photos.get(key)
+        if photo is not None:
+            self.photos.move_to_end(key)
+            self._show_photo(photo)
+            return
+        self.image_label.config(image='', text="Loading image...")
+        self.image_label.image = None
+        self._request_thumbnail(path, key, JobScheduler.INTERACTIVE)
+
+    def _image_box(self):
+        self.image_label.update_idletasks()
+        w, h = self.image_label.winfo_width(), self.image_label.winfo_height()
+        return (w - 20, h - 20) if w > 40 and h > 40 else self.DEFAULT_IMAGE_BOX
+
+    def _show_photo(self, photo):
+        self.image_label.config(image=photo, text="")
+        self.image_label.image = photo
+
+    def _request_thumbnail(self, path, key, priority):
+        job_key = ("thumbnail", key)
+        if self.jobs.in_flight(job_key): return  # Its result is shown if the picture is still current.
+        self.jobs.submit(f"Thumbnail {os.path.basename(path)}", self._thumbnail_worker, path, key[1], key=job_key, priority=priority,
+                         on_done=lambda image: self._thumbnail_ready(path, key, image), on_error=lambda error: self._thumbnail_failed(path, error))
+
+    def _thumbnail_worker(self, job, path, box):
+        return self.thumbnails.thumbnail(path, box)
+
+    def _thumbnail_ready(self, path, key, image):
+        photo = ImageTk.PhotoImage(image)
+        self.photos[key] = photo
+        while len(self.photos) > self.PHOTO_CACHE_SIZE: self.photos.popitem(last=False)
+        if path == self.current_image_path: self._show_photo(photo)
+
+    def _thumbnail_failed(self, path, error):
+        if path != self.current_image_path: return  # Prefetch failures surface only if the picture is opened.
+        messagebox.showerror("Image Error", f"Could not display image: {error}")
+        self.image_label.config(image='', text="Error displaying image")
+
+    def prefetch_neighbour_images(self, theory_id):
+        """Decodes the pictures of the theories around the selection, so stepping through the list finds them ready."""
+        items = self.tree.get_children()
+        if str(theory_id) not in items: return
+        i = items.index(str(theory_id))
+        box = ThumbnailCache.quantize(self._image_box())
+        for item in items[max(0, i - self.PREFETCH_NEIGHBOURS):i] + items[i + 1:i + 1 + self.PREFETCH_NEIGHBOURS]:
+            path = self.data_manager.get_theory(int(item)).get('picture_path', '')
+            signature = ThumbnailCache.signature(path) if path else None
+            if signature is not None and (signature, box) not in self.photos: self._request_thumbnail(path, (signature, box), JobScheduler.BULK)
 
     def generate_description_with_llm(self):
         if self.current_theory_id is None: messagebox.showerror("Error", "No theory selected."); return
         api_key = self.api_key_var.get()
         if not api_key: messagebox.showerror("Error", "API Key is missing in Settings."); return
         theory_name = self.theory_name_var.get()
-        constructs = [{'name': self.constructs_tree.item(i, 'values')[0]} for i in self.constructs_tree.get_children()]
-        triples = [{'subject': self.triples_tree.item(i, 'values')[0], 'predicate': self.triples_tree.item(i, 'values')[1], 'object': self.triples_tree.item(i, 'values')[2]} for i in self.triples_tree.get_children()]
+        constructs = self.constructs_table.get_rows()
+        triples = self.triples_table.get_rows()
         if not constructs and not triples: messagebox.showwarning("Warning", "No constructs or triples to generate a description from."); return
-        threading.Thread(target=self._llm_desc_worker, args=(api_key, theory_name, constructs, triples), daemon=True).start()
-        messagebox.showinfo("Processing", "Generating description with LLM. This may take a moment.")
-        
-    def _llm_desc_worker(self, api_key, theory_name, constructs, triples):
-        processor = LLMProcessor(api_key)
-        description = processor.generate_description(theory_name, constructs, triples)
-        if description: self.root.after(0, self.update_description_text, description)
+        key = ("description", self.current_theory_id)
+        if self.jobs.in_flight(key): messagebox.showinfo("Already Running", "A description is already being generated for this theory."); return
+        self.jobs.submit(f"Describe {theory_name}", self._llm_desc_worker, api_key, theory_name, constructs, triples, key=key,
+                         on_done=self.update_description_text, on_error=self.show_job_error)
+
+    def _llm_desc_worker(self, job, api_key, theory_name, constructs, triples):
+        processor = self.new_llm_processor(api_key)
+        on_text = lambda text: self.jobs.call_soon(self.show_description_stream, text)
+        return processor.generate_description(theory_name, constructs, triples, on_text, job.cancel_event)
+
+    def show_description_stream(self, text):
+        self.theory_desc_text.delete(1.0, tk.END)
+        self.theory_desc_text.insert(tk.END, text.lstrip())
+        self.theory_desc_text.see(tk.END)
 
     def update_description_text(self, text):
+        if not text: return
         self.theory_desc_text.delete(1.0, tk.END)
         self.theory_desc_text.insert(tk.END, text.strip())
         messagebox.showinfo("Success", "Description generated. Please review and save.")
@@ -500,7 +732,10 @@ class TheoryDataEntryGUI:
     def on_theory_select(self, event=None):
         selected_item = self.tree.selection()
         if not selected_item: return
-        self.current_theory_id = int(selected_item[0])
+        with metrics.span("theory_select"): self.show_theory(int(selected_item[0]))
+
+    def show_theory(self, theory_id):
+        self.current_theory_id = theory_id
         theory_data = self.data_manager.get_theory(self.current_theory_id)
         self.set_entry_state('normal')
         self.theory_name_var.set(theory_data.get('name', ''))
@@ -509,58 +744,106 @@ class TheoryDataEntryGUI:
         self.theory_complete_var.set(theory_data.get('complete', False))
         self.current_image_path = theory_data.get("picture_path", "")
         self.display_image(self.current_image_path)
-        self.constructs_tree.delete(*self.constructs_tree.get_children())
-        for item in theory_data.get('constructs', []): self.constructs_tree.insert('', 'end', values=(item['name'], item['description']))
-        self.triples_tree.delete(*self.triples_tree.get_children())
-        for item in theory_data.get('triples', []): self.triples_tree.insert('', 'end', values=(item['subject'], item['predicate'], item['object']))
-        self.annotations_tree.delete(*self.annotations_tree.get_children())
-        for item in theory_data.get('annotations', []): self.annotations_tree.insert('', 'end', values=(item['construct'], item['relation'], item['value'], item['source']))
+        self.prefetch_neighbour_images(theory_id)
+        self.constructs_table.set_rows(theory_data.get('constructs', []))
+        self.triples_table.set_rows(theory_data.get('triples', []))
+        self.annotations_table.set_rows(theory_data.get('annotations', []))
+        self.show_validation(theory_id)
         self.chat_history.config(state='normal')
         self.chat_history.delete(1.0, tk.END)
         self.chat_history.insert(tk.END, "Chat with the AI about this theory. You can ask it to make changes.\n\n")
         self.chat_history.config(state='disabled')
 
+    def schedule_search(self, event=None):
+        """Searches once typing pauses, rather than on every keystroke."""
+        if self.search_job: self.root.after_cancel(self.search_job)
+        self.search_job = self.root.after(150, self.run_search)
+
+    def run_search(self):
+        self.search_job = None
+        query = self.search_var.get().strip()
+        self.search_results.delete(*self.search_results.get_children())
+        if not query: self.search_results.pack_forget(); return
+        self.search_hits = self.data_manager.search(query, limit=50)
+        for i, hit in enumerate(self.search_hits):
+            where = f"{hit['theory_id']} / {hit['kind']}" + (f" {hit['row'] + 1}" if hit['row'] is not None else "")
+            self.search_results.insert('', 'end', iid=i, text=hit['text'], values=(where,))
+        if not self.search_results.winfo_manager(): self.search_results.pack(fill=tk.X, padx=5, pady=5, before=self.tree)
+
+    def go_to_search_hit(self, event=None):
+        selection = self.search_results.selection()
+        if not selection: return
+        hit = self.search_hits[int(selection[0])]
+        if hit['theory_id'] != self.current_theory_id:
+            self.tree.selection_set(str(hit['theory_id']))
+            self.tree.see(str(hit['theory_id']))
+            self.on_theory_select()
+        tables = {"construct": self.constructs_table, "triple": self.triples_table, "annotation": self.annotations_table}
+        self.notebook.select(self.notebook.tabs()[["theory", "construct", "triple", "annotation"].index(hit['kind'])])
+        # Idle-time, so it runs after the theory list's own <<TreeviewSelect>> has reloaded the tables.
+        if hit['kind'] in tables: self.root.after_idle(tables[hit['kind']].select, hit['row'])
+
     def save_current_theory(self):
         if self.current_theory_id is None: messagebox.showerror("Error", "No theory selected."); return
-        constructs = [{'name': self.constructs_tree.item(i, 'values')[0], 'description': self.constructs_tree.item(i, 'values')[1]} for i in self.constructs_tree.get_children()]
-        triples = [{'subject': self.triples_tree.item(i, 'values')[0], 'predicate': self.triples_tree.item(i, 'values')[1], 'object': self.triples_tree.item(i, 'values')[2]} for i in self.triples_tree.get_children()]
-        annotations = [{'construct': self.annotations_tree.item(i, 'values')[0], 'relation': self.annotations_tree.item(i, 'values')[1], 'value': self.annotations_tree.item(i, 'values')[2], 'source': self.annotations_tree.item(i, 'values')[3]} for i in self.annotations_tree.get_children()]
+        constructs = self.constructs_table.get_rows()
+        triples = self.triples_table.get_rows()
+        annotations = self.annotations_table.get_rows()
         updated_data = {"id": self.current_theory_id, "name": self.theory_name_var.get(), "description": self.theory_desc_text.get(1.0, tk.END).strip(), "picture_path": self.current_image_path, "complete": self.theory_complete_var.get(), "constructs": constructs, "triples": triples, "annotations": annotations}
         self.data_manager.update_theory(self.current_theory_id, updated_data)
+        for table in (self.constructs_table, self.triples_table, self.annotations_table): table.mark_clean()
+        self.show_validation(self.current_theory_id)
         self.populate_theory_list()
+        if self.search_var.get().strip(): self.run_search()
         messagebox.showinfo("Success", f"Theory '{updated_data['name']}' saved successfully.")
 
     def populate_theory_list(self):
         self.tree.delete(*self.tree.get_children())
-        for theory in self.data_manager.theories:
-            status = "Complete" if theory.get('complete') else "Incomplete"
-            self.tree.insert('', 'end', text=theory['name'], iid=theory['id'], values=(status,))
+        for theory_id, name, complete in self.data_manager.theory_summaries():
+            status = "Complete" if complete else "Incomplete"
+            self.tree.insert('', 'end', text=name, iid=theory_id, values=(status,))
 
     def process_with_llm(self):
         api_key = self.api_key_var.get()
-        if not api_key: messagebox.showerror("Error", "API Key is missing."); return
         target_theory_name = self.llm_target_theory_var.get()
         if not target_theory_name: messagebox.showerror("Error", "Please select a target theory."); return
         raw_text = self.llm_input_text.get(1.0, tk.END)
         if not raw_text.strip(): messagebox.showerror("Error", "Input text is empty."); return
-        threading.Thread(target=self._llm_worker, args=(api_key, raw_text, target_theory_name), daemon=True).start()
-        messagebox.showinfo("Processing", "Sending data to LLM. The UI will be updated upon completion.")
-
-    def _llm_worker(self, api_key, raw_text, target_theory_name):
-        processor = LLMProcessor(api_key)
-        parsed_data = processor.parse_raw_text(raw_text)
-        if parsed_data: self.root.after(0, self.populate_ui_from_llm, parsed_data, target_theory_name)
+        # One parse per theory at a time: a second click would pay for a duplicate request racing to overwrite the first.
+        key = ("parse", target_theory_name)
+        if self.jobs.in_flight(key): messagebox.showinfo("Already Running", f"'{target_theory_name}' is already being processed."); return
+        # The target's existing construct names help split triples whose text contains more than one predicate.
+        target_theory_id = self.data_manager.find_theory_id(target_theory_name)
+        known = [c.get('name', '') for c in self.data_manager.get_theory(target_theory_id).get('constructs', [])] if target_theory_id is not None else []
+        self.jobs.submit(f"Parse {target_theory_name}", self._llm_worker, api_key, raw_text, known, key=key, priority=JobScheduler.BULK,
+                         on_done=lambda parsed: self.populate_ui_from_llm(parsed, target_theory_name), on_error=self.show_job_error)
+
+    def _llm_worker(self, job, api_key, raw_text, known_constructs):
+        return self.new_llm_processor(api_key).parse_raw_text(raw_text, job.cancel_event, RawTheoryParser(constructs=known_constructs))
 
     def populate_ui_from_llm(self, parsed_data, target_theory_name):
-        target_theory_id = next((t['id'] for t in self.data_manager.theories if t['name'] == target_theory_name), None)
+        if not parsed_data: return
+        target_theory_id = self.data_manager.find_theory_id(target_theory_name)
         if target_theory_id is None: messagebox.showerror("Error", f"Could not find theory '{target_theory_name}'."); return
-        theory_to_update = self.data_manager.get_theory(target_theory_id)
+        theory_to_update = dict(self.data_manager.get_theory(target_theory_id))
         theory_to_update['constructs'] = parsed_data.get('constructs', [])
         theory_to_update['triples'] = parsed_data.get('triples', [])
         theory_to_update['annotations'] = parsed_data.get('annotations', [])
+        errors = self.llm_data_errors(theory_to_update, target_theory_id)
+        if errors:
+            messagebox.showerror("Invalid Data", f"The parsed data for '{target_theory_name}' does not fit the data format and was not loaded:\n\n" + "\n".join(errors[:10]))
+            return
+        self.data_manager.stage_theory(theory_to_update)
         self.tree.selection_set(str(target_theory_id))
         self.on_theory_select()
-        messagebox.showinfo("Success", f"Data for '{target_theory_name}' has been populated. Review and click 'Save Changes'.")
+        report = parsed_data.get('report', [])
+        local = sum(r['status'] == 'parsed' for r in report)
+        by_llm = sum(r['status'] == 'llm' for r in report)
+        unparsed = [r for r in report if r['status'] == 'unparsed']
+        summary = f"{local} lines parsed locally, {by_llm} by the LLM."
+        if unparsed:
+            summary += f"\n\n{len(unparsed)} lines could not be parsed and were skipped:\n" + "\n".join(f"{r['line']}: {r['text'][:80]}" for r in unparsed[:10])
+            if not self.api_key_var.get(): summary += "\n\nAdd an API key in Settings to send such lines to the LLM."
+        messagebox.showinfo("Success", f"Data for '{target_theory_name}' has been populated. Review and click 'Save Changes'.\n\n{summary}")
         self.notebook.select(self.notebook.tabs()[1])
     
     def _recursive_set_state(self, parent, state):
@@ -581,40 +864,71 @@ class TheoryDataEntryGUI:
     
     def add_construct(self):
         dialog = DataEntryDialog(self.root, "Add Construct", ["Name:", "Description:"])
-        if dialog.result: self.constructs_tree.insert('', 'end', values=dialog.result)
+        if dialog.result: self.constructs_table.append_values(dialog.result)
             
     def edit_construct(self):
-        selected = self.constructs_tree.selection()
-        if not selected: return
-        values = self.constructs_tree.item(selected[0], 'values')
+        selected = self.constructs_table.selected_index()
+        if selected is None: return
+        values = self.constructs_table.row_values(selected)
         dialog = DataEntryDialog(self.root, "Edit Construct", ["Name:", "Description:"], initial_values=values)
-        if dialog.result: self.constructs_tree.item(selected[0], values=dialog.result)
+        if dialog.result: self.constructs_table.replace_values(selected, dialog.result)
 
     def remove_construct(self):
-        selected = self.constructs_tree.selection()
-        if selected and messagebox.askyesno("Confirm", "Are you sure?"): self.constructs_tree.delete(selected[0])
+        selected = self.constructs_table.selected_index()
+        if selected is not None and messagebox.askyesno("Confirm", "Are you sure?"): self.constructs_table.delete(selected)
 
     def add_triple(self):
-        all_constructs = sorted(list(set([self.constructs_tree.item(i, 'values')[0] for i in self.constructs_tree.get_children()])))
+        all_constructs = sorted({c['name'] for c in self.constructs_table.get_rows()})
         dialog = DataEntryDialog(self.root, "Add Triple", ["Subject:", "Predicate:", "Object:"], dropdowns={'Subject:': all_constructs, 'Object:': all_constructs})
-        if dialog.result: self.triples_tree.insert('', 'end', values=dialog.result)
+        if dialog.result: self.triples_table.append_values(dialog.result)
 
     def remove_triple(self):
-        selected = self.triples_tree.selection()
-        if selected and messagebox.askyesno("Confirm", "Are you sure?"): self.triples_tree.delete(selected[0])
+        selected = self.triples_table.selected_index()
+        if selected is not None and messagebox.askyesno("Confirm", "Are you sure?"): self.triples_table.delete(selected)
 
     def add_annotation(self):
-        all_constructs = sorted(list(set([self.constructs_tree.item(i, 'values')[0] for i in self.constructs_tree.get_children()])))
+        all_constructs = sorted({c['name'] for c in self.constructs_table.get_rows()})
         dialog = DataEntryDialog(self.root, "Add Annotation", ["Construct:", "Relation:", "Value:", "Source:"], dropdowns={'Construct:': all_constructs})
-        if dialog.result: self.annotations_tree.insert('', 'end', values=dialog.result)
+        if dialog.result: self.annotations_table.append_values(dialog.result)
 
     def remove_annotation(self):
-        selected = self.annotations_tree.selection()
-        if selected and messagebox.askyesno("Confirm", "Are you sure?"): self.annotations_tree.delete(selected[0])
+        selected = self.annotations_table.selected_index()
+        if selected is not None and messagebox.askyesno("Confirm", "Are you sure?"): self.annotations_table.delete(selected)
             
     def build_and_visualize(self):
         self.data_manager.build_graph()
-        self.data_manager.visualize_graph()
+        self._start_render()
+
+    def visualize_current_theory(self):
+        if self.current_theory_id is None: messagebox.showerror("Error", "No theory selected."); return
+        self.data_manager.build_graph()
+        theory_name = self.data_manager.get_theory(self.current_theory_id)['name']
+        safe_filename = re.sub(r'[\\/*?:"<>|]', "", theory_name)
+        view = self.data_manager.theory_subgraph(theory_name)
+        self._start_render(view, f"theory_{safe_filename}.svg", theory_name)
+
+    def visualize_neighbourhood(self):
+        node = simpledialog.askstring("Visualize Neighbourhood", "Construct or theory name:", parent=self.root)
+        if not node: return
+        hops = simpledialog.askinteger("Visualize Neighbourhood", "Number of hops:", parent=self.root, initialvalue=1, minvalue=1, maxvalue=5)
+        if not hops: return
+        self.data_manager.build_graph()
+        if not self.data_manager.graph.has_node(node): messagebox.showerror("Error", f"'{node}' is not in the graph."); return
+        safe_filename = re.sub(r'[\\/*?:"<>|]', "", node)
+        view = self.data_manager.neighbourhood_subgraph(node, hops)
+        self._start_render(view, f"neighbourhood_{safe_filename}_{hops}.svg", f"{node} ({hops}-hop)")
+
+    def _start_render(self, *view):
+        try: future = self.data_manager.visualize_graph(self.graph_renderer, *view)
+        except GraphEmptyError as e: messagebox.showwarning("Graph Empty", str(e)); return
+        self.jobs.track(f"Render {view[1] if len(view) > 1 else 'full graph'}", future, on_done=self._on_graph_rendered)
+
+    def _on_graph_rendered(self, future):
+        if future.cancelled(): return
+        if future.exception(): messagebox.showerror("Graph Error", f"Could not render the graph: {future.exception()}"); return
+        # The SVG opens in the browser, which gives pan/zoom for free.
+        path, _ = future.result()
+        webbrowser.open(f"file://{path}")
 
     def export_theory_to_cypher(self):
         """Generates and saves a Cypher script for the current theory."""
@@ -622,58 +936,11 @@ class TheoryDataEntryGUI:
             messagebox.showerror("Error", "No theory selected to export.")
             return
 
-        theory = self.data_manager.get_theory(self.current_theory_id)
-        
+        theory, annotations = CypherExporter.resolved_theory(self.data_manager, self.current_theory_id)
         theory_name_raw = theory.get("name", f"Theory_{self.current_theory_id}")
-        theory_name_cypher = self._escape_cypher(theory_name_raw)
-
         safe_filename = re.sub(r'[\\/*?:"<>|]', "", theory_name_raw)
-        cypher_lines = [f"// Cypher script for {theory_name_raw}\n\n"]
-
-        cypher_lines.append(f"// Create the main theory node\n")
-        cypher_lines.append(f"MERGE (t:Theory {{name: '{theory_name_cypher}'}});\n\n")
-
-        cypher_lines.append(f"// Create construct nodes and add properties\n")
-        constructs = theory.get("constructs", [])
-        annotations = theory.get("annotations", [])
-        
-        annotations_by_construct = {}
-        for ann in annotations:
-            if ann['construct'] not in annotations_by_construct:
-                annotations_by_construct[ann['construct']] = []
-            annotations_by_construct[ann['construct']].append(ann)
-
-        for construct in constructs:
-            name = self._escape_cypher(construct['name'])
-            desc = self._escape_cypher(construct.get('description', ''))
-            
-            props = f"name: '{name}', description: '{desc}'"
-            
-            if construct['name'] in annotations_by_construct:
-                # Get the list of annotation dictionaries for the current construct
-                annotations_list = annotations_by_construct[construct['name']]
-                # Convert this list into a valid JSON string
-                json_string_of_annotations = json.dumps(annotations_list)
-                # Escape the entire JSON string for embedding within the Cypher query
-                escaped_json_string = self._escape_cypher(json_string_of_annotations)
-                
-                props += f", annotations: '{escaped_json_string}'"
-
-            cypher_lines.append(f"MERGE (c:Construct {{name: '{name}'}})\nSET c += {{{props}}};\n")
-
-        cypher_lines.append(f"\n// Create relationships from the theory to its constructs\n")
-        for construct in constructs:
-            c_name = self._escape_cypher(construct['name'])
-            cypher_lines.append(f"MATCH (t:Theory {{name: '{theory_name_cypher}'}}), (c:Construct {{name: '{c_name}'}}) MERGE (t)-[:HAS_CONSTRUCT]->(c);\n")
-        
-        cypher_lines.append(f"\n// Create relationships between constructs based on triples\n")
-        for triple in theory.get("triples", []):
-            subj = self._escape_cypher(triple['subject'])
-            obj = self._escape_cypher(triple['object'])
-            pred = re.sub(r'[^a-zA-Z0-9_]', '_', triple['predicate'].upper().replace(" ", "_"))
+        cypher_lines = CypherExporter().theory_script(theory, annotations)
 
-            cypher_lines.append(f"MATCH (a:Construct {{name: '{subj}'}}), (b:Construct {{name: '{obj}'}}) MERGE (a)-[:{pred}]->(b);\n")
-        
         export_dir = "cypher_exports"
         if not os.path.exists(export_dir):
             os.makedirs(export_dir)
@@ -684,14 +951,26 @@ class TheoryDataEntryGUI:
             f.writelines(cypher_lines)
             
         messagebox.showinfo("Success", f"Cypher script exported successfully to:\n{filepath}")
+
+    def export_corpus_to_cypher(self):
+        """Writes batched, parameterized Cypher import files for every theory."""
+        export_dir = os.path.join("cypher_exports", "corpus")
+        summary = CypherExporter().export_corpus(self.data_manager, export_dir)
+        messagebox.showinfo("Success", f"Exported {summary['theories']} theories ({summary['batches']} batches, "
+                                       f"{summary['triples']} triples) to:\n{os.path.abspath(export_dir)}")
         
-    def _escape_cypher(self, text):
-        """Helper function to escape single quotes for Cypher strings."""
-        return text.replace("'", "\\'")
-        
+    def export_corpus_tables(self):
+        """Writes the corpus as analytics tables: Parquet and Arrow when pyarrow is installed, CSV always, plus GraphML."""
+        export_dir = "table_exports"
+        formats = ("csv", "parquet", "arrow") if importlib.util.find_spec("pyarrow") else ("csv",)
+        try: counts = TableExporter().export_corpus(self.data_manager, export_dir, formats)
+        except TheoryToolError as e: messagebox.showerror("Export Error", str(e)); return
+        messagebox.showinfo("Success", f"Exported {counts['theories']} theories, {counts['triples']} triples, {counts['annotations']} annotations "
+                                       f"and the {counts['graph_nodes']}-node graph as {', '.join(formats)} and GraphML to:\n{os.path.abspath(export_dir)}")
+
     def show_incomplete_theories(self):
         """Displays a popup with a list of all incomplete theories."""
-        incomplete_theories = [t['name'] for t in self.data_manager.theories if not t.get('complete')]
+        incomplete_theories = [name for _, name, complete in self.data_manager.theory_summaries() if not complete]
         
         if not incomplete_theories:
             messagebox.showinfo("All Complete!", "All theories have been marked as complete.")
@@ -725,6 +1004,195 @@ class TheoryDataEntryGUI:
 
         listbox.bind("<Double-1>", go_to_theory)
 
+    def show_validation_report(self):
+        """Validates the whole corpus and lists every issue; double-click one to open its theory at the offending row."""
+        issues = self.data_manager.build_validator().report()
+        if not issues:
+            messagebox.showinfo("All Valid", "No problems were found in any theory.")
+            return
+        errors = sum(issue['severity'] == "error" for issue in issues)
+        names = {theory_id: name for theory_id, name, _ in self.data_manager.theory_summaries()}
+
+        popup = tk.Toplevel(self.root)
+        popup.title("Validation Report")
+        popup.geometry("900x500")
+        ttk.Label(popup, text=f"{errors} errors and {len(issues) - errors} warnings in {len({i['theory_id'] for i in issues})} theories:").pack(pady=10)
+        report = ttk.Treeview(popup, columns=('severity', 'message'), selectmode='browse')
+        report.heading('#0', text='Theory')
+        report.heading('severity', text='Severity')
+        report.heading('message', text='Problem')
+        report.column('#0', width=220)
+        report.column('severity', width=70, anchor='center')
+        report.column('message', width=580)
+        for severity, colour in self.SEVERITY_COLOURS.items(): report.tag_configure(severity, foreground=colour)
+        for i, issue in enumerate(issues):
+            report.insert('', 'end', iid=i, text=names.get(issue['theory_id'], issue['theory_id']), values=(issue['severity'], issue['message']), tags=(issue['severity'],))
+        report.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+
+        def go_to_issue(event):
+            selection = report.selection()
+            if not selection: return
+            issue = issues[int(selection[0])]
+            self.tree.selection_set(str(issue['theory_id']))
+            self.tree.see(str(issue['theory_id']))
+            self.on_theory_select()
+            tables = {"constructs": self.constructs_table, "triples": self.triples_table, "annotations": self.annotations_table}
+            if issue['section'] in tables and issue['row'] is not None:
+                self.notebook.select(self.notebook.tabs()[["constructs", "triples", "annotations"].index(issue['section']) + 1])
+                self.root.after_idle(tables[issue['section']].select, issue['row'])
+            else:
+                self.notebook.select(self.notebook.tabs()[0])
+
+        report.bind("<Double-1>", go_to_issue)
+
+class VirtualTable(ttk.Frame):
+    """A Treeview that renders only the visible window of a list of row dicts.
+
+    The row list handed to `set_rows` is the source of truth; scrolling re-fills a
+    small pool of Treeview items instead of creating one item per row, so showing a
+    theory with thousands of rows costs the same as one with ten. Rows added or
+    edited since the last `mark_clean` are highlighted and reported by `has_changes`;
+    rows passed to `flag_rows` are coloured by the severity of their validation issues.
+    """
+    def __init__(self, parent, columns):
+        super().__init__(parent)
+        self.keys = [key for key, _ in columns]
+        self.rows = []
+        self.dirty = set()  # id() of row dicts added or edited since mark_clean
+        self.flags = {}  # id() of row dicts -> "error" | "warning" from the last flag_rows
+        self.removed = 0
+        self.offset = 0
+        self.selected = None
+        self.slots = []
+        self._rendering = False
+        self.tree = ttk.Treeview(self, columns=self.keys, show='headings', selectmode='browse')
+        for key, heading in columns: self.tree.heading(key, text=heading)
+        self.tree.tag_configure('dirty', background='#fff3c4')
+        for severity, colour in TheoryDataEntryGUI.SEVERITY_COLOURS.items(): self.tree.tag_configure(severity, foreground=colour)
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.yview)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.tree.bind('<Configure>', lambda e: self.render())
+        self.tree.bind('<<TreeviewSelect>>', self._on_select)
+        self.tree.bind('<MouseWheel>', lambda e: self._scroll(-1 if e.delta > 0 else 1, 3))
+        self.tree.bind('<Button-4>', lambda e: self._scroll(-1, 3))
+        self.tree.bind('<Button-5>', lambda e: self._scroll(1, 3))
+        self.tree.bind('<Up>', lambda e: self._move_selection(-1))
+        self.tree.bind('<Down>', lambda e: self._move_selection(1))
+
+    def visible_count(self):
+        style = ttk.Style()
+        row_height = int(style.lookup('Treeview', 'rowheight') or 20)
+        return max(1, (self.tree.winfo_height() - row_height) // row_height)
+
+    def render(self):
+        visible = self.visible_count()
+        self.offset = max(0, min(self.offset, len(self.rows) - visible))
+        while len(self.slots) < visible: self.slots.append(self.tree.insert('', 'end', values=()))
+        self._rendering = True
+        try:
+            self.tree.selection_remove(self.tree.selection())
+            for i, slot in enumerate(self.slots):
+                index = self.offset + i
+                if i < visible and index < len(self.rows):
+                    row = self.rows[index]
+                    tags = ('dirty',) if id(row) in self.dirty else ()
+                    if id(row) in self.flags: tags += (self.flags[id(row)],)
+                    self.tree.item(slot, values=[row.get(key, '') for key in self.keys], tags=tags)
+                    self.tree.move(slot, '', i)
+                    if index == self.selected: self.tree.selection_set(slot)
+                else:
+                    self.tree.detach(slot)
+        finally:
+            self._rendering = False
+        if self.rows: self.scrollbar.set(self.offset / len(self.rows), min(1.0, (self.offset + visible) / len(self.rows)))
+        else: self.scrollbar.set(0, 1)
+
+    def yview(self, *args):
+        if args[0] == 'moveto': self.offset = int(float(args[1]) * len(self.rows))
+        elif args[0] == 'scroll': self.offset += int(args[1]) * (self.visible_count() if args[2] == 'pages' else 1)
+        self.render()
+
+    def _scroll(self, direction, amount):
+        self.offset += direction * amount
+        self.render()
+        return 'break'
+
+    def _on_select(self, event=None):
+        if self._rendering: return
+        selection = self.tree.selection()
+        if selection: self.selected = self.offset + self.slots.index(selection[0])
+
+    def _move_selection(self, step):
+        if self.rows: self.select(0 if self.selected is None else max(0, min(len(self.rows) - 1, self.selected + step)))
+        return 'break'
+
+    def select(self, index):
+        """Selects row `index`, scrolling it into view."""
+        self.selected = index
+        visible = self.visible_count()
+        if self.selected < self.offset: self.offset = self.selected
+        elif self.selected >= self.offset + visible: self.offset = self.selected - visible + 1
+        self.render()
+
+    def set_rows(self, rows):
+        """Shows `rows` (copied shallowly, so edits never leak into the caller's list)."""
+        self.rows = list(rows)
+        self.flags = {}
+        self.offset = 0
+        self.selected = None
+        self.mark_clean()
+
+    def flag_rows(self, severities):
+        """Colours rows {index: "error" | "warning"}, replacing earlier flags."""
+        self.flags = {id(self.rows[index]): severity for index, severity in severities.items() if index < len(self.rows)}
+        self.render()
+
+    def get_rows(self):
+        return list(self.rows)
+
+    def has_changes(self):
+        return bool(self.dirty) or self.removed > 0
+
+    def mark_clean(self):
+        self.dirty = set()
+        self.removed = 0
+        self.render()
+
+    def selected_index(self):
+        return self.selected
+
+    def row_values(self, index):
+        return [self.rows[index].get(key, '') for key in self.keys]
+
+    def append_values(self, values):
+        row = dict(zip(self.keys, values))
+        self.rows.append(row)
+        self.dirty.add(id(row))
+        self.selected = len(self.rows) - 1
+        self.offset = max(0, len(self.rows) - self.visible_count())
+        self.render()
+
+    def insert_values(self, index, values):
+        row = dict(zip(self.keys, values))
+        self.rows.insert(index, row)
+        self.dirty.add(id(row))
+        self.select(index)
+
+    def replace_values(self, index, values):
+        # A new dict rather than an in-place update, so the saved theory's row is left untouched.
+        self.dirty.discard(id(self.rows[index]))
+        self.rows[index] = dict(self.rows[index], **dict(zip(self.keys, values)))
+        self.dirty.add(id(self.rows[index]))
+        self.render()
+
+    def delete(self, index):
+        self.dirty.discard(id(self.rows.pop(index)))
+        self.removed += 1
+        self.selected = None
+        self.render()
+
+
 class DataEntryDialog(simpledialog.Dialog):
     def __init__(self, parent, title, field_labels, initial_values=None, dropdowns=None):
         self.field_labels, self.initial_values, self.dropdowns, self.entries = field_labels, initial_values or [], dropdowns or {}, []
@@ -748,7 +1216,16 @@ class DataEntryDialog(simpledialog.Dialog):
     def apply(self):
         self.result = [entry.get() for entry in self.entries]
 
-if __name__ == '__main__':
+def main(argv=None):
+    parser = build_parser()
+    parser.description = "Behavioral Theory Data Entry Tool. Run without a command to open the GUI."
+    args = parser.parse_args(argv)
+    if args.command: return run_command(args)
     root = tk.Tk()
-    app = TheoryDataEntryGUI(root)
+    TheoryDataEntryGUI(root)  # Kept alive by the callbacks it registers with Tk.
     root.mainloop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
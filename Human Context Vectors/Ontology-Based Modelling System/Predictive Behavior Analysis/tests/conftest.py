@@ -0,0 +1,80 @@
+import json
+import os
+import shutil
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+TOOL_DIR = os.path.dirname(HERE)
+sys.path.insert(0, TOOL_DIR)  # The tool's modules are run from their own directory, not installed.
+
+BUNDLED_DATA = os.path.join(TOOL_DIR, "theory_data.json")
+
+
+@pytest.fixture
+def corpus_path(tmp_path):
+    """A private copy of the bundled theory_data.json, so journals and sidecars stay out of the tree."""
+    path = tmp_path / "theory_data.json"
+    shutil.copyfile(BUNDLED_DATA, path)
+    return str(path)
+
+
+class ScriptedLLMServer:
+    """A local generateContent endpoint that answers with queued replies and records each prompt.
+
+    A reply is the model's text, or an HTTP status code to fail the request with (sent
+    with `retry_after` as its Retry-After header, if set). Streaming requests get the
+    text back as server-sent events, one per item when the reply is a list of chunks.
+    """
+
+    def __init__(self):
+        self.replies, self.prompts = [], []
+        self.retry_after = None
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args): pass
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                server.prompts.append(payload["contents"][0]["parts"][0]["text"])
+                reply = server.replies.pop(0)
+                if ':streamGenerateContent' in self.path and not isinstance(reply, int): return self.stream(reply)
+                status = reply if isinstance(reply, int) else 200
+                answer = {"candidates": [{"content": {"parts": [{"text": reply}]}}]} if status == 200 else {"error": {"code": status}}
+                body = json.dumps(answer).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                if status != 200 and server.retry_after is not None: self.send_header('Retry-After', server.retry_after)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def stream(self, chunks):
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Connection', 'close')
+                self.end_headers()
+                self.wfile.write(b": keep-alive\r\n\r\n")
+                for chunk in [chunks] if isinstance(chunks, str) else chunks:
+                    event = {"candidates": [{"content": {"parts": [{"text": chunk}]}}]}
+                    self.wfile.write(f"data: {json.dumps(event)}\r\n\r\n".encode('utf-8'))
+                    self.wfile.flush()
+                self.close_connection = True
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.endpoint = f"http://127.0.0.1:{self.server.server_address[1]}/v1beta/models/mock:generateContent"
+
+
+@pytest.fixture
+def llm_server():
+    server = ScriptedLLMServer()
+    threading.Thread(target=server.server.serve_forever, daemon=True).start()
+    yield server
+    server.server.shutdown()
+    server.server.server_close()
@@ -0,0 +1,43 @@
+import json
+
+from conftest import BUNDLED_DATA
+from theory_benchmark import CorpusBenchmark, MockLLMServer, synthetic_corpus
+from theory_core import LLMProcessor, TheoryDataManager
+
+with open(BUNDLED_DATA, 'r', encoding='utf-8') as f: REFERENCE = json.load(f)
+
+
+def test_synthetic_corpus_is_seeded_and_shaped_like_the_reference():
+    corpus = synthetic_corpus(REFERENCE, 200, seed=1)
+    assert corpus == synthetic_corpus(REFERENCE, 200, seed=1)
+    assert corpus != synthetic_corpus(REFERENCE, 200, seed=2)
+    assert [theory["id"] for theory in corpus] == list(range(1, 201))
+    shape = lambda t: (len(t["triples"]), len(t["annotations"]))
+    assert set(map(shape, corpus)) <= set(map(shape, REFERENCE))
+    names = [c["name"] for t in corpus for c in t["constructs"]]
+    assert len(set(names)) < len(names)  # Construct names are reused across theories.
+
+
+def test_synthetic_corpus_loads_without_errors(tmp_path):
+    path = tmp_path / "theory_data.json"
+    path.write_text(json.dumps(synthetic_corpus(REFERENCE, 50)), encoding='utf-8')
+    assert not [p for p in TheoryDataManager(str(path)).validate() if p[1] == "error"]
+
+
+def test_mock_server_answers_plain_and_streamed_calls():
+    with MockLLMServer() as llm:
+        processor = LLMProcessor("test-key", endpoint=llm.endpoint)
+        assert json.loads(processor.make_api_call("prompt")) == json.loads(MockLLMServer.REPLY)
+        chunks = []
+        assert json.loads(processor.make_api_call("prompt", on_text=chunks.append)) == json.loads(MockLLMServer.REPLY)
+        assert len(chunks) > 1
+
+
+def test_benchmark_runs_every_path_or_says_why_not(tmp_path):
+    with MockLLMServer() as llm:
+        results = CorpusBenchmark(synthetic_corpus(REFERENCE, 20), str(tmp_path), repeat=1, layout_limit=0,
+                                  llm_endpoint=llm.endpoint).run()
+    assert results["layout"] == {"skipped": results["layout"]["skipped"]}
+    for name, result in results.items():
+        assert "skipped" in result or result["seconds"] >= 0, name
+    assert "seconds" in results["chat_roundtrip"]
@@ -0,0 +1,31 @@
+import json
+
+from theory_core import TheoryDataManager, main
+
+
+def test_load_prints_a_summary(corpus_path, capsys):
+    assert main(["--data", corpus_path, "load"]) == 0
+    assert capsys.readouterr().out.startswith("Loaded 76 theories (69 complete)")
+
+
+def test_validate_reports_no_errors_on_the_bundled_corpus(corpus_path, capsys):
+    assert main(["--data", corpus_path, "validate"]) == 0
+    assert capsys.readouterr().out.splitlines()[-1].startswith("0 errors")
+
+
+def test_build_graph_writes_the_library_graph(corpus_path, tmp_path):
+    out = str(tmp_path / "graph.json")
+    assert main(["--data", corpus_path, "build-graph", "--json", out]) == 0
+    with open(out, 'r', encoding='utf-8') as f: written = json.load(f)
+    manager = TheoryDataManager(corpus_path)
+    manager.build_graph()
+    assert {node["id"] for node in written["nodes"]} == set(manager.graph.nodes)
+    assert {(edge["source"], edge["target"]) for edge in written["edges"]} == set(manager.graph.edges)
+
+
+def test_library_errors_become_an_exit_status(tmp_path, capsys):
+    path = str(tmp_path / "theory_data.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump([{"id": 1, "name": "Draft", "description": "", "complete": False, "constructs": [], "triples": [], "annotations": []}], f)
+    assert main(["--data", path, "build-graph", "--svg", str(tmp_path / "graph.svg")]) == 1
+    assert capsys.readouterr().err == "error: No completed theories to visualize.\n"
@@ -0,0 +1,95 @@
+import json
+
+import pytest
+
+from theory_core import ConstructResolver, TheoryDataManager, main
+
+
+@pytest.mark.parametrize("a, b", [
+    ("Injuctive norms", "Injunctive norms"),  # A dropped letter inside a word.
+    ("Behaviuor", "Behaviour"),  # Swapped neighbours.
+    ("Motivasion", "Motivation"),  # One substitution.
+    ("Subjective norm", "Subjective norms"),
+    ("Goal-setting", "Goal setting"),
+    ("Organisational behaviour", "organizational behavior"),
+    ("Behavioural intentions", "Behavioral intention"),
+])
+def test_spelled_alike_accepts_variants_and_typos(a, b):
+    assert ConstructResolver.spelled_alike(ConstructResolver.fold(a), ConstructResolver.fold(b))
+
+
+@pytest.mark.parametrize("a, b", [
+    ("Direct effect", "Indirect effect"),
+    ("Social norms", "Social support"),
+    ("Healthy behaviour", "Health behaviours"),  # A trailing letter makes a different word.
+    ("Norm", "Form"),  # Too short for a typo to be told from a different word.
+    ("Four factors", "For factors"),
+])
+def test_spelled_alike_rejects_different_words(a, b):
+    assert not ConstructResolver.spelled_alike(ConstructResolver.fold(a), ConstructResolver.fold(b))
+
+
+@pytest.mark.parametrize("word, folded", [
+    ("behaviour", "behavior"), ("behaviours", "behavior"), ("favourable", "favorable"),
+    ("four", "four"), ("hours", "hour"), ("your", "your"), ("source", "source"), ("journal", "journal"),
+])
+def test_only_the_british_our_ending_is_folded(word, folded):
+    assert ConstructResolver.fold_word(word) == folded
+
+
+def test_most_used_name_becomes_canonical():
+    pytest.importorskip("scipy")
+    proposals = ConstructResolver().propose({"Self-efficacy": 9, "Self efficacy": 2, "self-efficacy": 1, "Attitude": 4})
+    assert proposals == [{"alias": "Self efficacy", "canonical": "Self-efficacy", "similarity": proposals[0]["similarity"]},
+                         {"alias": "self-efficacy", "canonical": "Self-efficacy", "similarity": proposals[1]["similarity"]}]
+
+
+def test_bundled_corpus_proposals(corpus_path):
+    pytest.importorskip("scipy")
+    proposals = ConstructResolver().propose(TheoryDataManager(corpus_path).construct_name_counts())
+    pairs = {(p["alias"], p["canonical"]) for p in proposals}
+    assert ("Injuctive norms", "Injunctive norms") in pairs
+    assert not {pair for pair in pairs if {"Healthy behaviour", "Health behaviours"} <= set(pair)}
+
+
+def test_aliases_follow_chains_and_persist(corpus_path):
+    manager = TheoryDataManager(corpus_path)
+    manager.set_aliases({"a": "b", "b": "c", "x": "y", "y": "x"})
+    assert manager.aliases == {"a": "c", "b": "c"}
+    assert TheoryDataManager(corpus_path).aliases == {"a": "c", "b": "c"}
+
+
+def test_aliases_merge_graph_nodes(corpus_path):
+    manager = TheoryDataManager(corpus_path)
+    manager.build_graph()
+    counts = manager.construct_name_counts()
+    assert manager.graph.has_node("Injuctive norms")
+    manager.set_aliases({"Injuctive norms": "Injunctive norms"})
+    manager.build_graph()
+    assert not manager.graph.has_node("Injuctive norms")
+    assert manager.construct_name_counts()["Injunctive norms"] == counts["Injunctive norms"] + counts["Injuctive norms"]
+    theory_id = next(theory_id for theory_id, _, _ in manager.theory_summaries()
+                     if any(c["name"] == "Injuctive norms" for c in manager.get_theory(theory_id)["constructs"]))
+    assert manager.graph.has_edge(manager.get_theory(theory_id)["name"], "Injunctive norms")
+
+
+def test_cli_applies_only_the_reviewed_report(corpus_path, tmp_path, capsys):
+    pytest.importorskip("scipy")
+    report = str(tmp_path / "merges.json")
+    assert main(["--data", corpus_path, "resolve-constructs", "--report", report]) == 0
+    with open(report, 'r', encoding='utf-8') as f: proposals = json.load(f)
+    assert TheoryDataManager(corpus_path).aliases == {}
+    reviewed = proposals[1:]  # The reviewer deleted the first merge.
+    with open(report, 'w', encoding='utf-8') as f: json.dump(reviewed, f)
+    assert main(["--data", corpus_path, "resolve-constructs", "--apply", report]) == 0
+    assert TheoryDataManager(corpus_path).aliases == {p["alias"]: p["canonical"] for p in reviewed}
+    assert main(["--data", corpus_path, "resolve-constructs", "--reset"]) == 0
+    assert TheoryDataManager(corpus_path).aliases == {}
+
+
+def test_cli_refuses_a_report_of_the_wrong_shape(corpus_path, tmp_path, capsys):
+    report = str(tmp_path / "merges.json")
+    with open(report, 'w', encoding='utf-8') as f: json.dump({"Injuctive norms": "Injunctive norms"}, f)
+    assert main(["--data", corpus_path, "resolve-constructs", "--apply", report]) == 1
+    assert "as written by --report" in capsys.readouterr().err
+    assert TheoryDataManager(corpus_path).aliases == {}
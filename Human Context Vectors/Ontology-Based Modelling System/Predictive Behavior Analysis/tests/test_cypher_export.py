@@ -0,0 +1,48 @@
+import csv
+import json
+import os
+
+import pytest
+
+from theory_core import CypherExporter, TheoryDataManager, main
+
+
+@pytest.mark.parametrize("predicate, rel_type", [
+    ("influences", "INFLUENCES"), ("is part of", "IS_PART_OF"), ("leads-to", "LEADS_TO"),
+    ("", "RELATED_TO"), ("→", "RELATED_TO"), ("  ", "RELATED_TO"),
+])
+def test_relationship_type(predicate, rel_type):
+    assert CypherExporter.relationship_type(predicate) == rel_type
+
+
+def test_bulk_export_matches_the_per_theory_scripts(corpus_path, tmp_path):
+    manager = TheoryDataManager(corpus_path)
+    manager.set_aliases({"Injuctive norms": "Injunctive norms"})
+    odd = manager.get_theory(3)
+    odd["triples"].append({"subject": odd["constructs"][0]["name"], "predicate": "→", "object": odd["constructs"][1]["name"]})
+    odd["constructs"][0]["description"] = "It's quoted"
+    manager.update_theory(3, odd)
+    export_dir = str(tmp_path / "corpus")
+    exporter = CypherExporter()
+    counts = exporter.export_corpus(manager, export_dir, batch_size=50)
+    assert counts["theories"] == 76 and counts["batches"] > 4
+    assert exporter.verify_corpus_export(manager, export_dir) == []
+    with open(os.path.join(export_dir, "manifest.json"), 'r', encoding='utf-8') as f: kinds = [b["kind"] for b in json.load(f)["batches"]]
+    assert "triples:RELATED_TO" in kinds and kinds.index("has_construct") < kinds.index("triples:RELATED_TO")
+
+
+def test_a_tampered_export_is_reported(corpus_path, tmp_path):
+    manager = TheoryDataManager(corpus_path)
+    export_dir = str(tmp_path / "corpus")
+    exporter = CypherExporter()
+    exporter.export_corpus(manager, export_dir)
+    triples_csv = os.path.join(export_dir, "csv", "triples.csv")
+    with open(triples_csv, 'r', encoding='utf-8', newline='') as f: rows = list(csv.reader(f))
+    with open(triples_csv, 'w', encoding='utf-8', newline='') as f: csv.writer(f).writerows(rows[:-1])
+    differences = exporter.verify_corpus_export(manager, export_dir)
+    assert len(differences) == 1 and differences[0].startswith("CSV files: 1 edges differ")
+
+
+def test_cli_verifies_the_export(corpus_path, tmp_path, capsys):
+    assert main(["--data", corpus_path, "export-cypher", "--out", str(tmp_path / "corpus"), "--verify"]) == 0
+    assert capsys.readouterr().out.splitlines()[-1] == "Bulk export matches the per-theory scripts."
@@ -0,0 +1,73 @@
+import pytest
+
+from theory_core import TheoryDataManager
+
+
+def snapshot(graph):
+    return ({node: dict(data) for node, data in graph.nodes(data=True)},
+            {(u, v): dict(data) for u, v, data in graph.edges(data=True)})
+
+
+def full_rebuild(manager):
+    manager._reset_graph()
+    manager.build_graph()
+    return snapshot(manager.graph)
+
+
+def complete_ids(manager):
+    return [theory_id for theory_id, _, complete in manager.theory_summaries() if complete]
+
+
+@pytest.fixture
+def manager(corpus_path):
+    manager = TheoryDataManager(corpus_path)
+    manager.build_graph()
+    return manager
+
+
+def test_live_graph_matches_a_full_build(manager):
+    incremental = snapshot(manager.graph)
+    assert incremental[0] and incremental[1]
+    assert full_rebuild(manager) == incremental
+
+
+def test_edits_patch_the_graph_like_a_rebuild(manager):
+    first, second = complete_ids(manager)[:2]
+    shared = manager.get_theory(first)["constructs"][0]["name"]
+
+    theory = manager.get_theory(first)
+    theory["triples"] = theory["triples"][1:]
+    theory["constructs"][0]["description"] = "Rewritten"
+    theory["annotations"].append({"construct": shared, "relation": "R", "value": "v", "source": "1"})
+    manager.update_theory(first, theory)
+
+    theory = manager.get_theory(second)
+    theory["constructs"].append({"name": shared, "description": ""})
+    theory["triples"].append({"subject": shared, "predicate": "influences", "object": theory["constructs"][0]["name"]})
+    manager.stage_theory(theory)
+
+    incremental = snapshot(manager.graph)
+    assert incremental[0][shared]["description"] == "Rewritten"  # An empty description never hides a written one.
+    assert full_rebuild(manager) == incremental
+
+
+def test_uncompleting_a_theory_drops_only_what_it_alone_provided(manager):
+    theory_id = complete_ids(manager)[0]
+    theory = manager.get_theory(theory_id)
+    manager.update_theory(theory_id, dict(theory, complete=False))
+    incremental = snapshot(manager.graph)
+    assert theory["name"] not in incremental[0]
+    assert full_rebuild(manager) == incremental
+
+    manager.update_theory(theory_id, theory)
+    assert snapshot(manager.graph) == full_rebuild(manager)
+
+
+def test_reopened_store_builds_the_same_graph(manager, corpus_path):
+    theory_id = complete_ids(manager)[0]
+    theory = manager.get_theory(theory_id)
+    theory["triples"].append({"subject": "New cause", "predicate": "influences", "object": theory["constructs"][0]["name"]})
+    manager.update_theory(theory_id, theory)
+    reopened = TheoryDataManager(corpus_path)
+    reopened.build_graph()
+    assert snapshot(reopened.graph) == snapshot(manager.graph)
@@ -0,0 +1,71 @@
+import json
+import os
+import shutil
+
+from theory_core import IndexedTheoryDataManager, TheoryDataManager
+
+
+def test_sidecar_index_is_written_and_reused(corpus_path, monkeypatch):
+    manager = IndexedTheoryDataManager(corpus_path)
+    assert os.path.exists(manager.index_path)
+    assert manager.theory_summaries() == TheoryDataManager(corpus_path).theory_summaries()
+    assert manager.cache == {}  # The theory list comes from the index alone.
+
+    def rebuild(self): raise AssertionError("a current index was rebuilt")
+    monkeypatch.setattr(IndexedTheoryDataManager, "_build_index", rebuild)
+    reopened = IndexedTheoryDataManager(corpus_path)
+    assert reopened.index == manager.index
+    with open(corpus_path, 'r', encoding='utf-8') as f: corpus = json.load(f)
+    assert [reopened.get_theory(theory["id"]) for theory in corpus] == corpus
+
+
+def test_stale_index_is_rebuilt(corpus_path):
+    IndexedTheoryDataManager(corpus_path)
+    with open(corpus_path, 'r', encoding='utf-8') as f: corpus = json.load(f)
+    corpus[0]["name"] = "Théorie renamed outside the tool"  # Non-ASCII shifts every later byte offset.
+    with open(corpus_path, 'w', encoding='utf-8') as f: json.dump(corpus, f, indent=4, ensure_ascii=False)
+
+    reopened = IndexedTheoryDataManager(corpus_path)
+    assert reopened.theory_summaries()[0][1] == "Théorie renamed outside the tool"
+    assert [reopened.get_theory(theory["id"]) for theory in corpus] == corpus
+    with open(reopened.index_path, 'r', encoding='utf-8') as f: saved = json.load(f)
+    assert saved["theories"] == reopened.index
+
+
+def test_hydrated_theories_are_evicted_least_recent_first(corpus_path, monkeypatch):
+    monkeypatch.setattr(IndexedTheoryDataManager, "HYDRATED_LIMIT", 3)
+    manager = IndexedTheoryDataManager(corpus_path)
+    for theory_id in (1, 2, 3, 1, 4): manager.get_theory(theory_id)
+    assert list(manager.cache) == [3, 1, 4]
+
+    theory = manager.get_theory(5)
+    theory["description"] = "Edited description"
+    manager.update_theory(5, theory)
+    for theory_id in (6, 7, 8, 9): manager.get_theory(theory_id)
+    assert list(manager.cache) == [7, 8, 9]
+    assert manager.get_theory(5)["description"] == "Edited description"  # Edits stay pinned until saved.
+
+
+def test_save_matches_the_eager_layout(corpus_path, tmp_path):
+    TheoryDataManager(corpus_path).save_data()  # The bundled file has CRLF endings, which raw copies keep.
+    eager_path = str(tmp_path / "eager.json")
+    shutil.copyfile(corpus_path, eager_path)
+    lazy, eager = IndexedTheoryDataManager(corpus_path), TheoryDataManager(eager_path)
+    for manager in (lazy, eager):
+        theory = manager.get_theory(40)
+        theory["description"] = "Edited description"
+        manager.update_theory(40, theory)
+        manager.compact()
+    with open(corpus_path, 'rb') as f, open(eager_path, 'rb') as g: assert f.read() == g.read()
+    assert lazy.edited == {}
+    assert IndexedTheoryDataManager(corpus_path).get_theory(40)["description"] == "Edited description"
+
+
+def test_get_theory_hands_out_copies(corpus_path):
+    manager = IndexedTheoryDataManager(corpus_path)
+    manager.get_theory(3)["triples"].clear()
+    assert manager.get_theory(3)["triples"]  # A cached theory is not edited in place,
+    manager.update_theory(4, manager.get_theory(4))
+    manager.get_theory(4)["constructs"].clear()
+    assert manager.get_theory(4)["constructs"]  # nor is a pinned edit.
+    assert manager.journal_entries == 1
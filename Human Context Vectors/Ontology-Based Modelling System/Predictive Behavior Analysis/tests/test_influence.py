@@ -0,0 +1,62 @@
+import networkx as nx
+
+from theory_core import InfluenceIndex, TheoryDataManager, main
+
+
+def small_graph():
+    graph = nx.DiGraph()
+    graph.add_edge("Theory", "A", label="has_construct")
+    graph.add_edges_from([("A", "B"), ("B", "C"), ("C", "B"), ("C", "D"), ("E", "D")], label="influences")
+    return graph
+
+
+def test_queries_follow_influence_edges_only():
+    index = InfluenceIndex(small_graph())
+    assert "Theory" not in index.nodes()
+    assert index.descendants("A") == ["B", "C", "D"]
+    assert index.ancestors("D") == ["A", "B", "C", "E"]
+    assert index.reaches("B", "B") and not index.reaches("A", "A")
+    assert not index.reaches("D", "A") and not index.reaches("Nobody", "A")
+    assert index.feedback_loops() == [["B", "C"]]
+    assert index.feedback_loops("A") == []
+
+
+def test_paths_stay_between_the_endpoints():
+    index = InfluenceIndex(small_graph())
+    assert index.influence_paths("A", "D") == [["A", "B", "C", "D"]]
+    assert index.describe_path(["A", "B", "C"]) == "A -influences-> B -influences-> C"
+    assert index.influence_paths("D", "A") == []
+
+
+def test_edge_updates_rebuild_only_when_reachability_changes():
+    index = InfluenceIndex(small_graph())
+    index.descendants("A")
+    assert index.rebuilds == 1
+    index.update_edge("A", "C", "influences")  # C was already reachable from A.
+    assert not index.stale
+    index.update_edge("D", "A", "influences")
+    assert index.reaches("D", "A") and index.feedback_loops() == [["A", "B", "C", "D"]]
+    index.update_edge("D", "A", None)
+    assert not index.reaches("D", "A")
+    assert index.rebuilds == 3
+
+
+def test_live_index_matches_networkx_after_edits(corpus_path):
+    manager = TheoryDataManager(corpus_path)
+    index = manager.build_influence_index()
+    theory_id = next(theory_id for theory_id, _, complete in manager.theory_summaries() if complete)
+    theory = manager.get_theory(theory_id)
+    first, last = theory["constructs"][0]["name"], theory["constructs"][-1]["name"]
+    theory["triples"] = theory["triples"][1:] + [{"subject": last, "predicate": "influences", "object": first}]
+    manager.update_theory(theory_id, theory)
+
+    expected = nx.DiGraph((u, v) for u, v, d in manager.graph.edges(data=True) if d["label"] != "has_construct")
+    assert index.nodes() == sorted(expected)
+    for node in list(expected)[:200]:
+        assert index.descendants(node) == sorted(nx.descendants(expected, node))
+        assert index.ancestors(node) == sorted(nx.ancestors(expected, node))
+
+
+def test_cli_reports_unknown_constructs(corpus_path, capsys):
+    assert main(["--data", corpus_path, "influence", "No such construct"]) == 1
+    assert "has no influence edges" in capsys.readouterr().err
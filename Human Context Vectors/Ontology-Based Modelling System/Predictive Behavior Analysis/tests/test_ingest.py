@@ -0,0 +1,88 @@
+import json
+import os
+
+import pytest
+
+from theory_core import BulkIngestor, LLMProcessor, TheoryDataManager
+
+LOCAL = "Theory triples\nAttitude influences Intention\n\nTheory constructs and annotations\nAttitude []\nIntention []"
+LEFTOVER = LOCAL.replace("Intention\n\n", "Intention\nIntention and behaviour\n\n", 1)  # One line the parser cannot read.
+FALLBACK = json.dumps({"constructs": [{"name": "Behaviour", "description": ""}],
+                       "triples": [{"subject": "Intention", "predicate": "influences", "object": "Behaviour"}], "annotations": []})
+
+
+@pytest.fixture
+def manager(corpus_path, monkeypatch):
+    manager = TheoryDataManager(corpus_path)
+    manager.writes = []
+    update_theories = manager.update_theories
+    monkeypatch.setattr(manager, "update_theories", lambda theories: manager.writes.append([t["id"] for t in theories]) or update_theories(theories))
+    return manager
+
+
+def ingestor(manager, llm_server, progress):
+    return BulkIngestor(manager, lambda on_error: LLMProcessor("test-key", endpoint=llm_server.endpoint, error_handler=on_error),
+                        max_workers=2, requests_per_minute=0, progress=progress.append)
+
+
+def by_item(report):
+    return {entry["item"]: entry for entry in report}
+
+
+def test_directory_items_are_merged_in_one_write(manager, llm_server, tmp_path):
+    name = manager.get_theory(5)["name"]
+    source = tmp_path / "raw"
+    source.mkdir()
+    (source / "3.txt").write_text(LOCAL, encoding='utf-8')
+    (source / f"{name}.txt").write_text(LEFTOVER, encoding='utf-8')
+    (source / "Nobody.txt").write_text(LOCAL, encoding='utf-8')
+    (source / "notes.md").write_text(LOCAL, encoding='utf-8')
+    llm_server.replies = [FALLBACK]
+    progress = []
+    bulk = ingestor(manager, llm_server, progress)
+    report = by_item(bulk.run(bulk.load_items(str(source))))
+
+    assert {item: entry["status"] for item, entry in report.items()} == {"3": "ok", name: "ok", "Nobody": "unknown theory"}
+    assert report[name]["llm_lines"] == 1 and report["3"]["llm_lines"] == 0
+    assert llm_server.prompts[0].endswith("Theory triples\nIntention and behaviour")  # Only the leftover line is sent.
+    assert len(manager.writes) == 1 and sorted(manager.writes[0]) == [3, 5]
+    assert not os.path.exists(manager.journal_path)  # One save of the main file, not journal entries.
+    reopened = TheoryDataManager(manager.filepath)
+    assert reopened.get_theory(5)["triples"][-1] == {"subject": "Intention", "predicate": "influences", "object": "Behaviour"}
+    assert reopened.get_theory(3)["constructs"] == [{"name": "Attitude", "description": ""}, {"name": "Intention", "description": ""}]
+
+    assert progress[0] == "[skip] Nobody: no matching theory"
+    assert sorted(line.split(" ", 1)[0] for line in progress[1:3]) == ["[1/2]", "[2/2]"]
+    assert progress[-1] == "Committed 2 of 3 items."
+
+
+def test_jsonl_failures_and_duplicates_are_reported_per_item(manager, llm_server, tmp_path):
+    names = {theory_id: manager.get_theory(theory_id)["name"] for theory_id in (4, 6)}
+    source = tmp_path / "raw.jsonl"
+    with open(source, 'w', encoding='utf-8') as f:
+        for record in ({"theory_id": 3, "text": LOCAL}, {"theory": names[4], "text": LEFTOVER},
+                       {"theory_id": 6, "text": LOCAL}, {"theory": names[6], "text": LEFTOVER}, {"theory_id": 999, "text": LOCAL}):
+            f.write(json.dumps(record) + "\n")
+    original = {theory_id: manager.get_theory(theory_id) for theory_id in (4, 6)}
+    llm_server.replies = [400]
+    progress = []
+    bulk = ingestor(manager, llm_server, progress)
+    report = by_item(bulk.run(bulk.load_items(str(source))))
+
+    assert {item: entry["status"] for item, entry in report.items()} == {
+        "3": "ok", names[4]: "partial", "6": "duplicate theory", names[6]: "duplicate theory", "999": "unknown theory"}
+    assert report[names[4]]["errors"][0].startswith("Network Error") and report[names[4]]["unparsed_lines"] == [3]
+    assert report["6"]["errors"] == [f"theory 6 is also targeted by {names[6]}"]
+    assert len(llm_server.prompts) == 1  # Duplicates are never parsed.
+    assert manager.writes == [[3]]
+    assert {theory_id: manager.get_theory(theory_id) for theory_id in (4, 6)} == original
+    assert progress[-1] == "Committed 1 of 5 items."
+
+
+def test_an_item_that_raises_is_reported_as_failed(manager, tmp_path):
+    def broken_factory(on_error): raise RuntimeError("no processor")
+    progress = []
+    bulk = BulkIngestor(manager, broken_factory, progress=progress.append)
+    report = bulk.run([("3", 3, LOCAL)])
+    assert report == [{"item": "3", "theory_id": 3, "status": "failed", "errors": ["RuntimeError: no processor"]}]
+    assert manager.writes == [] and progress == ["[1/1] 3: failed (RuntimeError: no processor)", "Committed 0 of 1 items."]
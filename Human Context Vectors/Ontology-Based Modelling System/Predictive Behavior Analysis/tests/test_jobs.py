@@ -0,0 +1,88 @@
+import threading
+import time
+
+from theory_core import JobScheduler, RateLimiter
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def settled(scheduler):
+    return lambda: all(job["state"] not in ("queued", "running") for job in scheduler.snapshot())
+
+
+def blocker(scheduler):
+    """Submits a job that holds a worker until the returned event is set."""
+    release = threading.Event()
+    scheduler.submit("blocker", lambda job: release.wait(5))
+    wait_until(lambda: scheduler.snapshot()[0]["state"] == "running")
+    return release
+
+
+def test_jobs_run_by_priority_then_submission_order():
+    scheduler, ran = JobScheduler(max_workers=1), []
+    release = blocker(scheduler)
+    for label, priority in [("bulk", JobScheduler.BULK), ("first", JobScheduler.INTERACTIVE),
+                            ("chat", JobScheduler.CHAT), ("second", JobScheduler.INTERACTIVE)]:
+        scheduler.submit(label, lambda job: ran.append(job.label), priority=priority)
+    release.set()
+    wait_until(settled(scheduler))
+    assert ran == ["chat", "first", "second", "bulk"]
+    scheduler.shutdown()
+
+
+def test_keyed_jobs_are_not_queued_twice():
+    scheduler = JobScheduler(max_workers=1)
+    release = blocker(scheduler)
+    first = scheduler.submit("parse 3", lambda job: None, key=("parse", 3))
+    assert scheduler.submit("parse 3", lambda job: None, key=("parse", 3)) is first
+    assert scheduler.in_flight(("parse", 3)) is first
+    release.set()
+    wait_until(settled(scheduler))
+    assert scheduler.in_flight(("parse", 3)) is None
+    assert scheduler.submit("parse 3", lambda job: None, key=("parse", 3)) is not first
+    scheduler.shutdown()
+
+
+def test_worker_pool_is_bounded():
+    scheduler, lock, running, peak = JobScheduler(max_workers=2), threading.Lock(), [0], [0]
+
+    def work(job):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.02)
+        with lock: running[0] -= 1
+
+    for i in range(8): scheduler.submit(f"job {i}", work)
+    wait_until(settled(scheduler))
+    assert peak[0] == 2 and scheduler.workers <= 2
+    scheduler.shutdown()
+
+
+def test_completions_wait_for_drain_and_cancelled_jobs_report_nothing():
+    scheduler, delivered = JobScheduler(max_workers=1), []
+    release = blocker(scheduler)
+    done = scheduler.submit("done", lambda job: 42, on_done=delivered.append)
+    cancelled = scheduler.submit("cancelled", lambda job: delivered.append("ran"), on_done=delivered.append)
+    failed = scheduler.submit("failed", lambda job: 1 / 0, on_error=lambda e: delivered.append(type(e)))
+    scheduler.cancel(cancelled)
+    release.set()
+    wait_until(settled(scheduler))
+    assert delivered == []  # Nothing reaches the UI thread until it drains.
+    scheduler.drain()
+    assert delivered == [42, ZeroDivisionError]
+    assert (done.state, cancelled.state, failed.state) == ("done", "cancelled", "failed")
+    scheduler.shutdown()
+
+
+def test_rate_limiter_spaces_calls():
+    limiter = RateLimiter(60 * 50)  # One call every 20 ms.
+    assert limiter.acquire() == 0
+    waits = [limiter.acquire() for _ in range(3)]
+    assert all(0 < wait <= 0.02 + 1e-3 for wait in waits)
+    assert RateLimiter(0).acquire() == 0
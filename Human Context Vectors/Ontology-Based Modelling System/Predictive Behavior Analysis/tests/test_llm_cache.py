@@ -0,0 +1,68 @@
+import pytest
+
+from theory_core import LLMProcessor, LLMResponseCache
+from theory_core import llm
+
+DAY = 86400
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A settable time.time() for the cache, so recency and age do not depend on the wall clock."""
+    now = [1000.0]
+    monkeypatch.setattr(llm.time, "time", lambda: now[0])
+    return now
+
+
+def test_a_repeated_request_is_answered_from_disk(llm_server, tmp_path):
+    llm_server.replies = ["Hello", "Hello again"]
+    path = str(tmp_path / "cache.db")
+    client = LLMProcessor("test-key", endpoint=llm_server.endpoint, cache=LLMResponseCache(path))
+    assert client.make_api_call("Hi") == "Hello"
+    seen = []
+    assert client.make_api_call("Hi", on_text=seen.append) == "Hello" and seen == ["Hello"]
+    reopened = LLMProcessor("other-key", endpoint=llm_server.endpoint, cache=LLMResponseCache(path))
+    assert reopened.make_api_call("Hi") == "Hello"  # The key hashes the model and payload, not the API key.
+    assert llm_server.prompts == ["Hi"]
+    assert {k: client.cache.stats()[k] for k in ("entries", "hits", "misses")} == {"entries": 1, "hits": 1, "misses": 1}
+
+    client.forget("Hi")
+    assert client.make_api_call("Hi") == "Hello again"
+    assert llm_server.prompts == ["Hi", "Hi"]
+
+
+def test_errors_are_not_cached(llm_server, tmp_path):
+    llm_server.replies = [400, "Hello"]
+    client = LLMProcessor("test-key", endpoint=llm_server.endpoint, error_handler=lambda *e: None,
+                          cache=LLMResponseCache(str(tmp_path / "cache.db")))
+    assert client.make_api_call("Hi") is None
+    assert client.make_api_call("Hi") == "Hello"
+    assert len(llm_server.prompts) == 2
+
+
+def test_least_recently_used_entries_are_evicted_over_max_bytes(tmp_path, clock):
+    cache = LLMResponseCache(str(tmp_path / "cache.db"), max_bytes=10)
+    for key in ("a", "b"):
+        cache.put(key, "1234")
+        clock[0] += 1
+    assert cache.get("a") == "1234"  # Now "b" is the least recently used.
+    clock[0] += 1
+    cache.put("c", "5678")
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == ("1234", None, "5678")
+    assert cache.stats() == {"entries": 2, "bytes": 8, "hits": 3, "misses": 1, "evictions": 1}
+    clock[0] += 1
+    cache.put("d", "ä" * 5)  # Sizes are counted in UTF-8 bytes.
+    assert cache.stats()["entries"] == 1 and cache.get("d") == "ä" * 5
+
+
+def test_entries_expire_after_max_age(tmp_path, clock):
+    cache = LLMResponseCache(str(tmp_path / "cache.db"), max_age_days=1)
+    cache.put("old", "x")
+    clock[0] += DAY / 2
+    cache.put("new", "y")
+    assert cache.get("old") == "x"  # Using an entry does not extend its life.
+    clock[0] += DAY / 2 + 1
+    assert cache.get("old") is None and cache.stats()["entries"] == 1
+    clock[0] += DAY / 2
+    cache.put("newest", "z")  # Writing drops whatever has expired.
+    assert cache.stats()["entries"] == 1 and cache.get("newest") == "z"
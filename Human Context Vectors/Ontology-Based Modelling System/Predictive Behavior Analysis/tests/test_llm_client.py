@@ -0,0 +1,85 @@
+import threading
+import time
+
+import pytest
+
+from theory_core import LLMError, LLMProcessor
+from theory_core import llm
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Records backoff sleeps instead of waiting them out."""
+    slept = []
+    monkeypatch.setattr(llm.time, "sleep", slept.append)
+    return slept
+
+
+def processor(llm_server, **kwargs):
+    return LLMProcessor("test-key", endpoint=llm_server.endpoint, **kwargs)
+
+
+def test_a_429_is_retried_after_retry_after(llm_server, sleeps):
+    llm_server.replies = [429, "Hello"]
+    llm_server.retry_after = "2"
+    assert processor(llm_server).make_api_call("Hi") == "Hello"
+    assert llm_server.prompts == ["Hi", "Hi"]
+    assert sleeps == [2.0]  # At least the server's Retry-After, which is above the first jittered delay.
+
+
+def test_retries_give_up_with_a_network_error(llm_server, sleeps, monkeypatch):
+    monkeypatch.setattr(LLMProcessor, "MAX_RETRIES", 2)
+    llm_server.replies = [503, 503, 503]
+    with pytest.raises(LLMError) as raised: processor(llm_server).make_api_call("Hi")
+    assert raised.value.title == "Network Error" and "503" in raised.value.message
+    assert len(llm_server.prompts) == 3 and len(sleeps) == 2
+
+
+def test_client_errors_are_not_retried(llm_server, sleeps):
+    llm_server.replies = [400]
+    errors = []
+    assert processor(llm_server, error_handler=lambda *e: errors.append(e)).make_api_call("Hi") is None
+    assert len(llm_server.prompts) == 1 and sleeps == [] and errors[0][0] == "Network Error"
+
+
+def test_backoff_is_full_jitter_up_to_the_cap(monkeypatch):
+    client = LLMProcessor("test-key")
+    monkeypatch.setattr(llm.random, "uniform", lambda low, high: high)
+    assert [client._backoff_delay(attempt) for attempt in (0, 1, 3, 5, 10)] == [1.0, 2.0, 8.0, 30.0, 30.0]
+    assert client._backoff_delay(0, "45") == 45.0
+    assert client._backoff_delay(0, "Wed, 21 Oct 2026 07:28:00 GMT") == 1.0  # HTTP dates are not honoured.
+    monkeypatch.setattr(llm.random, "uniform", lambda low, high: low)
+    assert client._backoff_delay(3) == 0.0
+    monkeypatch.undo()
+    delays = [client._backoff_delay(2) for _ in range(200)]
+    assert all(0 <= delay <= 4 for delay in delays) and len(set(delays)) > 100
+
+
+def test_cancelling_during_backoff_stops_at_once(llm_server):
+    llm_server.replies = [503, "Hello"]
+    llm_server.retry_after = "30"
+    cancel = threading.Event()
+    threading.Timer(0.05, cancel.set).start()
+    started = time.monotonic()
+    assert processor(llm_server).make_api_call("Hi", cancel_event=cancel) is None
+    assert time.monotonic() - started < 5 and len(llm_server.prompts) == 1
+
+
+def test_stream_events_are_reported_as_they_arrive(llm_server):
+    llm_server.replies = [["Hel", "lo ", "wörld"]]
+    seen = []
+    assert processor(llm_server).make_api_call("Hi", on_text=seen.append) == "Hello wörld"
+    assert seen == ["Hel", "Hello ", "Hello wörld"]
+
+
+def test_a_stream_cancelled_mid_reply_returns_none(llm_server, tmp_path):
+    llm_server.replies = [["Hel", "lo ", "world"]]
+    cancel = threading.Event()
+    seen = []
+    def on_text(text):
+        seen.append(text)
+        cancel.set()
+    cache = llm.LLMResponseCache(str(tmp_path / "cache.db"))
+    assert processor(llm_server, cache=cache).make_api_call("Hi", on_text=on_text, cancel_event=cancel) is None
+    assert seen == ["Hel"]
+    assert cache.stats()["entries"] == 0  # A partial reply is never cached.
@@ -0,0 +1,126 @@
+import json
+
+import pytest
+
+from theory_core import LLMProcessor, PatchError, TheoryPatch
+
+THEORY = {"id": 1, "name": "T", "description": "", "complete": False,
+          "constructs": [{"name": "Attitude", "description": ""}, {"name": "Intention", "description": ""}],
+          "triples": [{"subject": "Attitude", "predicate": "influences", "object": "Intention"}],
+          "annotations": [{"construct": "Attitude", "relation": "R", "value": "v", "source": "1"}]}
+
+
+def test_patch_apply_edits_a_copy_and_lists_changes():
+    patch = TheoryPatch([
+        {"op": "test", "path": "/triples/0/object", "value": "Intention"},
+        {"op": "replace", "path": "/complete", "value": True},
+        {"op": "add", "path": "/constructs/-", "value": {"name": "Behaviour"}},
+        {"op": "add", "path": "/triples/-", "value": {"subject": "Intention", "predicate": "influences", "object": "Behaviour"}},
+        {"op": "replace", "path": "/annotations/0/value", "value": "w"},
+        {"op": "rename", "from": "Attitude", "to": "Attitudes"},
+        {"op": "remove", "path": "/triples", "match": {"object": "Behaviour"}},
+    ])
+    theory, changes = patch.apply(THEORY)
+    assert theory["complete"] is True
+    assert theory["constructs"] == [{"name": "Attitudes", "description": ""}, {"name": "Intention", "description": ""},
+                                    {"name": "Behaviour", "description": ""}]
+    assert theory["triples"] == [{"subject": "Attitudes", "predicate": "influences", "object": "Intention"}]
+    assert theory["annotations"] == [{"construct": "Attitudes", "relation": "R", "value": "w", "source": "1"}]
+    assert changes[0] == ("field", "complete", True)
+    assert changes[-1] == ("delete", "triples", 1)
+    assert THEORY["complete"] is False and len(THEORY["triples"]) == 1 and THEORY["constructs"][0]["name"] == "Attitude"
+
+
+@pytest.mark.parametrize("op", [
+    {"op": "test", "path": "/name", "value": "Other"},
+    {"op": "remove", "path": "/triples/5"},
+    {"op": "replace", "path": "/complete", "value": "yes"},
+    {"op": "add", "path": "/constructs/0", "value": {"label": "Attitude"}},
+    {"op": "remove", "path": "/annotations", "match": {"construct": "Nobody"}},
+    {"op": "rename", "from": "Nobody", "to": "Somebody"},
+])
+def test_patch_that_does_not_fit_changes_nothing(op):
+    patch = TheoryPatch([{"op": "replace", "path": "/name", "value": "Renamed"}, op])
+    with pytest.raises(PatchError, match="Operation 1"): patch.apply(THEORY)
+    assert THEORY["name"] == "T"
+
+
+def test_row_ops_report_their_changes():
+    theory, changes = TheoryPatch([
+        {"op": "add", "path": "/triples/0", "value": {"subject": "Norms", "predicate": "influences", "object": "Intention"}},
+        {"op": "replace", "path": "/triples/1", "value": {"subject": "Attitude", "predicate": "predicts", "object": "Intention"}},
+        {"op": "remove", "path": "/annotations/0"},
+        {"op": "replace", "path": "/constructs", "value": [{"name": "Norms"}]},
+    ]).apply(THEORY)
+    assert [t["subject"] for t in theory["triples"]] == ["Norms", "Attitude"]
+    assert theory["triples"][1]["predicate"] == "predicts" and theory["annotations"] == []
+    assert [change[0] for change in changes] == ["insert", "replace", "delete", "reset"]
+    assert changes[-1] == ("reset", "constructs", [{"name": "Norms", "description": ""}])
+
+
+def test_match_ops_act_on_every_matching_row():
+    theory = dict(THEORY, triples=THEORY["triples"] * 2 + [{"subject": "Intention", "predicate": "influences", "object": "Behaviour"}])
+    patched, changes = TheoryPatch([{"op": "replace", "path": "/triples", "match": {"subject": "Attitude"},
+                                     "value": {"predicate": "predicts"}}]).apply(theory)
+    assert [t["predicate"] for t in patched["triples"]] == ["predicts", "predicts", "influences"]
+    assert [change[:3] for change in changes] == [("replace", "triples", 0), ("replace", "triples", 1)]
+    patched, changes = TheoryPatch([{"op": "remove", "path": "/triples", "match": {"subject": "Attitude"}}]).apply(theory)
+    assert patched["triples"] == theory["triples"][2:]
+    assert changes == [("delete", "triples", 1), ("delete", "triples", 0)]  # Last first, so indexes stay valid.
+
+
+def test_rename_reaches_every_reference():
+    theory, changes = TheoryPatch([{"op": "rename", "from": "Intention", "to": "Intentions"}]).apply(THEORY)
+    assert theory["constructs"][1]["name"] == "Intentions" and theory["triples"][0]["object"] == "Intentions"
+    assert {(change[1], change[2]) for change in changes} == {("constructs", 1), ("triples", 0)}
+
+
+@pytest.mark.parametrize("ops", [
+    {"op": "add", "path": "/name", "value": "T"},  # Not a list.
+    [{"op": "move", "from": "/triples/0", "path": "/triples/1"}],
+    ["replace"],
+])
+def test_patch_must_be_a_list_of_known_ops(ops):
+    with pytest.raises(PatchError): TheoryPatch(ops)
+
+
+@pytest.mark.parametrize("op", [
+    {"op": "replace", "path": "/id", "value": 2},
+    {"op": "replace", "path": "/triples/0/weight", "value": "1"},
+    {"op": "replace", "path": "/triples/01", "value": {}},
+    {"op": "add", "path": "/triples/-", "value": {"subject": "A", "predicate": "influences", "object": 3}},
+    {"op": "add", "path": "/triples/-"},
+    {"op": "remove", "path": "/name"},
+    {"op": "rename", "from": "Attitude", "to": " "},
+])
+def test_ops_are_validated_against_the_theory(op):
+    with pytest.raises(PatchError): TheoryPatch([op]).apply(THEORY)
+
+
+def chat_reply(**reply):
+    return json.dumps(dict({"response": "Done."}, **reply))
+
+
+def test_chat_keeps_a_patch_that_applies(llm_server):
+    patch = [{"op": "replace", "path": "/complete", "value": True}]
+    llm_server.replies = [chat_reply(patch=patch)]
+    processor = LLMProcessor("test-key", endpoint=llm_server.endpoint)
+    assert processor.chat("Mark it complete", "{}", 1, theory=THEORY)["patch"] == patch
+    assert len(llm_server.prompts) == 1
+
+
+def test_chat_asks_for_the_full_object_when_a_patch_does_not_apply(llm_server):
+    full = dict(THEORY, name="Renamed")
+    llm_server.replies = [chat_reply(patch=[{"op": "remove", "path": "/triples/7"}]), chat_reply(updated_theory_data=full)]
+    processor = LLMProcessor("test-key", endpoint=llm_server.endpoint)
+    assert processor.chat("Rename it", "{}", 1, theory=THEORY)["updated_theory_data"] == full
+    assert len(llm_server.prompts) == 2
+    assert "Your previous patch could not be applied: Operation 0" in llm_server.prompts[1]
+    assert '"updated_theory_data"' in llm_server.prompts[1]
+
+
+def test_chat_without_a_theory_returns_the_reply_as_is(llm_server):
+    llm_server.replies = [chat_reply(patch=[{"op": "remove", "path": "/triples/7"}])]
+    processor = LLMProcessor("test-key", endpoint=llm_server.endpoint)
+    assert processor.chat("Remove it", "{}", 1)["patch"] == [{"op": "remove", "path": "/triples/7"}]
+    assert len(llm_server.prompts) == 1
@@ -0,0 +1,67 @@
+import copy
+
+import pytest
+
+from theory_core import TheoryDataManager, TheorySearchIndex
+
+
+@pytest.fixture
+def manager(corpus_path):
+    return TheoryDataManager(corpus_path)
+
+
+def state(index):
+    return index.postings, index.trigrams, index.rows, index.exact, index.theory_rows
+
+
+def test_exact_text_ranks_first(manager):
+    hits = manager.search("Self-efficacy", limit=5)
+    assert hits and all(hit["kind"] == "construct" and hit["text"] == "Self-efficacy" for hit in hits)
+    assert hits[0]["score"] == 2 * TheorySearchIndex.FIELD_WEIGHTS["name"] + TheorySearchIndex.EXACT_BONUS  # Two words.
+    assert [hit["theory_id"] for hit in hits] == sorted(hit["theory_id"] for hit in hits)  # Ties keep corpus order.
+
+
+def test_misspelt_and_partial_words_still_match(manager):
+    assert any(hit["text"] == "Self-efficacy" for hit in manager.search("self eficacy"))
+    assert any(hit["text"] == "Habits" for hit in manager.search("habbit"))
+    assert any("susceptibility" in hit["text"].lower() for hit in manager.search("susceptib"))
+
+
+def test_ontology_ids_match_whole_not_fuzzily(manager):
+    hits = manager.search("BCIO:006075")
+    assert hits and all(hit["kind"] == "annotation" and "BCIO:006075" in hit["text"] for hit in hits)
+    index = manager.build_search_index()
+    assert [token for token, _ in index.similar_tokens("bcio:006076")] == []  # A neighbouring id is not a typo.
+
+
+def test_rows_matching_every_word_come_before_partial_matches(manager):
+    hits = manager.search("perceived zyzzyva susceptibility")
+    assert hits and all(set(TheorySearchIndex.tokenize(hit["text"])) & {"perceived", "susceptibility"} for hit in hits)
+    hits = manager.search("perceived susceptibility", limit=100)
+    assert all({"perceived", "susceptibility"} <= set(TheorySearchIndex.tokenize(hit["text"])) for hit in hits[:10])
+
+
+def test_incremental_updates_equal_a_fresh_build(manager):
+    index = manager.build_search_index()
+    theory = manager.get_theory(3)
+    edited = copy.deepcopy(theory)
+    edited["constructs"].append({"name": "Zyzzyva uptake", "description": "A word no other theory uses"})
+    edited["triples"] = edited["triples"][2:]
+    manager.update_theory(3, edited)
+    assert manager.search("zyzzyva")[0]["text"] == "Zyzzyva uptake"
+
+    fresh = TheorySearchIndex()
+    fresh.build(manager.get_theory(theory_id) for theory_id, _, _ in manager.theory_summaries())
+    assert state(index) == state(fresh)
+
+    manager.update_theory(3, theory)
+    assert not manager.search("zyzzyva")
+    assert "zyzzyva" not in index.postings and not any("zyzzyva" in tokens for tokens in index.trigrams.values())
+
+
+def test_removing_a_theory_drops_its_rows(manager):
+    index = manager.build_search_index()
+    index.remove_theory(3)
+    assert 3 not in index.theory_rows
+    assert all(theory_id != 3 for theory_id, *_ in index.rows.values())
+    assert not any(hit["theory_id"] == 3 for hit in index.search("Self-efficacy", limit=100))
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from theory_core import BehaviorSimulator, TheoryDataManager, TheoryToolError
+
+pytest.importorskip("scipy")
+
+
+def activation(simulator, scenario):
+    return dict(zip(simulator.nodes, simulator.propagate([scenario])[:, 0]))
+
+
+def test_activation_keeps_the_sign_of_each_path():
+    simulator = BehaviorSimulator([("A", "B", "positively influences"), ("B", "C", "positively influences"),
+                                   ("A", "D", "negatively influences"), ("D", "E", "negatively influences")])
+    result = activation(simulator, {"A": 1})
+    assert result["A"] == 1
+    assert 0 < result["C"] < result["B"]
+    assert result["D"] < 0 < result["E"]
+    flipped = activation(simulator, {"A": -1})
+    assert all(flipped[node] == pytest.approx(-value) for node, value in result.items())
+
+
+def test_feedback_loops_settle():
+    simulator = BehaviorSimulator([("A", "B", "influences"), ("B", "C", "influences"), ("C", "B", "influences")])
+    settled = simulator.propagate([{"A": 1}], steps=500)
+    assert np.all(np.abs(settled) <= 1)
+    assert np.allclose(simulator.propagate([{"A": 1}], steps=1000), settled, atol=1e-5)
+
+
+def test_scenarios_are_independent_columns():
+    simulator = BehaviorSimulator([("A", "C", "influences"), ("B", "C", "negatively influences")])
+    batch = simulator.propagate([{"A": 1}, {"B": 1}, {"A": 1, "B": 1}])
+    for j, scenario in enumerate([{"A": 1}, {"B": 1}, {"A": 1, "B": 1}]):
+        assert np.allclose(batch[:, j], simulator.propagate([scenario])[:, 0])
+
+
+def test_simulate_ranks_other_constructs_by_effect():
+    simulator = BehaviorSimulator([("A", "B", "positively influences"), ("A", "C", "may influence")])
+    ranked = simulator.simulate({"A": 1})
+    assert [node for node, _ in ranked] == ["B", "C"]
+    with pytest.raises(TheoryToolError): simulator.simulate({"Nobody": 1})
+
+
+def test_sweep_sorts_interventions_by_total_effect():
+    simulator = BehaviorSimulator([("A", "B", "positively influences"), ("B", "C", "positively influences")])
+    results = simulator.sweep()
+    assert [r["intervention"] for r in results] == ["A", "B", "C"]
+    assert results[-1]["total_effect"] == 0 and results[-1]["top"] == []
+
+
+def test_corpus_theory_compiles(corpus_path):
+    manager = TheoryDataManager(corpus_path)
+    theory_id = next(theory_id for theory_id, _, complete in manager.theory_summaries() if complete)
+    simulator = BehaviorSimulator.from_theory(manager.get_theory(theory_id))
+    assert simulator.matrix.shape == (len(simulator.nodes),) * 2
+    row_weights = np.asarray(abs(simulator.matrix).sum(axis=1)).ravel()
+    assert np.all((np.isclose(row_weights, 1)) | (row_weights == 0))  # In-weights are normalized.
+
+
+def test_a_theory_without_influence_edges_is_refused():
+    with pytest.raises(TheoryToolError, match="no influence edges"):
+        BehaviorSimulator([("Theory", "A", BehaviorSimulator.STRUCTURAL_LABEL), ("A", "A", "influences")])
+
+
+def test_a_construct_clamped_to_zero_blocks_its_path():
+    simulator = BehaviorSimulator([("A", "B", "positively influences"), ("B", "C", "positively influences")])
+    result = activation(simulator, {"A": 1, "B": 0})
+    assert result["B"] == 0 and result["C"] == 0
+    assert activation(simulator, {"A": 1})["C"] > 0
+
+
+def test_sweep_totals_leave_out_the_clipped_intervention():
+    simulator = BehaviorSimulator([("A", "B", "positively influences"), ("B", "C", "negatively influences")])
+    strong = {r["intervention"]: r["total_effect"] for r in simulator.sweep(value=5)}
+    assert strong == pytest.approx({r["intervention"]: r["total_effect"] for r in simulator.sweep(value=1)})
+    settled = activation(simulator, {"A": 1})
+    assert strong["A"] == pytest.approx(abs(settled["B"]) + abs(settled["C"]))
+    assert strong["C"] == 0 and all(total >= 0 for total in strong.values())
@@ -0,0 +1,93 @@
+import json
+import os
+import sqlite3
+
+from conftest import BUNDLED_DATA
+from theory_core import SQLiteTheoryDataManager, TheoryDataManager
+
+
+def test_import_keeps_every_theory(tmp_path):
+    manager = SQLiteTheoryDataManager(str(tmp_path / "theory_data.db"), BUNDLED_DATA)
+    reference = TheoryDataManager(BUNDLED_DATA)
+    assert manager.theory_summaries() == reference.theory_summaries()
+    for theory_id in (1, 15, 76):
+        theory, expected = manager.get_theory(theory_id), reference.get_theory(theory_id)
+        for key in ("name", "constructs", "triples", "annotations"): assert theory[key] == expected[key]
+
+
+def test_edits_survive_reopening(tmp_path):
+    db = str(tmp_path / "theory_data.db")
+    manager = SQLiteTheoryDataManager(db, BUNDLED_DATA)
+    theory = manager.get_theory(3)
+    theory["triples"].append({"subject": "A", "predicate": "influences", "object": "B"})
+    manager.update_theory(3, theory)
+    manager.conn.close()
+    reopened = SQLiteTheoryDataManager(db, os.devnull)
+    assert reopened.get_theory(3)["triples"][-1] == {"subject": "A", "predicate": "influences", "object": "B"}
+
+
+def test_import_export_reproduces_bundled_file(tmp_path):
+    manager = SQLiteTheoryDataManager(str(tmp_path / "theory_data.db"), BUNDLED_DATA)
+    out = str(tmp_path / "exported.json")
+    manager.export_json(out)
+    with open(BUNDLED_DATA, 'r', encoding='utf-8') as f: bundled = json.load(f)
+    with open(out, 'r', encoding='utf-8') as f: exported = json.load(f)
+    assert exported == bundled
+    assert "picture_path" not in manager.get_theory(15)
+    with open(BUNDLED_DATA, 'rb') as f, open(out, 'rb') as g:
+        assert g.read() == f.read().replace(b"\r\n", b"\n")  # The checked-out file may have Windows line endings.
+
+
+def test_queries_run_in_the_database(tmp_path):
+    manager = SQLiteTheoryDataManager(str(tmp_path / "theory_data.db"), BUNDLED_DATA)
+    name = manager.get_theory(3)["constructs"][0]["name"]
+    assert 3 in manager.theories_with_construct(name)
+    assert all(name in (subject, obj) for _, subject, _, obj in manager.triples_involving(name))
+
+
+def test_old_not_null_picture_path_is_migrated(tmp_path):
+    db = str(tmp_path / "old.db")
+    conn = sqlite3.connect(db)
+    conn.executescript(SQLiteTheoryDataManager.SCHEMA.replace("picture_path TEXT,", "picture_path TEXT NOT NULL DEFAULT '',"))
+    conn.execute("INSERT INTO theories VALUES (1, 'Old', '', 'a.png', 1)")
+    conn.execute("INSERT INTO constructs VALUES (1, 0, 'Attitude', '')")
+    conn.commit()
+    conn.close()
+    manager = SQLiteTheoryDataManager(db, os.devnull)
+    assert manager.get_theory(1)["picture_path"] == "a.png"
+    assert manager.get_theory(1)["constructs"] == [{"name": "Attitude", "description": ""}]
+    manager.import_theories([{"id": 2, "name": "New", "description": "", "complete": False, "constructs": [], "triples": [], "annotations": []}])
+    assert "picture_path" not in manager.get_theory(2)
+
+
+def test_get_theory_hands_out_copies(tmp_path):
+    manager = SQLiteTheoryDataManager(str(tmp_path / "theory_data.db"), BUNDLED_DATA)
+    manager.get_theory(3)["triples"].clear()
+    assert manager.get_theory(3)["triples"]
+    manager.save_data()
+    assert SQLiteTheoryDataManager(manager.filepath, os.devnull).get_theory(3)["triples"]
+
+
+def test_save_writes_committed_theories_only(tmp_path):
+    db = str(tmp_path / "theory_data.db")
+    manager = SQLiteTheoryDataManager(db, BUNDLED_DATA)
+    committed, staged = manager.get_theory(3), manager.get_theory(4)
+    committed["description"] = staged["description"] = "Edited description"
+    manager.update_theory(3, committed)
+    manager.stage_theory(staged)
+    manager.save_data()
+    reopened = SQLiteTheoryDataManager(db, os.devnull)
+    assert reopened.get_theory(3)["description"] == "Edited description"
+    assert reopened.get_theory(4)["description"] != "Edited description"
+    manager.update_theory(4, staged)  # Committing it later writes it after all.
+    assert SQLiteTheoryDataManager(db, os.devnull).get_theory(4)["description"] == "Edited description"
+
+
+def test_renamed_theory_no_longer_answers_to_its_old_name(tmp_path):
+    manager = SQLiteTheoryDataManager(str(tmp_path / "theory_data.db"), BUNDLED_DATA)
+    theory = manager.get_theory(3)
+    old_name, theory["name"] = theory["name"], "Renamed theory"
+    manager.stage_theory(theory)
+    assert manager.find_theory_id(old_name) is None
+    assert manager.find_theory_id("Renamed theory") == 3
+    assert manager.find_theory_id(manager.get_theory(5)["name"]) == 5
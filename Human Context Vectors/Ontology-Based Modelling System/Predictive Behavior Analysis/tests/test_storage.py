@@ -0,0 +1,129 @@
+import json
+import os
+
+import pytest
+
+from conftest import BUNDLED_DATA
+from theory_core import CompactTheory, IndexedTheoryDataManager, StringPool, TheoryDataManager
+
+MANAGERS = [TheoryDataManager, IndexedTheoryDataManager]
+
+
+def edited(manager, theory_id):
+    theory = manager.get_theory(theory_id)
+    theory["description"] = "Edited description"
+    theory["triples"] = theory["triples"] + [{"subject": "A", "predicate": "influences", "object": "B"}]
+    return theory
+
+
+@pytest.mark.parametrize("manager_class", MANAGERS)
+def test_journal_is_replayed_on_reopen(corpus_path, manager_class):
+    with open(corpus_path, 'rb') as f: original = f.read()
+    manager = manager_class(corpus_path)
+    theory = edited(manager, 3)
+    manager.update_theory(3, theory)
+    assert manager.journal_entries == 1
+    with open(corpus_path, 'rb') as f: assert f.read() == original  # A single save only appends to the journal.
+
+    reopened = manager_class(corpus_path)
+    assert reopened.journal_entries == 1
+    assert reopened.get_theory(3) == theory
+    assert reopened.get_theory(4) == manager.get_theory(4)
+
+
+@pytest.mark.parametrize("manager_class", MANAGERS)
+def test_compact_folds_the_journal_into_the_main_file(corpus_path, manager_class):
+    manager = manager_class(corpus_path)
+    first, second = edited(manager, 3), edited(manager, 40)
+    manager.update_theory(3, first)
+    manager.update_theory(40, second)
+    manager.compact()
+    assert not os.path.exists(manager.journal_path)
+    assert manager.journal_entries == 0
+
+    with open(corpus_path, 'r', encoding='utf-8') as f: saved = json.load(f)
+    assert saved[2] == first and saved[39] == second
+    reopened = manager_class(corpus_path)
+    assert reopened.journal_entries == 0
+    assert reopened.get_theory(3) == first and reopened.get_theory(40) == second
+
+
+def test_torn_journal_line_is_cut_off(corpus_path):
+    manager = TheoryDataManager(corpus_path)
+    theory = edited(manager, 3)
+    manager.update_theory(3, theory)
+    with open(manager.journal_path, 'a', encoding='utf-8') as f: f.write('{"id": 4, "name": "Tor')
+
+    reopened = TheoryDataManager(corpus_path)
+    assert reopened.journal_entries == 1
+    assert reopened.get_theory(3) == theory
+    with open(manager.journal_path, 'r', encoding='utf-8') as f: assert f.read().endswith("}\n")
+
+
+def test_journal_compacts_itself_after_enough_entries(corpus_path, monkeypatch):
+    monkeypatch.setattr(TheoryDataManager, "COMPACT_AFTER_ENTRIES", 3)
+    manager = TheoryDataManager(corpus_path)
+    for theory_id in (1, 2, 3): manager.update_theory(theory_id, edited(manager, theory_id))
+    assert manager.journal_entries == 0
+    assert not os.path.exists(manager.journal_path)
+
+
+def test_update_theories_writes_once_and_clears_the_journal(corpus_path):
+    manager = TheoryDataManager(corpus_path)
+    manager.update_theory(5, edited(manager, 5))
+    batch = [edited(manager, 6), edited(manager, 7)]
+    manager.update_theories(batch)
+    assert not os.path.exists(manager.journal_path)
+    with open(corpus_path, 'r', encoding='utf-8') as f: saved = json.load(f)
+    assert saved[4]["description"] == "Edited description" and saved[5:7] == batch
+
+
+def test_corpus_is_stored_compactly_and_reads_back_unchanged(corpus_path):
+    with open(BUNDLED_DATA, 'r', encoding='utf-8') as f: bundled = json.load(f)
+    manager = TheoryDataManager(corpus_path)
+    assert all(isinstance(theory, CompactTheory) for theory in manager.theories)
+    assert [manager.get_theory(theory["id"]) for theory in bundled] == bundled
+    assert len(manager.pool) < sum(len(theory[key]) for theory in bundled for key in CompactTheory.RECORD_FIELDS)
+    manager.save_data()
+    with open(corpus_path, 'r', encoding='utf-8') as f: assert json.load(f) == bundled
+
+
+def test_get_theory_hands_out_copies(corpus_path):
+    manager = TheoryDataManager(corpus_path)
+    manager.get_theory(3)["triples"].clear()
+    assert manager.get_theory(3)["triples"]
+    manager.theories[3] = {"id": 4, "name": "Loose", "constructs": [{"name": "A", "description": ""}]}
+    manager.get_theory(4)["constructs"].clear()  # A theory kept as a plain dict is copied too.
+    assert manager.get_theory(4)["constructs"]
+
+
+def test_annotations_group_on_interned_ids(corpus_path):
+    manager = TheoryDataManager(corpus_path)
+    theory = manager.get_theory(3)
+    expected = {}
+    for annotation in theory["annotations"]: expected.setdefault(annotation["construct"], []).append(annotation)
+    assert manager.theories[2].annotations_by_construct() == expected
+
+
+def test_records_that_would_not_round_trip_stay_plain():
+    pool = StringPool()
+    theory = {"id": 1, "name": "T", "description": "", "complete": True,
+              "constructs": [{"name": "A", "description": "d"}],
+              "triples": [{"subject": "A", "predicate": "influences", "object": "B"}],
+              "annotations": []}
+    assert CompactTheory.pack(theory, pool).to_dict() == theory
+    odd = dict(theory, triples=[{"subject": "A", "predicate": "influences", "object": "B", "note": "extra"}])
+    assert CompactTheory.pack(odd, pool) is odd  # A row with an extra field keeps the theory a plain dict.
+    numeric = dict(theory, constructs=[{"name": "A", "description": 3}])
+    assert CompactTheory.pack(numeric, pool) is numeric
+
+
+def test_reordered_rows_are_packed():
+    theory = {"id": 1, "name": "T", "description": "", "complete": True,
+              "constructs": [{"description": "d", "name": "A"}],
+              "triples": [{"object": "B", "subject": "A", "predicate": "influences"}],
+              "annotations": []}
+    packed = CompactTheory.pack(theory, StringPool())
+    assert isinstance(packed, CompactTheory)
+    assert packed.to_dict() == theory
+    assert list(packed.to_dict()["triples"][0]) == list(CompactTheory.RECORD_FIELDS["triples"])
@@ -0,0 +1,66 @@
+import csv
+import os
+
+import networkx as nx
+import pytest
+
+from theory_core import TableExporter, TheoryDataManager, TheoryToolError, main
+
+
+def read_csv(export_dir, table):
+    with open(os.path.join(export_dir, table + ".csv"), 'r', encoding='utf-8', newline='') as f: return list(csv.DictReader(f))
+
+
+def test_csv_tables_hold_every_row(corpus_path, tmp_path):
+    manager = TheoryDataManager(corpus_path)
+    manager.set_aliases({"Injuctive norms": "Injunctive norms"})
+    export_dir = str(tmp_path / "tables")
+    counts = TableExporter().export_corpus(manager, export_dir)
+    theories = [manager.get_theory(theory_id) for theory_id, _, _ in manager.theory_summaries()]
+    assert counts["theories"] == len(theories) == 76
+    for table in ("constructs", "triples", "annotations"):
+        assert counts[table] == sum(len(theory[table]) for theory in theories)
+        assert len(read_csv(export_dir, table)) == counts[table]
+    assert (counts["graph_nodes"], counts["graph_edges"]) == (manager.graph.number_of_nodes(), manager.graph.number_of_edges())
+
+    triples = read_csv(export_dir, "triples")
+    first = theories[0]["triples"][0]
+    assert (triples[0]["theory_id"], triples[0]["position"], triples[0]["subject"]) == (str(theories[0]["id"]), "0", first["subject"])
+    aliased = [row for row in read_csv(export_dir, "constructs") if row["name"] == "Injuctive norms"]
+    assert aliased and all(row["canonical_name"] == "Injunctive norms" for row in aliased)
+
+
+def test_columnar_formats_match_csv(corpus_path, tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+    export_dir = str(tmp_path / "tables")
+    TableExporter(chunk_rows=100).export_corpus(TheoryDataManager(corpus_path), export_dir, formats=("csv", "parquet", "arrow"), graphml=False)
+    for table in ("triples", "graph_nodes"):
+        parquet = pq.read_table(os.path.join(export_dir, table + ".parquet"))
+        with pa.memory_map(os.path.join(export_dir, table + ".arrow")) as source: arrow = pa.ipc.open_file(source).read_all()
+        assert arrow.to_pylist() == parquet.to_pylist()
+        as_text = [{k: str(v) for k, v in row.items()} for row in parquet.to_pylist()]
+        assert as_text == read_csv(export_dir, table)
+    assert pa.types.is_dictionary(parquet.schema.field("node").type)  # Name columns are dictionary-encoded,
+    assert parquet.schema.field("description").type == pa.string()  # text columns are not.
+
+
+def test_graphml_reads_back(corpus_path, tmp_path):
+    manager = TheoryDataManager(corpus_path)
+    export_dir = str(tmp_path / "tables")
+    TableExporter().export_corpus(manager, export_dir)
+    graph = nx.read_graphml(os.path.join(export_dir, "graph.graphml"))
+    assert (graph.number_of_nodes(), graph.number_of_edges()) == (manager.graph.number_of_nodes(), manager.graph.number_of_edges())
+    node, data = next((n, d) for n, d in manager.graph.nodes(data=True) if d.get("annotations"))
+    assert graph.nodes[node]["annotations"] == "\n".join(data["annotations"])
+
+
+def test_unknown_format_is_refused(corpus_path, tmp_path):
+    with pytest.raises(TheoryToolError, match="Unknown table format"):
+        TableExporter().export_corpus(TheoryDataManager(corpus_path), str(tmp_path), formats=("xlsx",))
+
+
+def test_cli_writes_csv_and_graphml(corpus_path, tmp_path):
+    out = str(tmp_path / "tables")
+    assert main(["--data", corpus_path, "export-tables", "--out", out]) == 0
+    assert sorted(os.listdir(out)) == sorted([table + ".csv" for table in TableExporter.TABLES] + ["graph.graphml"])
@@ -0,0 +1,59 @@
+import os
+
+import pytest
+
+from theory_core import ThumbnailCache
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def picture(path, size=(1000, 600), color="red", fmt=None, mode="RGB"):
+    Image.new(mode, size, color).save(path, fmt)
+    return str(path)
+
+
+@pytest.mark.parametrize("name, mode", [("big.jpg", "RGB"), ("big.png", "RGBA"), ("big.gif", "P")])
+def test_thumbnails_fit_the_quantized_box(tmp_path, name, mode):
+    cache = ThumbnailCache(str(tmp_path / "cache"))
+    thumb = cache.thumbnail(picture(tmp_path / name, mode=mode), (300, 250))
+    assert ThumbnailCache.quantize((300, 250)) == (288, 224)
+    assert thumb.width <= 288 and thumb.height <= 224 and max(thumb.width / 288, thumb.height / 224) > 0.95
+    assert thumb.mode in ("RGB", "RGBA")
+
+
+def test_second_request_is_a_disk_hit_until_the_picture_changes(tmp_path):
+    cache = ThumbnailCache(str(tmp_path / "cache"))
+    path = picture(tmp_path / "p.png")
+    first = cache.thumbnail(path, (200, 200))
+    assert cache.thumbnail(path, (210, 220)).tobytes() == first.tobytes()  # The same quantized box.
+    assert (cache.hits, cache.misses) == (1, 1)
+    picture(tmp_path / "p.png", size=(900, 900), color="blue")
+    assert cache.thumbnail(path, (200, 200)).size == (192, 192)
+    assert cache.misses == 2
+
+
+def test_truncated_cache_file_is_decoded_again(tmp_path):
+    cache = ThumbnailCache(str(tmp_path / "cache"))
+    path = picture(tmp_path / "p.png")
+    cache.thumbnail(path, (200, 200))
+    with open(cache.cache_path(ThumbnailCache.signature(path), ThumbnailCache.quantize((200, 200))), 'wb') as f: f.write(b"\x89PNG")
+    assert cache.thumbnail(path, (200, 200)).size == (192, 115)
+    assert cache.misses == 2
+
+
+def test_missing_picture_raises(tmp_path):
+    with pytest.raises(FileNotFoundError): ThumbnailCache(str(tmp_path / "cache")).thumbnail(str(tmp_path / "gone.png"), (100, 100))
+
+
+def test_prune_drops_the_oldest_thumbnails(tmp_path):
+    cache = ThumbnailCache(str(tmp_path / "cache"))
+    paths = [picture(tmp_path / f"{i}.png", color=(i * 40, 0, 0)) for i in range(4)]
+    for i, path in enumerate(paths):
+        cache.thumbnail(path, (200, 200))
+        stored = cache.cache_path(ThumbnailCache.signature(path), (192, 192))
+        os.utime(stored, (i, i))
+    sizes = [os.path.getsize(cache.cache_path(ThumbnailCache.signature(p), (192, 192))) for p in paths]
+    cache.max_bytes = sum(sizes[2:])
+    assert cache.prune() == sum(sizes[2:])
+    kept = [os.path.exists(cache.cache_path(ThumbnailCache.signature(p), (192, 192))) for p in paths]
+    assert kept == [False, False, True, True]
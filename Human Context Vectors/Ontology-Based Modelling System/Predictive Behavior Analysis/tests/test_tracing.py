@@ -0,0 +1,76 @@
+import json
+import urllib.request
+
+import pytest
+
+from theory_core import Metrics, TheoryDataManager, metrics
+
+
+@pytest.fixture
+def global_metrics():
+    metrics.reset()
+    metrics.enable()
+    yield metrics
+    metrics.disable()
+    metrics.reset()
+
+
+def summary(snapshot, name):
+    return next(s for s in snapshot["summaries"] if s["name"] == name)
+
+
+def test_disabled_metrics_record_nothing():
+    m = Metrics()
+    with m.span("work") as span: span.set(size=3)
+    m.count("calls_total")
+    m.observe("bytes", 10)
+    assert m.snapshot() == {"enabled": False, "counters": [], "summaries": [], "recent": []}
+
+
+def test_spans_update_summaries_and_count_failures(tmp_path):
+    m = Metrics()
+    log = tmp_path / "trace.log"
+    m.enable(str(log))
+    with m.span("call", kind="chat") as span: span.set(theory_id=3)
+    with pytest.raises(ValueError):
+        with m.span("call", kind="chat"): raise ValueError
+    m.count("retries_total", 2, kind="chat")
+    snapshot = m.snapshot()
+    assert summary(snapshot, "call_seconds")["count"] == 2
+    assert summary(snapshot, "call_seconds")["labels"] == {"kind": "chat"}
+    assert {(c["name"], c["value"]) for c in snapshot["counters"]} == {("call_errors_total", 1), ("retries_total", 2)}
+    assert snapshot["recent"][0]["theory_id"] == 3 and snapshot["recent"][1]["failed"] is True
+    records = [json.loads(line) for line in log.read_text(encoding='utf-8').splitlines()]
+    assert [r["span"] for r in records] == ["call", "call"] and records[0]["kind"] == "chat"
+
+
+def test_prometheus_text_escapes_labels():
+    m = Metrics()
+    m.enable()
+    m.count("calls_total", kind='say "hi"')
+    m.observe("bytes", 4)
+    m.observe("bytes", 6)
+    assert m.prometheus_text().splitlines() == [
+        'theory_tool_calls_total{kind="say \\"hi\\""} 1',
+        "theory_tool_bytes_count 2", "theory_tool_bytes_sum 10.0", "theory_tool_bytes_max 6"]
+
+
+def test_endpoint_serves_both_formats():
+    m = Metrics()
+    m.enable()
+    m.count("calls_total")
+    port = m.serve(0)
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as response: assert b"theory_tool_calls_total 1" in response.read()
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics.json") as response: assert json.load(response)["counters"][0]["value"] == 1
+    finally: m.stop_serving()
+
+
+def test_storage_paths_are_instrumented(corpus_path, global_metrics):
+    manager = TheoryDataManager(corpus_path)
+    manager.update_theory(3, manager.get_theory(3))
+    manager.build_graph()
+    names = {s["name"] for s in global_metrics.snapshot()["summaries"]}
+    assert {"load_data_seconds", "journal_append_seconds", "build_graph_seconds"} <= names
+    load = next(r for r in global_metrics.snapshot()["recent"] if r["span"] == "load_data")
+    assert load["theories"] == 76
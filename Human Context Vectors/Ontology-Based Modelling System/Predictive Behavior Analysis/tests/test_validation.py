@@ -0,0 +1,93 @@
+import json
+
+from theory_core import CompactTheory, StringPool, TheoryDataManager, TheoryValidator, main
+
+
+def theory(theory_id=1, annotations=(("BCIO:006075", "threat"),), **fields):
+    return dict({"id": theory_id, "name": f"T{theory_id}", "description": "", "complete": True,
+                 "constructs": [{"name": "Attitude", "description": ""}, {"name": "Intention", "description": ""}],
+                 "triples": [{"subject": "Attitude", "predicate": "influences", "object": "Intention"}],
+                 "annotations": [{"construct": "Attitude", "relation": relation, "value": value, "source": "1 2"}
+                                 for relation, value in annotations]}, **fields)
+
+
+def found(issues):
+    return {(issue["severity"], issue["section"], issue["row"], issue["field"]) for issue in issues}
+
+
+def test_a_clean_theory_has_no_issues():
+    assert TheoryValidator().check(theory()) == []
+
+
+def test_schema_errors_point_at_the_row():
+    broken = theory(name=3, triples=[{"subject": "Attitude", "predicate": "influences"}, "Attitude influences Intention"])
+    assert found(TheoryValidator().check(broken)) == {("error", None, None, "name"), ("error", "triples", 0, None), ("error", "triples", 1, None)}
+    assert found(TheoryValidator().check(theory(constructs="Attitude"))) == {("error", None, None, "constructs")}
+    assert found(TheoryValidator().check(theory(), theory_id=2)) == {("error", None, None, "id")}
+
+
+def test_references_and_formats_are_warnings():
+    odd = theory(triples=[{"subject": "Attitude", "predicate": "causes", "object": "Behaviour"}],
+                 annotations=[("not an id", "x")])
+    odd["annotations"][0]["source"] = "page 3"
+    assert found(TheoryValidator().check(odd)) == {
+        ("warning", "triples", 0, "object"), ("warning", "triples", 0, "predicate"),
+        ("warning", "annotations", 0, "relation"), ("warning", "annotations", 0, "source")}
+
+
+def test_compact_and_plain_records_get_the_same_issues():
+    odd = theory(triples=[{"subject": "Attitude", "predicate": "causes", "object": "Behaviour"}])
+    compact = CompactTheory.pack(odd, StringPool())
+    assert isinstance(compact, CompactTheory)
+    assert TheoryValidator().check(compact) == TheoryValidator().check(odd)
+
+
+def test_labels_are_compared_across_the_corpus():
+    validator = TheoryValidator()
+    for theory_id in (1, 2, 3): validator.update(theory_id, theory(theory_id))
+    validator.update(4, theory(4, annotations=[("BCIO:006075", "danger")]))
+    validator.update(5, theory(5, annotations=[("BCIO:006075", "Threat")]))  # Case alone is not flagged.
+    assert [(issue["theory_id"], issue["row"]) for issue in validator.report()] == [(4, 0)]
+    assert "labelled 'danger' here but 'threat' in 4 other annotations" in validator.report()[0]["message"]  # Counted case-folded.
+    for theory_id in (1, 2): validator.remove(theory_id)
+    assert validator.report()[0]["message"].endswith("in 2 other annotations")
+    validator.remove(3)
+    assert validator.report() == []  # A tie has no usual label.
+    assert dict(validator.label_counts) == {("BCIO:006075", "danger"): 1, ("BCIO:006075", "Threat"): 1}
+
+
+def fresh(manager):
+    validator = TheoryValidator()
+    for theory_id, _, _ in manager.theory_summaries(): validator.update(theory_id, manager.theories[theory_id - 1])
+    return validator
+
+
+def test_incremental_updates_match_a_fresh_build(corpus_path):
+    manager = TheoryDataManager(corpus_path)
+    validator = manager.build_validator()
+    relabelled = next(t for t in (manager.get_theory(i) for i, _, _ in manager.theory_summaries()) if t["annotations"])
+    relation = relabelled["annotations"][0]["relation"]
+    relabelled["annotations"] = [dict(a, value="Relabelled") if a["relation"] == relation else a for a in relabelled["annotations"]]
+    relabelled["triples"].append({"subject": "Nobody", "predicate": "influences", "object": relabelled["constructs"][0]["name"]})
+    manager.update_theory(relabelled["id"], relabelled)
+    assert manager.validator is validator  # Updated in place, not rebuilt.
+    rebuilt = fresh(manager)
+    assert validator.label_counts == rebuilt.label_counts
+    assert validator.report() == rebuilt.report()
+    assert any(issue["theory_id"] == relabelled["id"] and issue["field"] == "subject" for issue in validator.report())
+
+    validator.remove(relabelled["id"])
+    rebuilt.remove(relabelled["id"])
+    others = TheoryValidator()
+    for theory_id, _, _ in manager.theory_summaries():
+        if theory_id != relabelled["id"]: others.update(theory_id, manager.theories[theory_id - 1])
+    assert validator.label_counts == rebuilt.label_counts == others.label_counts
+    assert validator.report() == others.report()
+
+
+def test_cli_writes_the_issues(corpus_path, tmp_path, capsys):
+    report = str(tmp_path / "issues.json")
+    assert main(["--data", corpus_path, "validate", "--json", report]) == 0
+    with open(report, 'r', encoding='utf-8') as f: issues = json.load(f)
+    assert issues == TheoryDataManager(corpus_path).build_validator().report()
+    assert "0 errors" in capsys.readouterr().out
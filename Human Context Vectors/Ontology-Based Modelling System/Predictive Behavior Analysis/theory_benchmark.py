@@ -0,0 +1,290 @@
+"""Benchmarks for the Behavioral Theory Data Entry Tool.
+
+Generates synthetic corpora shaped like theory_data.json (theory sizes, predicates,
+annotations and construct-name reuse are sampled from a reference corpus), then times
+the data, graph, export and LLM paths on each size headlessly. LLM calls go to a local
+mock generateContent server; the GUI path uses a hidden Tk root and is skipped when no
+display is available. Results are written as JSON so runs can be compared across commits:
+
+    python theory_benchmark.py --sizes 76 1000 10000 --out bench.json
+    python theory_benchmark.py --sizes 76 1000 --compare bench.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import threading
+import statistics
+import subprocess
+import tracemalloc
+import importlib.util
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from theory_core import (TheoryDataManager, LLMProcessor, ChatContextBuilder, GraphRenderer, CypherExporter,
+                         TheoryToolError)
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def synthetic_corpus(reference, n_theories, seed=0):
+    """`n_theories` theories resampled from `reference`: same size mix, predicates, annotations and name reuse."""
+    rng = random.Random(seed)
+    shapes = [(len(t['constructs']), len(t['triples']), len(t['annotations'])) for t in reference]
+    predicates = [triple['predicate'] for t in reference for triple in t['triples']]
+    annotations = [(a['relation'], a['value'], a['source']) for t in reference for a in t['annotations']]
+    descriptions = [t.get('description', '') for t in reference]
+    declared = [c['name'] for t in reference for c in t['constructs']]
+    words = sorted({w for name in declared for w in name.split()})
+    reuse = 1 - len(set(declared)) / max(1, len(declared))  # Share of construct names another theory already used.
+    complete = sum(bool(t.get('complete')) for t in reference) / len(reference)
+    used, seen = [], set()
+    theories = []
+    for theory_id in range(1, n_theories + 1):
+        n_constructs, n_triples, n_annotations = rng.choice(shapes)
+        names = []
+        for _ in range(n_constructs):
+            if used and rng.random() < reuse: name = used[int(len(used) * rng.random() ** 3)]  # Early names are the popular ones.
+            else: name = " ".join(rng.sample(words, rng.randint(1, 4))).capitalize()
+            if name in names: continue
+            names.append(name)
+            if name not in seen:
+                seen.add(name)
+                used.append(name)
+        ends = names or [f"Theory {theory_id}"]
+        theories.append({
+            "id": theory_id, "name": f"Synthetic theory {theory_id}", "description": rng.choice(descriptions),
+            "picture_path": "", "complete": rng.random() < complete,
+            "constructs": [{"name": name, "description": ""} for name in names],
+            "triples": [{"subject": rng.choice(ends), "predicate": rng.choice(predicates), "object": rng.choice(ends)} for _ in range(n_triples)],
+            "annotations": [dict(zip(("construct", "relation", "value", "source"), (rng.choice(ends), *rng.choice(annotations))))
+                            for _ in range(n_annotations)]})
+    return theories
+
+
+class MockLLMServer:
+    """A local generateContent/streamGenerateContent endpoint answering every prompt with a short chat reply."""
+    REPLY = json.dumps({"response": "Self-efficacy appears in several of the theories in the context."})
+
+    def __init__(self, latency=0.0):
+        reply, chunk = self.REPLY, max(1, len(self.REPLY) // 4)
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args): pass
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                time.sleep(latency)
+                if 'streamGenerateContent' in self.path:
+                    events = [f"data: {json.dumps({'candidates': [{'content': {'parts': [{'text': reply[i:i + chunk]}]}}]})}\r\n\r\n"
+                              for i in range(0, len(reply), chunk)]
+                    body, content_type = "".join(events).encode('utf-8'), 'text/event-stream'
+                else:
+                    body, content_type = json.dumps({"candidates": [{"content": {"parts": [{"text": reply}]}}]}).encode('utf-8'), 'application/json'
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.endpoint = f"http://127.0.0.1:{self.server.server_address[1]}/v1beta/models/mock:generateContent"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def measure(function, repeat):
+    """Best and median wall time over `repeat` runs, then one more run under tracemalloc for the peak."""
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - started)
+    tracemalloc.start()
+    try: function()
+    finally:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {"seconds": min(times), "median_seconds": statistics.median(times), "runs": repeat, "peak_mb": round(peak / 1e6, 2)}
+
+
+def load_gui_module():
+    spec = importlib.util.spec_from_file_location("llm_analysis_tool", os.path.join(HERE, "LLM Analysis tool.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class CorpusBenchmark:
+    """Times every benchmarked path on one synthetic corpus, inside its own working directory."""
+
+    def __init__(self, theories, workdir, repeat=3, layout_limit=3000, llm_endpoint=None):
+        self.theories = theories
+        self.workdir = workdir
+        self.repeat = repeat
+        self.layout_limit = layout_limit
+        self.llm_endpoint = llm_endpoint
+        self.path = os.path.join(workdir, "theory_data.json")
+        with open(self.path, 'w', encoding='utf-8') as f: json.dump(theories, f, indent=4)
+        self.manager = TheoryDataManager(self.path)
+        # A typical theory: the one with the median construct count.
+        self.theory_id = sorted(self.manager.theory_summaries(), key=lambda s: len(self.manager.get_theory(s[0])['constructs']))[len(theories) // 2][0]
+
+    def run(self):
+        results = {}
+        for name in ("load_data", "save_data", "build_graph", "layout", "export_theory_cypher", "export_corpus_cypher",
+                     "validate", "chat_prompt", "chat_roundtrip", "on_theory_select"):
+            try: results[name] = getattr(self, f"bench_{name}")()
+            except (TheoryToolError, OSError, ImportError) as e: results[name] = {"skipped": str(e)}
+            print(f"  {name:22} {self._describe(results[name])}", flush=True)
+        return results
+
+    @staticmethod
+    def _describe(result):
+        if "skipped" in result: return f"skipped ({result['skipped']})"
+        return f"{result['seconds'] * 1000:10.1f} ms   peak {result['peak_mb']:8.1f} MB"
+
+    def bench_load_data(self):
+        return measure(lambda: TheoryDataManager(self.path), self.repeat)
+
+    def bench_save_data(self):
+        return measure(self.manager.save_data, self.repeat)
+
+    def bench_build_graph(self):
+        def build():
+            self.manager._reset_graph()
+            self.manager.build_graph()
+        return measure(build, self.repeat)
+
+    def bench_layout(self):
+        """A cold render through GraphRenderer (layout and SVG in its worker process) per run."""
+        self.manager.build_graph()
+        graph = self.manager.graph
+        if graph.number_of_nodes() > self.layout_limit: raise TheoryToolError(f"{graph.number_of_nodes()} nodes is over --layout-limit")
+        renderer = GraphRenderer(os.path.join(self.workdir, "output"))
+        renderer.render(graph.subgraph([]), "warmup.svg", "warm-up").result()  # Spawning the worker isn't part of a render.
+
+        def render():
+            renderer.positions, renderer.layouts = {}, {}
+            renderer.render(graph, "graph.svg", "Benchmark").result()
+        try: result = measure(render, self.repeat)
+        finally: renderer.shutdown()
+        result["nodes"] = graph.number_of_nodes()
+        return result  # peak_mb covers this process only; the layout runs in the worker.
+
+    def bench_export_theory_cypher(self):
+        def export():
+            theory, annotations = CypherExporter.resolved_theory(self.manager, self.theory_id)
+            return CypherExporter().theory_script(theory, annotations)
+        return measure(export, self.repeat)
+
+    def bench_export_corpus_cypher(self):
+        export_dir = os.path.join(self.workdir, "cypher_exports")
+        return measure(lambda: CypherExporter().export_corpus(self.manager, export_dir), self.repeat)
+
+    def bench_validate(self):
+        """A whole-corpus report from a cold validator, as the validate command and the GUI's report run it."""
+        def validate():
+            self.manager.validator = None
+            return self.manager.build_validator().report()
+        return measure(validate, self.repeat)
+
+    def bench_chat_prompt(self):
+        def build():
+            context_json, _ = ChatContextBuilder(self.manager).build(self.theory_id, "How does self-efficacy relate to intention?")
+            return LLMProcessor("benchmark").create_chat_turn_prompt("How does self-efficacy relate to intention?", context_json, self.theory_id)
+        return measure(build, self.repeat)
+
+    def bench_chat_roundtrip(self):
+        """Prompt construction plus a streamed chat call to the mock endpoint."""
+        if self.llm_endpoint is None: raise TheoryToolError("no mock LLM endpoint")
+        processor = LLMProcessor("benchmark", endpoint=self.llm_endpoint)
+        message = "How does self-efficacy relate to intention?"
+
+        def chat():
+            context_json, _ = ChatContextBuilder(self.manager).build(self.theory_id, message)
+            if processor.chat(message, context_json, self.theory_id, on_text=lambda text: None) is None: raise TheoryToolError("mock LLM call failed")
+        return measure(chat, self.repeat)
+
+    def bench_on_theory_select(self):
+        """Selecting a theory in the real GUI, on a withdrawn root window, including pending redraws."""
+        import tkinter as tk
+        try: root = tk.Tk()
+        except tk.TclError as e: raise TheoryToolError(f"no display: {e}")
+        cwd = os.getcwd()
+        os.chdir(self.workdir)  # The GUI opens theory_data.json and config.json from the working directory.
+        try:
+            root.withdraw()
+            app = load_gui_module().TheoryDataEntryGUI(root)
+            ids = [str(theory_id) for theory_id, _, _ in app.data_manager.theory_summaries()]
+            turn = iter(range(10 ** 9))
+
+            def select():
+                app.tree.selection_set(ids[next(turn) % len(ids)])
+                app.on_theory_select()
+                root.update_idletasks()
+            return measure(select, max(self.repeat, 10))
+        finally:
+            os.chdir(cwd)
+            root.destroy()
+
+
+def git_commit():
+    try: return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError): return None
+
+
+def compare(previous, current):
+    """Prints each path's time against a previous results file."""
+    print(f"\n{'size':>7}  {'path':22} {'before ms':>10} {'after ms':>10} {'ratio':>7}")
+    for size, paths in current["results"].items():
+        for name, result in paths.items():
+            before = previous.get("results", {}).get(size, {}).get(name, {})
+            if "seconds" not in result or "seconds" not in before: continue
+            print(f"{size:>7}  {name:22} {before['seconds'] * 1000:10.1f} {result['seconds'] * 1000:10.1f} {result['seconds'] / max(before['seconds'], 1e-9):7.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the data, graph, export and LLM paths on synthetic corpora.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[76, 1000], help="Corpus sizes, in theories.")
+    parser.add_argument("--reference", default=os.path.join(HERE, "theory_data.json"), help="Corpus whose shape the synthetic ones copy.")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per path (the best is reported).")
+    parser.add_argument("--layout-limit", type=int, default=3000, help="Skip the layout path for graphs with more nodes.")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Seconds the mock LLM waits before answering.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="Write results to this JSON file.")
+    parser.add_argument("--compare", help="A previous results file to compare against.")
+    args = parser.parse_args(argv)
+
+    with open(args.reference, 'r', encoding='utf-8') as f: reference = json.load(f)
+    report = {"meta": {"commit": git_commit(), "python": platform.python_version(), "platform": platform.platform(),
+                       "started": time.strftime("%Y-%m-%dT%H:%M:%S"), "repeat": args.repeat, "seed": args.seed},
+              "results": {}}
+    with MockLLMServer(args.llm_latency) as llm, tempfile.TemporaryDirectory(prefix="theory_bench_") as scratch:
+        for size in args.sizes:
+            print(f"{size} theories", flush=True)
+            workdir = os.path.join(scratch, str(size))
+            os.makedirs(workdir)
+            report["results"][str(size)] = CorpusBenchmark(synthetic_corpus(reference, size, args.seed), workdir, args.repeat,
+                                                           args.layout_limit, llm.endpoint).run()
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f: json.dump(report, f, indent=2)
+        print(f"Results written to {args.out}")
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f: compare(json.load(f), report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,34 @@
+"""Headless core of the Behavioral Theory Data Entry Tool.
+
+Storage, the theory graph, the LLM client, Cypher export and bulk ingestion, usable
+without a display. networkx, requests, matplotlib and Pillow are imported only by the features
+that need them, and failures raise `TheoryToolError` subclasses instead of opening
+dialogs. Run `python -m theory_core --help` for the command-line interface.
+
+The modules follow the tool's seams: `storage` (the JSON, indexed and SQLite stores over
+`records`), `validation`, `analysis` (search, construct resolution, influence and
+simulation), `graph` (rendering), `parsing` and `llm`, `jobs`, `images`, `export`,
+`tracing` and `cli`. Everything public is re-exported here.
+"""
+from .errors import TheoryToolError, LLMError, GraphEmptyError, PatchError
+from .tracing import Metrics, metrics
+from .jobs import RateLimiter, Job, JobScheduler
+from .parsing import RawTheoryParser, TheoryPatch
+from .records import StringPool, CompactTheory
+from .validation import TheoryValidator
+from .analysis import TheorySearchIndex, ConstructResolver, InfluenceIndex, BehaviorSimulator
+from .storage import TheoryDataManager, SQLiteTheoryDataManager, IndexedTheoryDataManager
+from .llm import LLMResponseCache, LLMProcessor, ChatContextBuilder, BulkIngestor
+from .images import ThumbnailCache
+from .graph import GraphRenderer
+from .export import CypherExporter, TableExporter
+from .cli import open_data_manager, build_parser, run_command, print_metrics, main
+
+__all__ = [
+    "TheoryToolError", "LLMError", "GraphEmptyError", "PatchError", "Metrics", "metrics", "RateLimiter", "Job",
+    "JobScheduler", "RawTheoryParser", "TheoryPatch", "StringPool", "CompactTheory", "TheoryValidator",
+    "TheorySearchIndex", "ConstructResolver", "InfluenceIndex", "BehaviorSimulator", "TheoryDataManager",
+    "SQLiteTheoryDataManager", "IndexedTheoryDataManager", "LLMResponseCache", "LLMProcessor", "ChatContextBuilder",
+    "BulkIngestor", "ThumbnailCache", "GraphRenderer", "CypherExporter", "TableExporter", "open_data_manager",
+    "build_parser", "run_command", "print_metrics", "main",
+]
@@ -0,0 +1,6 @@
+import sys
+
+from .cli import main
+
+if sys.argv[0].endswith("__main__.py"): sys.argv[0] = "python -m theory_core"  # As unittest does, for the usage line.
+sys.exit(main())
@@ -0,0 +1,522 @@
+"""Search, construct resolution, influence queries and simulation over the corpus."""
+import re
+import heapq
+import itertools
+import functools
+from collections import Counter
+
+from .errors import TheoryToolError
+
+
+class TheorySearchIndex:
+    """In-memory inverted index over theories, constructs, triples and annotations.
+
+    Words map to the rows that contain them, grouped by field weight, and a trigram
+    index over the vocabulary finds misspelt and partial words. Rows are indexed per
+    theory, so an edited theory is re-indexed on its own without rebuilding the rest.
+    Ranking works on sets of row ids wherever it can, keeping queries over tens of
+    thousands of rows in the low milliseconds.
+    """
+    FIELD_WEIGHTS = {"name": 3.0, "relation": 3.0, "endpoint": 2.0, "value": 2.0, "predicate": 1.0, "description": 1.0, "reference": 1.0}
+    EXACT_BONUS = 5.0
+    MIN_SIMILARITY = 0.4
+    TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?::[a-z0-9_]+)?")  # Keeps ontology ids such as bcio:050806 whole.
+    ROW_BITS = 20  # Row ids are theory_id << ROW_BITS | position, so they sort in corpus order.
+
+    def __init__(self, canonical=None):
+        self.canonical = canonical or (lambda name: name)  # construct alias -> canonical name; aliases are indexed under both
+        self.postings = {}  # token -> {weight: set of row ids}
+        self.trigrams = {}  # trigram -> set of tokens
+        self.rows = {}  # row id -> (theory id, kind, row, theory name, display text)
+        self.exact = {}  # normalized display text -> set of row ids
+        self.theory_rows = {}  # theory id -> {row id: {token: weight}}
+
+    @classmethod
+    def tokenize(cls, text):
+        tokens = []
+        for token in cls.TOKEN_PATTERN.findall(str(text).lower()):
+            tokens.append(token)
+            if ':' in token: tokens.extend(token.split(':'))
+        return tokens
+
+    def query_tokens(self, query):
+        """Like `tokenize`, but an ontology id is split into its parts only when it isn't indexed whole."""
+        tokens = []
+        for token in self.TOKEN_PATTERN.findall(query.lower()):
+            if ':' in token and token not in self.postings: tokens.extend(token.split(':'))
+            else: tokens.append(token)
+        return list(dict.fromkeys(tokens))
+
+    @classmethod
+    def normalize(cls, text):
+        """Text reduced to its words, so "Self-efficacy" and "self efficacy" compare equal."""
+        return " ".join(cls.TOKEN_PATTERN.findall(str(text).lower()))
+
+    @staticmethod
+    def token_trigrams(token):
+        padded = f"  {token} "
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+    def build(self, theories):
+        for theory in theories: self.update_theory(theory)
+
+    def update_theory(self, theory):
+        theory_id, name = theory['id'], theory.get('name', '')
+        self.remove_theory(theory_id)
+        self.theory_rows[theory_id] = {}
+        position = 0
+        entries = [("theory", None, name, [("name", name), ("description", theory.get('description', ''))])]
+        entries += [("construct", i, c.get('name', ''), [("name", c.get('name', '')), ("name", self.canonical(c.get('name', ''))), ("description", c.get('description', ''))])
+                    for i, c in enumerate(theory.get('constructs', []))]
+        entries += [("triple", i, f"{t.get('subject', '')} -{t.get('predicate', '')}-> {t.get('object', '')}",
+                     [("endpoint", t.get('subject', '')), ("predicate", t.get('predicate', '')), ("endpoint", t.get('object', ''))])
+                    for i, t in enumerate(theory.get('triples', []))]
+        entries += [("annotation", i, f"{a.get('construct', '')}: {a.get('relation', '')} {a.get('value', '')}",
+                     [("relation", a.get('relation', '')), ("value", a.get('value', '')), ("reference", a.get('construct', ''))])
+                    for i, a in enumerate(theory.get('annotations', []))]
+        for kind, row, text, fields in entries:
+            weights = {}
+            for field, value in fields:
+                for token in self.tokenize(value): weights[token] = max(weights.get(token, 0.0), self.FIELD_WEIGHTS[field])
+            if not weights: continue
+            row_id = theory_id << self.ROW_BITS | position
+            position += 1
+            self.rows[row_id] = (theory_id, kind, row, name, text)
+            self.exact.setdefault(self.normalize(text), set()).add(row_id)
+            self.theory_rows[theory_id][row_id] = weights
+            for token, weight in weights.items():
+                if token not in self.postings:
+                    self.postings[token] = {}
+                    for gram in self.token_trigrams(token): self.trigrams.setdefault(gram, set()).add(token)
+                self.postings[token].setdefault(weight, set()).add(row_id)
+
+    def remove_theory(self, theory_id):
+        for row_id, weights in self.theory_rows.pop(theory_id, {}).items():
+            text = self.normalize(self.rows.pop(row_id)[4])
+            self.exact[text].discard(row_id)
+            if not self.exact[text]: del self.exact[text]
+            for token, weight in weights.items():
+                postings = self.postings[token]
+                postings[weight].discard(row_id)
+                if not postings[weight]: del postings[weight]
+                if postings: continue
+                del self.postings[token]
+                for gram in self.token_trigrams(token):
+                    self.trigrams[gram].discard(token)
+                    if not self.trigrams[gram]: del self.trigrams[gram]
+
+    def similar_tokens(self, query_token):
+        """Yields (token, similarity) for indexed words matching `query_token` exactly, by prefix or by trigram overlap.
+
+        Words containing digits (ontology ids, years) match only exactly or by prefix:
+        BCIO:050806 is not a misspelling of BCIO:050807.
+        """
+        if query_token in self.postings: yield query_token, 1.0
+        if len(query_token) < 3: return
+        fuzzy = not any(ch.isdigit() for ch in query_token)
+        grams = self.token_trigrams(query_token)
+        shared = Counter()
+        for gram in grams: shared.update(self.trigrams.get(gram, ()))
+        for token, count in shared.items():
+            if token == query_token: continue
+            if token.startswith(query_token): similarity = 0.9
+            elif not fuzzy: continue
+            else: similarity = count / (len(grams) + len(token) + 1 - count)  # Jaccard; a word of n letters has about n + 1 trigrams.
+            if similarity >= self.MIN_SIMILARITY: yield token, similarity
+
+    def _token_buckets(self, query_token):
+        """[(score, row ids)] for one query word, best score first; each row appears once, under its best match."""
+        groups = sorted(((similarity * weight, row_ids) for token, similarity in self.similar_tokens(query_token)
+                         for weight, row_ids in self.postings[token].items()), key=lambda group: -group[0])
+        buckets, seen = [], set()
+        for score, row_ids in groups:
+            fresh = row_ids - seen
+            if not fresh: continue
+            seen |= fresh
+            if buckets and buckets[-1][0] == score: buckets[-1][1].update(fresh)
+            else: buckets.append((score, fresh))
+        return buckets
+
+    def search(self, query, limit=20):
+        """Returns up to `limit` hits, best first, as dicts with theory_id, theory, kind, row, text and score.
+
+        Rows must match every query word (exactly, by prefix or fuzzily); only if none do
+        are rows matching some of the words returned. Each word scores its best match
+        times the field's weight, and a row whose text is exactly the query ranks first.
+        """
+        per_word = [self._token_buckets(token) for token in self.query_tokens(query)]
+        if not per_word: return []
+        exact = self.exact.get(self.normalize(query), set())
+        buckets = per_word[0]
+        for word_buckets in per_word[1:]:
+            # Rows matching every word: intersect score buckets pairwise rather than visiting rows one by one.
+            merged = {}
+            for score, row_ids in buckets:
+                for word_score, word_row_ids in word_buckets:
+                    both = row_ids & word_row_ids
+                    if both: merged.setdefault(score + word_score, set()).update(both)
+            buckets = sorted(merged.items(), key=lambda bucket: -bucket[0])
+        if not buckets and len(per_word) > 1:
+            totals = {}
+            for word_buckets in per_word:
+                for score, row_ids in word_buckets:
+                    for row_id in row_ids: totals[row_id] = totals.get(row_id, 0.0) + score
+            grouped = {}
+            for row_id, total in totals.items(): grouped.setdefault(total, set()).add(row_id)
+            buckets = sorted(grouped.items(), key=lambda bucket: -bucket[0])
+        ranked = [(score + self.EXACT_BONUS, row_id) for score, row_ids in buckets for row_id in sorted(exact.intersection(row_ids))][:limit]
+        for score, row_ids in buckets:
+            if len(ranked) >= limit: break
+            ranked.extend((score, row_id) for row_id in heapq.nsmallest(limit - len(ranked), set(row_ids) - exact))
+        return [dict(zip(("theory_id", "kind", "row", "theory", "text"), self.rows[row_id]), score=round(score, 3)) for score, row_id in ranked]
+
+
+class ConstructResolver:
+    """Proposes merging construct names that differ only in case, punctuation, spelling or plural.
+
+    Candidate pairs come from the cosine similarity of TF-IDF character-trigram
+    vectors. Names are compared only within blocks that share one of their rarer word
+    stems, small blocks as vectorized pair lists and large ones with a sparse matrix
+    product over sorted windows, so the work grows with block sizes rather than with
+    the square of the vocabulary. Each candidate is then confirmed on the folded
+    spelling: the names must be equal, or differ by one typo inside one word of at
+    least TYPO_MIN_LENGTH letters: a substitution, a swap of neighbouring letters, or a
+    letter added or dropped in the middle. Edits at a word's start ("Direct" and
+    "Indirect") or end ("Health" and "Healthy") change the word and are never merged.
+    Needs numpy and scipy.
+    """
+    MIN_COSINE = 0.7
+    MAX_BLOCK = 1000
+    SMALL_BLOCK = 64
+    KEYS_PER_NAME = 2
+    TYPO_MIN_LENGTH = 6
+    STOPWORDS = {"a", "an", "and", "by", "for", "in", "of", "on", "or", "the", "to", "with"}
+    WORD = re.compile(r"[a-z0-9]+")
+
+    def __init__(self, min_cosine=MIN_COSINE, max_block=MAX_BLOCK):
+        self.min_cosine = min_cosine
+        self.max_block = max_block
+
+    @classmethod
+    def fold(cls, name):
+        """The name's words with case, British/American spelling and plurals folded away."""
+        return [cls.fold_word(word) for word in cls.WORD.findall(name.lower())]
+
+    @staticmethod
+    @functools.lru_cache(maxsize=65536)
+    def fold_word(word):
+        # British -our (and -ours, -oural, -ourable, ...) after a stem of three or more letters,
+        # so "behavioural" folds to "behavioral" but "four", "hours" and "source" keep their "our".
+        word = re.sub(r"(?<=[a-z]{3})our(s|al|ally|able|ably|ite|ites|ed|ing|er|ers)?$", r"or\1", word)
+        word = re.sub(r"is(e|ed|es|ing|ation|ations)$", r"iz\1", word)
+        if word.endswith("ies") and len(word) > 4: return word[:-3] + "y"
+        if word.endswith("s") and len(word) > 3 and not word.endswith(("ss", "us", "is")): return word[:-1]
+        return word
+
+    @staticmethod
+    def one_typo_apart(a, b):
+        """True if two different words differ by one substitution, one swap of neighbouring letters,
+        or one letter added or dropped inside the word, with the first letter unchanged."""
+        if len(a) > len(b): a, b = b, a
+        i = 0
+        while i < len(a) and a[i] == b[i]: i += 1
+        if i == 0 or i == len(a): return False  # The first letter differs, or b only adds trailing letters.
+        if len(a) == len(b):
+            return a[i + 1:] == b[i + 1:] or (a[i] == b[i + 1] and a[i + 1] == b[i] and a[i + 2:] == b[i + 2:])
+        return len(b) == len(a) + 1 and a[i:] == b[i + 1:]
+
+    @classmethod
+    def spelled_alike(cls, a, b):
+        """True if two folded names are the same words, allowing one typo inside one long word."""
+        if "".join(a) == "".join(b): return True
+        if len(a) != len(b): return False
+        differing = [(x, y) for x, y in zip(a, b) if x != y]
+        return (len(differing) == 1 and min(map(len, differing[0])) >= cls.TYPO_MIN_LENGTH
+                and cls.one_typo_apart(*differing[0]))
+
+    def vectorize(self, texts):
+        """TF-IDF vectors of each text's character trigrams, L2-normalized, as a sparse matrix."""
+        import numpy as np
+        from scipy import sparse
+        # Byte trigrams of every padded text at once: encode, then combine three shifted views.
+        encoded = [f"  {text} ".encode('utf-8') for text in texts]
+        lengths = np.fromiter((len(e) for e in encoded), dtype=np.int64, count=len(encoded))
+        data = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.int64)
+        codes = (data[:-2] << 16) | (data[1:-1] << 8) | data[2:]
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        offsets = np.arange(len(data)) - np.repeat(starts, lengths)
+        within = (offsets <= np.repeat(lengths, lengths) - 3)[:-2]  # Trigrams that don't straddle two texts.
+        rows = np.repeat(np.arange(len(texts)), lengths)[:-2][within]
+        vocab, columns = np.unique(codes[within], return_inverse=True)
+        X = sparse.csr_matrix((np.ones(len(columns), dtype=np.float32), (rows, columns)), shape=(len(texts), len(vocab)))
+        X.sum_duplicates()
+        df = np.bincount(X.indices, minlength=len(vocab))
+        X.data *= (np.log((1 + len(texts)) / (1 + df)) + 1).astype(np.float32)[X.indices]
+        norms = np.sqrt(np.asarray(X.multiply(X).sum(axis=1)).ravel())
+        return sparse.diags(1 / np.maximum(norms, 1e-12)).dot(X).tocsr()
+
+    def blocks(self, folded):
+        """Lists of name indices sharing a blocking key: each name's KEYS_PER_NAME rarest word stems."""
+        stems = [{w[:4] for w in words if w not in self.STOPWORDS and len(w) > 2} or {" ".join(words)} for words in folded]
+        frequency = Counter(stem for name_stems in stems for stem in name_stems)
+        blocks = {}
+        for i, name_stems in enumerate(stems):
+            for stem in sorted(name_stems, key=lambda stem: (frequency[stem], stem))[:self.KEYS_PER_NAME]: blocks.setdefault(stem, []).append(i)
+        return [block for block in blocks.values() if len(block) > 1]
+
+    def candidate_pairs(self, X, blocks, texts):
+        """(left, right, cosine) arrays of distinct within-block pairs at or above min_cosine."""
+        import numpy as np
+        left, right = [], []
+        for block in blocks:
+            if len(block) <= self.SMALL_BLOCK:
+                a, b = np.triu_indices(len(block), 1)
+                block = np.asarray(block)
+                left.append(block[a])
+                right.append(block[b])
+                continue
+            block = sorted(block, key=texts.__getitem__)
+            step = self.max_block // 2
+            for start in range(0, max(1, len(block) - step), step):
+                window = np.asarray(block[start:start + self.max_block])
+                rows = X[window]
+                S = (rows @ rows.T).tocoo()
+                keep = (S.row < S.col) & (S.data >= self.min_cosine)
+                left.append(window[S.row[keep]])
+                right.append(window[S.col[keep]])
+        if not left: return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        left, right = np.concatenate(left), np.concatenate(right)
+        n = X.shape[0]
+        pair_keys = np.unique(np.minimum(left, right).astype(np.int64) * n + np.maximum(left, right))
+        left, right = pair_keys // n, pair_keys % n
+        cosines = np.asarray(X[left].multiply(X[right]).sum(axis=1)).ravel()
+        keep = cosines >= self.min_cosine
+        return left[keep], right[keep], cosines[keep]
+
+    def propose(self, name_counts):
+        """Merge proposals for {name: number of uses}, as dicts with alias, canonical and similarity.
+
+        Names linked by confirmed pairs form a group, and the most used name (then the
+        shortest, then the first alphabetically) becomes the group's canonical name.
+        """
+        names = sorted(name_counts)
+        if len(names) < 2: return []
+        folded = [self.fold(name) for name in names]
+        texts = [" ".join(words) for words in folded]
+        try: X = self.vectorize(texts)
+        except ImportError as e: raise TheoryToolError(f"Construct resolution needs numpy and scipy ({e}); install them with: pip install numpy scipy") from e
+        left, right, _ = self.candidate_pairs(X, self.blocks(folded), texts)
+        parent = list(range(len(names)))
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+        for i, j in zip(left.tolist(), right.tolist()):
+            if self.spelled_alike(folded[i], folded[j]): parent[find(i)] = find(j)
+        groups = {}
+        for i in range(len(names)): groups.setdefault(find(i), []).append(i)
+        aliases, canonicals = [], []
+        for members in groups.values():
+            if len(members) < 2: continue
+            canonical = min(members, key=lambda i: (-name_counts[names[i]], len(names[i]), names[i]))
+            aliases.extend(i for i in members if i != canonical)
+            canonicals.extend(canonical for i in members if i != canonical)
+        if not aliases: return []
+        import numpy as np
+        similarities = np.asarray(X[aliases].multiply(X[canonicals]).sum(axis=1)).ravel()
+        proposals = [{"alias": names[i], "canonical": names[j], "similarity": round(float(sim), 3)} for i, j, sim in zip(aliases, canonicals, similarities)]
+        return sorted(proposals, key=lambda p: (p["canonical"], p["alias"]))
+
+
+class InfluenceIndex:
+    """Reachability index over the construct-to-construct (triple) edges of the theory graph.
+
+    Strongly connected components are collapsed into a condensation DAG, and each
+    component stores its ancestors and descendants as an integer bitset over component
+    ids, so reachability, upstream and downstream queries are a few integer operations.
+    The index follows edge changes as they happen: an added edge whose target was
+    already reachable changes nothing, and any other change marks the closure stale,
+    to be recomputed on the next query.
+    """
+    STRUCTURAL_LABEL = 'has_construct'
+
+    def __init__(self, graph):
+        import networkx as nx
+        self.graph = nx.DiGraph()
+        self.graph.add_edges_from((u, v, {"label": d.get('label', '')}) for u, v, d in graph.edges(data=True) if d.get('label') != self.STRUCTURAL_LABEL)
+        self.stale = True
+        self.rebuilds = 0
+
+    def update_edge(self, u, v, label):
+        """Mirrors one edge of the theory graph; `label` is None when the edge was removed."""
+        had = self.graph.has_edge(u, v)
+        if label is not None and label != self.STRUCTURAL_LABEL:
+            if not had and not self.stale and not self.reaches(u, v): self.stale = True
+            self.graph.add_edge(u, v, label=label)
+        elif had:
+            self.graph.remove_edge(u, v)
+            self.stale = True
+
+    def _refresh(self):
+        if not self.stale: return
+        import networkx as nx
+        self.graph.remove_nodes_from([n for n in list(self.graph) if self.graph.degree(n) == 0])
+        dag = nx.condensation(self.graph)
+        self.component = dag.graph['mapping']  # node -> component id
+        self.members = [sorted(dag.nodes[c]['members']) for c in range(dag.number_of_nodes())]
+        self.cyclic = [len(m) > 1 or self.graph.has_edge(m[0], m[0]) for m in self.members]
+        order = list(nx.topological_sort(dag))
+        self.descendant_bits = [0] * len(order)
+        self.ancestor_bits = [0] * len(order)
+        for c in reversed(order):
+            for d in dag.successors(c): self.descendant_bits[c] |= (1 << d) | self.descendant_bits[d]
+        for c in order:
+            for a in dag.predecessors(c): self.ancestor_bits[c] |= (1 << a) | self.ancestor_bits[a]
+        self.stale = False
+        self.rebuilds += 1
+
+    def _expand(self, bits):
+        return [node for c, bit in enumerate(reversed(bin(bits)[2:])) if bit == '1' for node in self.members[c]]
+
+    def reaches(self, source, target):
+        self._refresh()
+        if source not in self.component or target not in self.component: return False
+        a, b = self.component[source], self.component[target]
+        return (a == b and self.cyclic[a]) or bool(self.descendant_bits[a] >> b & 1)
+
+    def _related(self, node, direction):
+        self._refresh()
+        if node not in self.component: return []
+        c, bits = self.component[node], getattr(self, direction)
+        same = [m for m in self.members[c] if m != node] if self.cyclic[c] else []
+        return sorted(set(same) | set(self._expand(bits[c])))
+
+    def ancestors(self, node):
+        """Every construct with an influence path to `node`."""
+        return self._related(node, 'ancestor_bits')
+
+    def descendants(self, node):
+        """Every construct `node` has an influence path to."""
+        return self._related(node, 'descendant_bits')
+
+    def influence_paths(self, source, target, k=5):
+        """Up to k shortest simple paths from source to target, searched only among nodes lying between them."""
+        import networkx as nx
+        if source == target or not self.reaches(source, target): return []
+        a, b = self.component[source], self.component[target]
+        between = self.descendant_bits[a] & self.ancestor_bits[b]
+        nodes = set(self._expand(between)) | set(self.members[a]) | set(self.members[b])
+        return list(itertools.islice(nx.shortest_simple_paths(self.graph.subgraph(nodes), source, target), k))
+
+    def describe_path(self, path):
+        return path[0] + "".join(f" -{self.graph.edges[u, v]['label']}-> {v}" for u, v in zip(path, path[1:]))
+
+    def feedback_loops(self, node=None):
+        """Strongly connected groups of constructs (largest first), or just the one containing `node`."""
+        self._refresh()
+        if node is not None:
+            c = self.component.get(node)
+            return [self.members[c]] if c is not None and self.cyclic[c] else []
+        return sorted((m for c, m in enumerate(self.members) if self.cyclic[c]), key=lambda m: (-len(m), m))
+
+    def nodes(self):
+        return sorted(self.graph)
+
+
+class BehaviorSimulator:
+    """Spreading-activation simulation over a triple network, compiled to a sparse weighted matrix.
+
+    Each triple becomes a signed edge weight from its predicate. Scenarios clamp some
+    constructs to an activation in [-1, 1]; every other construct repeatedly takes the
+    tanh of its decayed, weighted input, normalized by the absolute weight of its
+    in-edges, so propagation is a contraction and converges even through feedback loops.
+    Scenarios are the columns of one matrix, so a batch costs one sparse product per step.
+    """
+    PREDICATE_WEIGHTS = {
+        'positively influences': 1.0, 'influences': 0.8, 'influences (*)': 0.8, 'transitions to': 0.8,
+        'may influence': 0.4, 'negatively influences': -1.0, 'correlates with': 0.3,
+        'part of': 0.5, 'type of': 0.5, 'protection type of': 0.5, 'risk type of': 0.5, 'means type of': 0.5,
+        'has attribute': 0.0}
+    DEFAULT_WEIGHT = 0.5
+    STRUCTURAL_LABEL = 'has_construct'
+
+    def __init__(self, edges):
+        """`edges` are (subject, object, predicate) triples; repeated pairs keep their mean weight."""
+        try:
+            import numpy as np
+            from scipy import sparse
+        except ImportError as e: raise TheoryToolError(f"Simulation needs numpy and scipy ({e}); install them with: pip install numpy scipy") from e
+        edges = [(u, v, self.weight(p)) for u, v, p in edges if p != self.STRUCTURAL_LABEL and u != v]
+        if not edges: raise TheoryToolError("There are no influence edges to simulate: add triples between constructs first.")
+        self.nodes = sorted({n for u, v, _ in edges for n in (u, v)})
+        self.position = {n: i for i, n in enumerate(self.nodes)}
+        n = len(self.nodes)
+        rows = np.fromiter((self.position[v] for _, v, _ in edges), dtype=np.int64, count=len(edges))
+        cols = np.fromiter((self.position[u] for u, _, _ in edges), dtype=np.int64, count=len(edges))
+        weights = np.fromiter((w for _, _, w in edges), dtype=np.float64, count=len(edges))
+        counts = sparse.csr_matrix((np.ones(len(edges)), (rows, cols)), shape=(n, n))
+        A = sparse.csr_matrix((weights, (rows, cols)), shape=(n, n))  # A[v, u]: effect of u on v.
+        A.data /= counts.data
+        in_weight = np.asarray(abs(A).sum(axis=1)).ravel()
+        self.matrix = sparse.diags(1 / np.maximum(in_weight, 1e-12)).dot(A).tocsr()
+
+    @classmethod
+    def weight(cls, predicate):
+        return cls.PREDICATE_WEIGHTS.get(predicate.strip().lower(), cls.DEFAULT_WEIGHT)
+
+    @classmethod
+    def from_graph(cls, graph):
+        return cls((u, v, d.get('label', '')) for u, v, d in graph.edges(data=True))
+
+    @classmethod
+    def from_theory(cls, theory):
+        return cls((t.get('subject', ''), t.get('object', ''), t.get('predicate', '')) for t in theory.get('triples', []))
+
+    def scenario_matrix(self, scenarios):
+        """Dense (constructs x scenarios) clamp values and mask for a list of {construct: activation} dicts."""
+        import numpy as np
+        values = np.zeros((len(self.nodes), len(scenarios)))
+        clamped = np.zeros(values.shape, dtype=bool)  # Not `values != 0`: a construct clamped to 0 must stay at 0.
+        for j, scenario in enumerate(scenarios):
+            for node, value in scenario.items():
+                if node not in self.position: raise TheoryToolError(f"'{node}' is not a construct in the simulated network.")
+                values[self.position[node], j] = max(-1.0, min(1.0, float(value)))
+                clamped[self.position[node], j] = True
+        return values, clamped
+
+    def propagate(self, scenarios, steps=50, decay=0.8, tol=1e-6):
+        """Activation of every construct (rows) under each scenario (columns) once settled."""
+        import numpy as np
+        values, clamped = self.scenario_matrix(scenarios)
+        X = values.copy()
+        for _ in range(steps):
+            updated = np.where(clamped, values, np.tanh(decay * (self.matrix @ X)))
+            settled = np.abs(updated - X).max(initial=0) < tol
+            X = updated
+            if settled: break
+        return X
+
+    def rank(self, activation, k=10, exclude=()):
+        """The k constructs an activation column moves most, as (construct, activation) pairs."""
+        import numpy as np
+        skip = {self.position[n] for n in exclude if n in self.position}
+        order = np.argsort(-np.abs(activation), kind='stable')
+        return [(self.nodes[i], float(activation[i])) for i in order if i not in skip and activation[i] != 0][:k]
+
+    def simulate(self, scenario, k=10, **options):
+        return self.rank(self.propagate([scenario], **options)[:, 0], k, exclude=scenario)
+
+    def sweep(self, value=1.0, k=5, nodes=None, batch=1024, **options):
+        """One single-construct intervention per construct; results sorted by total absolute effect."""
+        import numpy as np
+        nodes = self.nodes if nodes is None else nodes
+        results = []
+        for start in range(0, len(nodes), batch):
+            chunk = nodes[start:start + batch]
+            X = self.propagate([{node: value} for node in chunk], **options)
+            own = X[[self.position[node] for node in chunk], np.arange(len(chunk))]  # The clamped, so clipped, intervention.
+            totals = np.abs(X).sum(axis=0) - np.abs(own)
+            for j, node in enumerate(chunk):
+                results.append({"intervention": node, "total_effect": float(totals[j]), "top": self.rank(X[:, j], k, exclude=(node,))})
+        return sorted(results, key=lambda r: (-r["total_effect"], r["intervention"]))
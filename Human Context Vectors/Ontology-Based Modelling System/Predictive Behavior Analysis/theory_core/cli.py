@@ -0,0 +1,323 @@
+"""The headless command-line interface: `python -m theory_core --help`."""
+import os
+import json
+import time
+import argparse
+import sys
+
+from .analysis import ConstructResolver
+from .errors import TheoryToolError
+from .export import CypherExporter, TableExporter
+from .graph import GraphRenderer
+from .llm import BulkIngestor, LLMProcessor, LLMResponseCache
+from .parsing import RawTheoryParser
+from .storage import IndexedTheoryDataManager, SQLiteTheoryDataManager, TheoryDataManager
+from .tracing import metrics
+
+
+def open_data_manager(args):
+    if args.db: return SQLiteTheoryDataManager(args.db, args.data)
+    return IndexedTheoryDataManager(args.data) if getattr(args, "lazy", False) else TheoryDataManager(args.data)
+
+
+def _cmd_load(args):
+    started = time.perf_counter()
+    data_manager = open_data_manager(args)
+    summaries = data_manager.theory_summaries()
+    elapsed = time.perf_counter() - started
+    counts = {key: sum(len(data_manager.get_theory(theory_id).get(key, [])) for theory_id, _, _ in summaries) for key in ("constructs", "triples", "annotations")}
+    print(f"Loaded {len(summaries)} theories ({sum(complete for _, _, complete in summaries)} complete): "
+          f"{counts['constructs']} constructs, {counts['triples']} triples, {counts['annotations']} annotations in {elapsed:.2f}s")
+    if getattr(data_manager, "journal_entries", 0): print(f"{data_manager.journal_entries} journaled updates not yet compacted into {data_manager.filepath}.")
+    return 0
+
+
+def _cmd_validate(args):
+    data_manager = open_data_manager(args)
+    started = time.perf_counter()
+    issues = data_manager.build_validator().report()
+    elapsed = time.perf_counter() - started
+    for issue in issues: print(f"{issue['severity'].upper()} theory {issue['theory_id']}: {issue['message']}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f: json.dump(issues, f, indent=4)
+    errors = sum(issue['severity'] == "error" for issue in issues)
+    print(f"{errors} errors, {len(issues) - errors} warnings in {len(data_manager.theories)} theories ({elapsed:.2f}s).")
+    return 1 if errors else 0
+
+
+def _cmd_search(args):
+    data_manager = open_data_manager(args)
+    started = time.perf_counter()
+    data_manager.build_search_index()
+    built = time.perf_counter()
+    hits = data_manager.search(args.query, args.limit)
+    elapsed = time.perf_counter() - built
+    for hit in hits:
+        where = f"{hit['kind']} {hit['row'] + 1}" if hit['row'] is not None else hit['kind']
+        print(f"{hit['score']:6.2f}  [{hit['theory_id']}] {hit['theory']} / {where}: {hit['text']}")
+    print(f"{len(hits)} hits in {elapsed * 1000:.1f} ms (index built in {(built - started) * 1000:.0f} ms)")
+    return 0 if hits else 1
+
+
+def _cmd_resolve_constructs(args):
+    data_manager = open_data_manager(args)
+    if args.reset:
+        data_manager.set_aliases({})
+        print("Cleared the construct alias table.")
+        return 0
+    if args.apply:
+        # Only a reviewed report is applied, so a false merge pruned from it never reaches the alias table.
+        with open(args.apply, 'r', encoding='utf-8') as f: reviewed = json.load(f)
+        if not isinstance(reviewed, list) or not all(isinstance(p, dict) and isinstance(p.get('alias'), str) and isinstance(p.get('canonical'), str) for p in reviewed):
+            raise TheoryToolError(f"{args.apply} is not a list of {{\"alias\": ..., \"canonical\": ...}} proposals, as written by --report.")
+        data_manager.set_aliases({**data_manager.aliases, **{p['alias']: p['canonical'] for p in reviewed}})
+        print(f"Applied {len(reviewed)} reviewed merges; the alias table now has {len(data_manager.aliases)} entries.")
+        return 0
+    started = time.perf_counter()
+    name_counts = data_manager.construct_name_counts()
+    proposals = ConstructResolver(args.min_cosine).propose(name_counts)
+    for proposal in proposals: print(f"{proposal['similarity']:.3f}  {proposal['alias']!r} -> {proposal['canonical']!r}")
+    print(f"{len(proposals)} merges proposed among {len(name_counts)} construct names ({time.perf_counter() - started:.2f}s)")
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f: json.dump(proposals, f, indent=2)
+        print(f"Review {args.report}, delete any wrong merges, then apply it with --apply {args.report}")
+    return 0
+
+
+def _cmd_influence(args):
+    data_manager = open_data_manager(args)
+    started = time.perf_counter()
+    index = data_manager.build_influence_index()
+    index.feedback_loops()
+    for name in (args.node, args.to):
+        if name and name not in index.graph: raise TheoryToolError(f"'{name}' has no influence edges in the graph.")
+    print(f"Index over {len(index.nodes())} constructs built in {time.perf_counter() - started:.2f}s")
+    if args.loops:
+        for loop in index.feedback_loops(args.node): print(f"Loop of {len(loop)}: {', '.join(loop)}")
+    if args.node and args.to:
+        started = time.perf_counter()
+        paths = index.influence_paths(args.node, args.to, args.k)
+        for path in paths: print(index.describe_path(path))
+        print(f"{len(paths)} paths ({(time.perf_counter() - started) * 1000:.1f} ms)")
+    elif args.node and not args.loops:
+        started = time.perf_counter()
+        upstream, downstream = index.ancestors(args.node), index.descendants(args.node)
+        elapsed = time.perf_counter() - started
+        print(f"Upstream of {args.node} ({len(upstream)}): {', '.join(upstream)}")
+        print(f"Downstream of {args.node} ({len(downstream)}): {', '.join(downstream)}")
+        print(f"({elapsed * 1000:.1f} ms)")
+    return 0
+
+
+def _cmd_simulate(args):
+    data_manager = open_data_manager(args)
+    theory_id = None
+    if args.theory:
+        matches = [tid for tid, name, _ in data_manager.theory_summaries() if name == args.theory or str(tid) == args.theory]
+        if not matches: raise TheoryToolError(f"No theory named '{args.theory}'.")
+        theory_id = matches[0]
+    started = time.perf_counter()
+    simulator = data_manager.build_simulator(theory_id)
+    print(f"Compiled {len(simulator.nodes)} constructs, {simulator.matrix.nnz} weighted edges in {time.perf_counter() - started:.2f}s")
+    options = {"steps": args.steps, "decay": args.decay}
+    if args.set:
+        scenario = {}
+        for assignment in args.set:
+            node, _, value = assignment.rpartition('=')
+            try: scenario[node or assignment] = float(value) if node else 1.0
+            except ValueError: raise TheoryToolError(f"Bad --set value in '{assignment}' (expected CONSTRUCT=NUMBER).")
+        for node, activation in simulator.simulate(scenario, args.top, **options): print(f"{activation:+.3f}  {node}")
+    if args.sweep:
+        started = time.perf_counter()
+        results = simulator.sweep(args.value, k=3, **options)
+        elapsed = time.perf_counter() - started
+        for result in results[:args.top]:
+            top = ", ".join(f"{node} {activation:+.2f}" for node, activation in result["top"])
+            print(f"{result['total_effect']:8.2f}  {result['intervention']}  ->  {top}")
+        print(f"Swept {len(results)} interventions in {elapsed:.2f}s")
+    return 0
+
+
+def _cmd_build_graph(args):
+    data_manager = open_data_manager(args)
+    started = time.perf_counter()
+    data_manager.build_graph()
+    graph = data_manager.graph
+    print(f"Graph: {graph.number_of_nodes()} nodes, {graph.number_of_edges()} edges ({time.perf_counter() - started:.2f}s)")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({"nodes": [{"id": n, **d} for n, d in graph.nodes(data=True)],
+                       "edges": [{"source": u, "target": v, **d} for u, v, d in graph.edges(data=True)]}, f, indent=2)
+        print(f"Wrote {args.json}")
+    if args.svg:
+        renderer = GraphRenderer(os.path.dirname(os.path.abspath(args.svg)))
+        try: path, _ = data_manager.visualize_graph(renderer, filename=os.path.basename(args.svg)).result()
+        finally: renderer.shutdown()
+        print(f"Wrote {path}")
+    return 0
+
+
+def _read_api_key(args):
+    if args.api_key: return args.api_key
+    if os.environ.get("GEMINI_API_KEY"): return os.environ["GEMINI_API_KEY"]
+    if os.path.exists("config.json"):
+        with open("config.json", 'r') as f: return json.load(f).get("api_key", "")
+    return ""
+
+
+def _cmd_parse(args):
+    with open(args.source, 'r', encoding='utf-8') as f:
+        started = time.perf_counter()
+        parser = RawTheoryParser()
+        for line in f: parser.feed(line)
+        parsed = parser.finish()
+    elapsed = time.perf_counter() - started
+    for record in parsed["report"]:
+        if record["status"] == "unparsed" or record["confidence"] < 1:
+            print(f"{record['line']:5d} {record['status']:8s} {record['confidence']:.2f}  {record['text']}")
+    unparsed = sum(r["status"] == "unparsed" for r in parsed["report"])
+    print(f"{len(parsed['constructs'])} constructs, {len(parsed['triples'])} triples, {len(parsed['annotations'])} annotations "
+          f"from {len(parsed['report'])} lines in {elapsed * 1000:.1f} ms; {unparsed} unparsed")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f: json.dump(parsed, f, indent=2)
+        print(f"Wrote {args.json}")
+    return 1 if unparsed else 0
+
+
+def _cmd_ingest(args):
+    api_key = "" if args.local_only else _read_api_key(args)
+    if not api_key: print("No API key: parsing locally only; items with unreadable lines are not written.", file=sys.stderr)
+    data_manager = open_data_manager(args)
+    cache = None if args.no_cache or not api_key else LLMResponseCache()
+    ingestor = BulkIngestor(data_manager, lambda on_error: LLMProcessor(api_key, args.endpoint, on_error, cache),
+                            max_workers=args.workers, requests_per_minute=args.rpm)
+    report = ingestor.run(ingestor.load_items(args.source))
+    if cache:
+        stats = cache.stats()
+        print(f"Cache: {stats['hits']} hits, {stats['misses']} misses, {stats['entries']} entries ({stats['bytes'] / 1e6:.1f} MB)")
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f: json.dump(report, f, indent=2)
+    return 0 if all(r['status'] == 'ok' for r in report) else 1
+
+
+def _cmd_export_cypher(args):
+    data_manager = open_data_manager(args)
+    exporter = CypherExporter()
+    started = time.perf_counter()
+    counts = exporter.export_corpus(data_manager, args.out, args.batch_size)
+    print(f"Exported {counts['theories']} theories, {counts['triples']} triples in {counts['batches']} batches "
+          f"to {args.out} ({time.perf_counter() - started:.2f}s)")
+    if not args.verify: return 0
+    differences = exporter.verify_corpus_export(data_manager, args.out)
+    for difference in differences: print(f"MISMATCH {difference}")
+    print("Bulk export matches the per-theory scripts." if not differences else f"{len(differences)} mismatches.")
+    return 1 if differences else 0
+
+
+def _cmd_export_tables(args):
+    data_manager = open_data_manager(args)
+    started = time.perf_counter()
+    counts = TableExporter(args.chunk_rows).export_corpus(data_manager, args.out, args.format or ["csv"], graphml=not args.no_graphml)
+    print(", ".join(f"{count} {table}" for table, count in counts.items()))
+    print(f"Wrote {', '.join(args.format or ['csv'])}{'' if args.no_graphml else ' and GraphML'} to {args.out} ({time.perf_counter() - started:.2f}s)")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Behavioral Theory Data Entry Tool, headless commands.")
+    parser.add_argument("--data", default="theory_data.json", help="Path to theory_data.json.")
+    parser.add_argument("--db", help="Use this SQLite database instead of the JSON file.")
+    parser.add_argument("--lazy", action="store_true", help="Open the JSON file through its sidecar index, parsing theories on demand.")
+    parser.add_argument("--trace-log", help="Enable tracing and append span records to this (rotated) log file.")
+    parser.add_argument("--metrics", action="store_true", help="Enable tracing and print a metrics summary on stderr when done.")
+    commands = parser.add_subparsers(dest="command")
+    load = commands.add_parser("load", help="Load the corpus (replaying the journal) and print a summary.")
+    load.set_defaults(handler=_cmd_load)
+    validate = commands.add_parser("validate", help="Check the schema, construct references, predicates and ontology ids.")
+    validate.add_argument("--json", help="Write the issues, with their section and row, to this JSON file.")
+    validate.set_defaults(handler=_cmd_validate)
+    search = commands.add_parser("search", help="Ranked, typo-tolerant search over names, descriptions, triples and annotations.")
+    search.add_argument("query")
+    search.add_argument("--limit", type=int, default=20)
+    search.set_defaults(handler=_cmd_search)
+    resolve = commands.add_parser("resolve-constructs", help="Propose merges of near-duplicate construct names, or apply a reviewed list of them.")
+    resolve.add_argument("--min-cosine", type=float, default=ConstructResolver.MIN_COSINE, help="Trigram similarity needed to consider a pair.")
+    resolve.add_argument("--apply", metavar="REPORT", help="Add the merges in this reviewed --report file to the alias table.")
+    resolve.add_argument("--reset", action="store_true", help="Clear the alias table instead.")
+    resolve.add_argument("--report", help="Write the proposals to this JSON file.")
+    resolve.set_defaults(handler=_cmd_resolve_constructs)
+    influence = commands.add_parser("influence", help="Upstream/downstream constructs, influence paths and feedback loops.")
+    influence.add_argument("node", nargs="?", help="Construct to query.")
+    influence.add_argument("--to", help="List the shortest influence paths from NODE to this construct.")
+    influence.add_argument("-k", type=int, default=5, help="How many paths to list.")
+    influence.add_argument("--loops", action="store_true", help="List feedback loops (only NODE's, if given).")
+    influence.set_defaults(handler=_cmd_influence)
+    simulate = commands.add_parser("simulate", help="Propagate interventions through the triple network and rank their effects.")
+    simulate.add_argument("--theory", help="Simulate one theory (name or id) instead of the merged graph.")
+    simulate.add_argument("--set", action="append", metavar="CONSTRUCT=VALUE", help="Clamp a construct to an activation in [-1, 1] (repeatable).")
+    simulate.add_argument("--sweep", action="store_true", help="Intervene on every construct in turn and rank them by total effect.")
+    simulate.add_argument("--value", type=float, default=1.0, help="Intervention strength used by --sweep.")
+    simulate.add_argument("--top", type=int, default=15, help="How many results to list.")
+    simulate.add_argument("--steps", type=int, default=50, help="Maximum propagation steps.")
+    simulate.add_argument("--decay", type=float, default=0.8, help="Per-step attenuation of propagated activation.")
+    simulate.set_defaults(handler=_cmd_simulate)
+    build_graph = commands.add_parser("build-graph", help="Build the relational graph of completed theories.")
+    build_graph.add_argument("--json", help="Write the graph's nodes and edges to this JSON file.")
+    build_graph.add_argument("--svg", help="Render the graph to this SVG file.")
+    build_graph.set_defaults(handler=_cmd_build_graph)
+    parse = commands.add_parser("parse", help="Parse one raw theory text locally and list low-confidence and unparsed lines.")
+    parse.add_argument("source", help="A text file with 'Theory triples' and 'Theory constructs and annotations' sections.")
+    parse.add_argument("--json", help="Write the parsed structure and per-line report to this JSON file.")
+    parse.set_defaults(handler=_cmd_parse)
+    ingest = commands.add_parser("ingest", help="Parse raw theory texts (locally, falling back to the LLM) and merge them in one write.")
+    ingest.add_argument("source", help="A JSONL file of {theory|theory_id, text} records, or a directory of <theory>.txt files.")
+    ingest.add_argument("--api-key")
+    ingest.add_argument("--endpoint", default=LLMProcessor.DEFAULT_ENDPOINT, help="generateContent URL (e.g. a local mock server).")
+    ingest.add_argument("--workers", type=int, default=4)
+    ingest.add_argument("--rpm", type=float, default=60, help="Maximum requests per minute (0 for unlimited).")
+    ingest.add_argument("--report", help="Write the per-item report to this JSON file.")
+    ingest.add_argument("--no-cache", action="store_true", help="Always call the API, ignoring llm_cache.db.")
+    ingest.add_argument("--local-only", action="store_true", help="Never call the API, even for lines the local parser cannot read.")
+    ingest.set_defaults(handler=_cmd_ingest)
+    export_cypher = commands.add_parser("export-cypher", help="Write a batched, parameterized Cypher import of the whole corpus.")
+    export_cypher.add_argument("--out", default=os.path.join("cypher_exports", "corpus"))
+    export_cypher.add_argument("--batch-size", type=int, default=CypherExporter.BATCH_SIZE)
+    export_cypher.add_argument("--verify", action="store_true", help="Check the output against the per-theory scripts.")
+    export_cypher.set_defaults(handler=_cmd_export_cypher)
+    export_tables = commands.add_parser("export-tables", help="Write normalized theory, construct, triple, annotation and graph tables for analytics.")
+    export_tables.add_argument("--out", default="table_exports")
+    export_tables.add_argument("--format", action="append", choices=sorted(TableExporter.FORMATS), help="csv (default), parquet or arrow; repeatable. Parquet and Arrow need pyarrow.")
+    export_tables.add_argument("--chunk-rows", type=int, default=TableExporter.CHUNK_ROWS, help="Rows per Parquet row group / Arrow record batch.")
+    export_tables.add_argument("--no-graphml", action="store_true", help="Skip graph.graphml.")
+    export_tables.set_defaults(handler=_cmd_export_tables)
+    return parser
+
+
+def run_command(args):
+    """Runs a parsed subcommand, reporting library errors on stderr; returns the exit status."""
+    if getattr(args, "trace_log", None) or getattr(args, "metrics", False): metrics.enable(args.trace_log)
+    try: return args.handler(args)
+    except TheoryToolError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if getattr(args, "metrics", False): print_metrics(file=sys.stderr)
+
+
+def print_metrics(file=sys.stdout):
+    snapshot = metrics.snapshot()
+    for summary in snapshot["summaries"]:
+        labels = ",".join(f"{k}={v}" for k, v in summary["labels"].items())
+        unit = 1000 if summary["name"].endswith("_seconds") else 1
+        print(f"{summary['name']}{'{' + labels + '}' if labels else ''}: n={summary['count']} mean={summary['mean'] * unit:.2f} max={summary['max'] * unit:.2f}"
+              + (" ms" if unit == 1000 else ""), file=file)
+    for counter in snapshot["counters"]:
+        labels = ",".join(f"{k}={v}" for k, v in counter["labels"].items())
+        print(f"{counter['name']}{'{' + labels + '}' if labels else ''}: {counter['value']}", file=file)
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not args.command: parser.print_help(); return 2
+    return run_command(args)
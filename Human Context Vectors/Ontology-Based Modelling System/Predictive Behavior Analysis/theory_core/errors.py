@@ -0,0 +1,21 @@
+"""Exceptions raised by the library instead of opening dialogs."""
+
+
+class TheoryToolError(Exception):
+    """Base class for errors raised by the library."""
+
+
+class LLMError(TheoryToolError):
+    """An LLM call failed or returned something unusable; `title` names the kind of failure."""
+    def __init__(self, title, message):
+        super().__init__(f"{title}: {message}")
+        self.title = title
+        self.message = message
+
+
+class GraphEmptyError(TheoryToolError):
+    """Raised when asked to render a graph with no nodes."""
+
+
+class PatchError(TheoryToolError):
+    """A chat edit patch does not fit the theory it was meant for."""
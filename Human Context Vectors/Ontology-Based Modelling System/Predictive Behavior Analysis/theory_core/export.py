@@ -0,0 +1,390 @@
+"""Cypher, CSV/Parquet/Arrow and GraphML exports of the corpus."""
+import os
+import json
+import re
+import csv
+import itertools
+
+from .errors import TheoryToolError
+from .tracing import metrics
+
+
+class CypherExporter:
+    """Writes theories as Neo4j Cypher, either one script per theory or as a corpus-wide bulk import.
+
+    The bulk import uses a fixed set of `UNWIND $rows AS row ...` statements, so Neo4j
+    can cache their plans. The rows go to numbered JSON parameter files listed in
+    manifest.json, in execution order, for driver-based loading. The same rows also go
+    to CSV files with a matching load_csv.cypher for LOAD CSV. Rows are flushed in
+    batches while the corpus is read one theory at a time, so memory stays flat.
+    """
+    BATCH_SIZE = 1000
+    THEORY_STATEMENT = "UNWIND $rows AS row MERGE (t:Theory {name: row.name})"
+    CONSTRUCT_STATEMENT = "UNWIND $rows AS row MERGE (c:Construct {name: row.name}) SET c += row.props"
+    HAS_CONSTRUCT_STATEMENT = ("UNWIND $rows AS row MATCH (t:Theory {name: row.theory}), (c:Construct {name: row.construct}) "
+                               "MERGE (t)-[:HAS_CONSTRUCT]->(c)")
+    TRIPLE_STATEMENT = ("UNWIND $rows AS row MATCH (a:Construct {name: row.subject}), (b:Construct {name: row.object}) "
+                        "MERGE (a)-[:{rel_type}]->(b)")
+
+    @staticmethod
+    def escape(text):
+        """Escapes single quotes for Cypher strings."""
+        return text.replace("'", "\\'")
+
+    @staticmethod
+    def relationship_type(predicate):
+        """The predicate as a Neo4j relationship type; RELATED_TO when nothing usable is left."""
+        rel_type = re.sub(r'[^a-zA-Z0-9_]', '_', predicate.upper().replace(" ", "_"))
+        return rel_type if rel_type.strip("_") else "RELATED_TO"
+
+    def theory_script(self, theory, annotations_by_construct):
+        """Returns the lines of a standalone Cypher script for one theory."""
+        theory_name_raw = theory.get("name", f"Theory_{theory.get('id')}")
+        theory_name_cypher = self.escape(theory_name_raw)
+        cypher_lines = [f"// Cypher script for {theory_name_raw}\n\n"]
+
+        cypher_lines.append("// Create the main theory node\n")
+        cypher_lines.append(f"MERGE (t:Theory {{name: '{theory_name_cypher}'}});\n\n")
+
+        cypher_lines.append("// Create construct nodes and add properties\n")
+        constructs = theory.get("constructs", [])
+        for construct in constructs:
+            name = self.escape(construct['name'])
+            desc = self.escape(construct.get('description', ''))
+            props = f"name: '{name}', description: '{desc}'"
+            if construct['name'] in annotations_by_construct:
+                # The construct's annotations are stored as one JSON string property.
+                props += f", annotations: '{self.escape(json.dumps(annotations_by_construct[construct['name']]))}'"
+            cypher_lines.append(f"MERGE (c:Construct {{name: '{name}'}})\nSET c += {{{props}}};\n")
+
+        cypher_lines.append("\n// Create relationships from the theory to its constructs\n")
+        for construct in constructs:
+            c_name = self.escape(construct['name'])
+            cypher_lines.append(f"MATCH (t:Theory {{name: '{theory_name_cypher}'}}), (c:Construct {{name: '{c_name}'}}) MERGE (t)-[:HAS_CONSTRUCT]->(c);\n")
+
+        cypher_lines.append("\n// Create relationships between constructs based on triples\n")
+        for triple in theory.get("triples", []):
+            subj = self.escape(triple['subject'])
+            obj = self.escape(triple['object'])
+            cypher_lines.append(f"MATCH (a:Construct {{name: '{subj}'}}), (b:Construct {{name: '{obj}'}}) MERGE (a)-[:{self.relationship_type(triple['predicate'])}]->(b);\n")
+        return cypher_lines
+
+    @staticmethod
+    def resolved_theory(data_manager, theory_id):
+        """The theory with construct aliases applied, and its annotations grouped by canonical construct."""
+        if not data_manager.aliases: return data_manager.get_theory(theory_id), data_manager.annotations_by_construct(theory_id)
+        theory = data_manager.canonical_theory(data_manager.get_theory(theory_id))
+        grouped = {}
+        for annotation in theory.get('annotations', []): grouped.setdefault(annotation['construct'], []).append(annotation)
+        return theory, grouped
+
+    def _theory_rows(self, theory, annotations_by_construct):
+        """Yields (kind, row) pairs describing one theory, mirroring theory_script."""
+        theory_name = theory.get("name", f"Theory_{theory.get('id')}")
+        yield "theories", {"name": theory_name}
+        for construct in theory.get("constructs", []):
+            props = {"name": construct['name'], "description": construct.get('description', '')}
+            if construct['name'] in annotations_by_construct:
+                props["annotations"] = json.dumps(annotations_by_construct[construct['name']])
+            yield "constructs", {"name": construct['name'], "props": props}
+        for construct in theory.get("constructs", []):
+            yield "has_construct", {"theory": theory_name, "construct": construct['name']}
+        for triple in theory.get("triples", []):
+            yield "triples:" + self.relationship_type(triple['predicate']), {"subject": triple['subject'], "object": triple['object']}
+
+    def export_corpus(self, data_manager, export_dir, batch_size=BATCH_SIZE):
+        """Streams every theory into parameter and CSV files under export_dir; returns counts."""
+        params_dir = os.path.join(export_dir, "params")
+        csv_dir = os.path.join(export_dir, "csv")
+        os.makedirs(params_dir, exist_ok=True)
+        os.makedirs(csv_dir, exist_ok=True)
+        csv_columns = {"theories": ["name"], "constructs": ["name", "description", "annotations"],
+                       "has_construct": ["theory", "construct"], "triples": ["type", "subject", "object"]}
+        csv_files = {kind: open(os.path.join(csv_dir, f"{kind}.csv"), 'w', encoding='utf-8', newline='') for kind in csv_columns}
+        csv_writers = {kind: csv.writer(f) for kind, f in csv_files.items()}
+        for kind, columns in csv_columns.items(): csv_writers[kind].writerow(columns)
+
+        pending, batches = {}, {}  # kind -> rows not yet flushed / manifest entries already written
+        counts = {"theories": 0, "triples": 0, "batches": 0}
+
+        def flush(kind):
+            rows = pending.pop(kind, [])
+            if not rows: return
+            counts["batches"] += 1
+            params_file = os.path.join("params", f"{counts['batches']:05d}_{kind.replace(':', '_').lower()}.json")
+            with open(os.path.join(export_dir, params_file), 'w', encoding='utf-8') as f: json.dump({"rows": rows}, f)
+            if kind.startswith("triples:"): statement = self.TRIPLE_STATEMENT.replace("{rel_type}", kind.split(":", 1)[1])
+            else: statement = {"theories": self.THEORY_STATEMENT, "constructs": self.CONSTRUCT_STATEMENT, "has_construct": self.HAS_CONSTRUCT_STATEMENT}[kind]
+            batches.setdefault(kind, []).append({"kind": kind, "statement": statement, "parameters": params_file, "rows": len(rows)})
+
+        try:
+            for theory_id, _, _ in data_manager.theory_summaries():
+                theory, annotations = self.resolved_theory(data_manager, theory_id)
+                counts["theories"] += 1
+                for kind, row in self._theory_rows(theory, annotations):
+                    if kind == "constructs":
+                        csv_writers[kind].writerow([row['name'], row['props']['description'], row['props'].get('annotations', '')])
+                    elif kind.startswith("triples:"):
+                        counts["triples"] += 1
+                        csv_writers["triples"].writerow([kind.split(":", 1)[1], row['subject'], row['object']])
+                    else:
+                        csv_writers[kind].writerow(list(row.values()))
+                    pending.setdefault(kind, []).append(row)
+                    if len(pending[kind]) >= batch_size: flush(kind)
+            for kind in list(pending): flush(kind)
+        finally:
+            for f in csv_files.values(): f.close()
+
+        # Nodes before relationships, so every MATCH sees the whole corpus's constructs.
+        phase = lambda kind: ["theories", "constructs", "has_construct"].index(kind) if ":" not in kind else 3
+        ordered = [entry for kind in sorted(batches, key=lambda k: (phase(k), k)) for entry in batches[kind]]
+        with open(os.path.join(export_dir, "manifest.json"), 'w', encoding='utf-8') as f:
+            json.dump({"batch_size": batch_size, "batches": ordered}, f, indent=2)
+        with open(os.path.join(export_dir, "statements.cypher"), 'w', encoding='utf-8') as f:
+            f.write("// Parameterized statements used by manifest.json; run each with $rows from its parameter file.\n")
+            for statement in dict.fromkeys(entry['statement'] for entry in ordered): f.write(statement + ";\n")
+        rel_types = sorted(kind.split(":", 1)[1] for kind in batches if kind.startswith("triples:"))
+        with open(os.path.join(export_dir, "load_csv.cypher"), 'w', encoding='utf-8') as f:
+            f.write("// Copy csv/*.csv into the Neo4j import directory, then run this script.\n")
+            f.write("LOAD CSV WITH HEADERS FROM 'file:///theories.csv' AS row MERGE (t:Theory {name: row.name});\n")
+            f.write("LOAD CSV WITH HEADERS FROM 'file:///constructs.csv' AS row MERGE (c:Construct {name: row.name}) "
+                    "SET c.description = coalesce(row.description, ''), c.annotations = coalesce(row.annotations, c.annotations);\n")
+            f.write("LOAD CSV WITH HEADERS FROM 'file:///has_construct.csv' AS row MATCH (t:Theory {name: row.theory}), "
+                    "(c:Construct {name: row.construct}) MERGE (t)-[:HAS_CONSTRUCT]->(c);\n")
+            for rel_type in rel_types:
+                f.write(f"LOAD CSV WITH HEADERS FROM 'file:///triples.csv' AS row WITH row WHERE row.type = '{rel_type}' "
+                        f"MATCH (a:Construct {{name: row.subject}}), (b:Construct {{name: row.object}}) MERGE (a)-[:{rel_type}]->(b);\n")
+        return counts
+
+    @staticmethod
+    def _apply(state, kind, row):
+        """Applies one statement's effect to a {theories, constructs, edges} model of the Neo4j graph."""
+        if kind == "theories": state["theories"].add(row["name"])
+        elif kind == "constructs":
+            props = state["constructs"].setdefault(row["name"], {})
+            props.update({k: v for k, v in row["props"].items() if v is not None})
+        elif kind == "has_construct":
+            if row["theory"] in state["theories"] and row["construct"] in state["constructs"]:
+                state["edges"].add(("HAS_CONSTRUCT", row["theory"], row["construct"]))
+        elif row["subject"] in state["constructs"] and row["object"] in state["constructs"]:
+            state["edges"].add((kind.split(":", 1)[1], row["subject"], row["object"]))
+
+    def verify_corpus_export(self, data_manager, export_dir):
+        """Checks a bulk export against the per-theory scripts; returns a list of differences.
+
+        The reference is the graph produced by running every per-theory script in id
+        order, twice. The second pass lets MATCHes see constructs declared by later
+        theories, which is what the bulk import does by creating all nodes first. The
+        per-theory scripts are parsed back from their text, so this checks what
+        theory_script really emits.
+        """
+        literal = re.compile(r"'((?:[^'\\]|\\.)*)'")
+        unescape = lambda text: text.replace("\\'", "'")
+        expected = {"theories": set(), "constructs": {}, "edges": set()}
+        scripts = [self.theory_script(*self.resolved_theory(data_manager, i)) for i, _, _ in data_manager.theory_summaries()]
+        for _ in range(2):
+            for lines in scripts:
+                script = "\n".join(line for line in "".join(lines).split("\n") if not line.startswith("//"))
+                for statement in script.split(";\n"):
+                    statement = statement.strip()
+                    if not statement: continue
+                    values = [unescape(v) for v in literal.findall(statement)]
+                    if statement.startswith("MERGE (t:Theory"): self._apply(expected, "theories", {"name": values[0]})
+                    elif statement.startswith("MERGE (c:Construct"):
+                        props = {"name": values[1], "description": values[2]}
+                        if len(values) > 3: props["annotations"] = values[3]
+                        self._apply(expected, "constructs", {"name": values[0], "props": props})
+                    elif "HAS_CONSTRUCT" in statement: self._apply(expected, "has_construct", {"theory": values[0], "construct": values[1]})
+                    else:
+                        rel_type = re.search(r"MERGE \(a\)-\[:(\w+)\]->\(b\)$", statement).group(1)
+                        self._apply(expected, "triples:" + rel_type, {"subject": values[0], "object": values[1]})
+
+        from_params = {"theories": set(), "constructs": {}, "edges": set()}
+        with open(os.path.join(export_dir, "manifest.json"), 'r', encoding='utf-8') as f: manifest = json.load(f)
+        for entry in manifest["batches"]:
+            with open(os.path.join(export_dir, entry["parameters"]), 'r', encoding='utf-8') as f:
+                for row in json.load(f)["rows"]: self._apply(from_params, entry["kind"], row)
+
+        from_csv = {"theories": set(), "constructs": {}, "edges": set()}
+        def read_csv(kind):
+            with open(os.path.join(export_dir, "csv", f"{kind}.csv"), 'r', encoding='utf-8', newline='') as f: return list(csv.DictReader(f))
+        for row in read_csv("theories"): self._apply(from_csv, "theories", row)
+        for row in read_csv("constructs"):
+            props = {"name": row["name"], "description": row["description"], "annotations": row["annotations"] or None}
+            self._apply(from_csv, "constructs", {"name": row["name"], "props": props})
+        for row in read_csv("has_construct"): self._apply(from_csv, "has_construct", row)
+        for row in read_csv("triples"): self._apply(from_csv, "triples:" + row["type"], row)
+
+        differences = []
+        for label, actual in (("parameter files", from_params), ("CSV files", from_csv)):
+            for key in ("theories", "constructs", "edges"):
+                if actual[key] != expected[key]:
+                    if isinstance(expected[key], dict):
+                        diff = sorted(k for k in expected[key].keys() | actual[key].keys() if expected[key].get(k) != actual[key].get(k))
+                    else:
+                        diff = sorted(map(str, expected[key] ^ actual[key]))
+                    differences.append(f"{label}: {len(diff)} {key} differ, e.g. {diff[:3]}")
+        return differences
+
+
+class _CSVTableWriter:
+    def __init__(self, path, columns):
+        self.file = open(path, 'w', encoding='utf-8', newline='')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow([name for name, _ in columns])
+
+    def write(self, row):
+        self.writer.writerow(["true" if v is True else "false" if v is False else v for v in row])
+
+    def close(self):
+        self.file.close()
+
+
+class _ArrowTableWriter:
+    """Writes rows as Arrow record batches of `chunk_rows` to a Parquet or Arrow IPC file.
+
+    "string" columns are dictionary-encoded against one dictionary per column that only
+    grows, so IPC files carry it as deltas and readers get a single categorical.
+    """
+    def __init__(self, path, columns, file_format, chunk_rows):
+        import pyarrow as pa
+        self.pa = pa
+        types = {"int32": pa.int32(), "bool": pa.bool_(), "text": pa.string(), "string": pa.dictionary(pa.int32(), pa.string())}
+        self.schema = pa.schema([(name, types[kind]) for name, kind in columns])
+        self.dictionaries = [({}, []) if kind == "string" else None for _, kind in columns]
+        self.chunk_rows = chunk_rows
+        self.rows = []
+        self.sink = None
+        if file_format == "parquet":
+            import pyarrow.parquet as pq
+            self.writer = pq.ParquetWriter(path, self.schema)
+        else:
+            self.sink = pa.OSFile(path, 'wb')
+            self.writer = pa.ipc.new_file(self.sink, self.schema, options=pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True))
+
+    def write(self, row):
+        self.rows.append(row)
+        if len(self.rows) >= self.chunk_rows: self.flush()
+
+    def flush(self):
+        if not self.rows: return
+        pa, arrays = self.pa, []
+        for i, (field, dictionary) in enumerate(zip(self.schema, self.dictionaries)):
+            values = [row[i] for row in self.rows]
+            if dictionary is None:
+                arrays.append(pa.array(values, field.type))
+                continue
+            index, pool = dictionary
+            for value in values:
+                if value not in index:
+                    index[value] = len(pool)
+                    pool.append(value)
+            arrays.append(pa.DictionaryArray.from_arrays(pa.array([index[v] for v in values], pa.int32()), pa.array(pool, pa.string())))
+        self.writer.write_batch(pa.record_batch(arrays, schema=self.schema))
+        self.rows = []
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+        if self.sink is not None: self.sink.close()
+
+
+class TableExporter:
+    """Writes the corpus as normalized, typed tables for pandas/DuckDB, plus the merged graph as GraphML.
+
+    Tables are theories, constructs, triples and annotations (keyed by theory_id and
+    row position, with alias-resolved names alongside the entered ones) and the
+    `build_graph` nodes and edges. Each table goes to CSV, Parquet or an Arrow IPC file,
+    which can be memory-mapped; the columnar formats dictionary-encode name columns and
+    need pyarrow. Theories are read one at a time and rows are written in chunks, so
+    memory stays flat.
+    """
+    CHUNK_ROWS = 10000
+    FORMATS = {"csv": ".csv", "parquet": ".parquet", "arrow": ".arrow"}
+    # "string" columns are dictionary-encoded in the columnar formats; "text" columns are stored plain.
+    TABLES = {
+        "theories": [("theory_id", "int32"), ("name", "string"), ("description", "text"), ("picture_path", "text"), ("complete", "bool"),
+                     ("constructs", "int32"), ("triples", "int32"), ("annotations", "int32")],
+        "constructs": [("theory_id", "int32"), ("position", "int32"), ("name", "string"), ("canonical_name", "string"), ("description", "text")],
+        "triples": [("theory_id", "int32"), ("position", "int32"), ("subject", "string"), ("predicate", "string"), ("object", "string"),
+                    ("canonical_subject", "string"), ("canonical_object", "string")],
+        "annotations": [("theory_id", "int32"), ("position", "int32"), ("construct", "string"), ("canonical_construct", "string"),
+                        ("relation", "string"), ("value", "text"), ("source", "text")],
+        "graph_nodes": [("node", "string"), ("type", "string"), ("description", "text"), ("annotations", "text")],
+        "graph_edges": [("source", "string"), ("target", "string"), ("label", "string"), ("theories", "text")],
+    }
+
+    def __init__(self, chunk_rows=CHUNK_ROWS):
+        self.chunk_rows = chunk_rows
+
+    def open_table(self, export_dir, table, file_format):
+        path = os.path.join(export_dir, table + self.FORMATS[file_format])
+        if file_format == "csv": return _CSVTableWriter(path, self.TABLES[table])
+        try: return _ArrowTableWriter(path, self.TABLES[table], file_format, self.chunk_rows)
+        except ImportError: raise TheoryToolError(f"Writing {file_format} files needs pyarrow (pip install pyarrow).") from None
+
+    def corpus_rows(self, data_manager):
+        """Yields (table, row) for the theory tables, reading one theory at a time."""
+        canonical = data_manager.canonical
+        for theory_id, _, _ in data_manager.theory_summaries():
+            theory = data_manager.get_theory(theory_id)
+            constructs, triples, annotations = (theory.get(key, []) for key in ("constructs", "triples", "annotations"))
+            yield "theories", (theory_id, theory.get('name', ''), theory.get('description', ''), theory.get('picture_path', ''),
+                               bool(theory.get('complete')), len(constructs), len(triples), len(annotations))
+            for i, c in enumerate(constructs):
+                yield "constructs", (theory_id, i, c.get('name', ''), canonical(c.get('name', '')), c.get('description', ''))
+            for i, t in enumerate(triples):
+                subject, obj = t.get('subject', ''), t.get('object', '')
+                yield "triples", (theory_id, i, subject, t.get('predicate', ''), obj, canonical(subject), canonical(obj))
+            for i, a in enumerate(annotations):
+                construct = a.get('construct', '')
+                yield "annotations", (theory_id, i, construct, canonical(construct), a.get('relation', ''), a.get('value', ''), str(a.get('source', '')))
+
+    def graph_rows(self, graph):
+        for node, data in graph.nodes(data=True):
+            yield "graph_nodes", (node, data.get('type', ''), data.get('description', ''), "\n".join(data.get('annotations', [])))
+        for u, v, data in graph.edges(data=True):
+            yield "graph_edges", (u, v, data.get('label', ''), " ".join(map(str, data.get('theories', []))))
+
+    def export_corpus(self, data_manager, export_dir, formats=("csv",), graphml=True):
+        """Writes every table in each of `formats` (and graph.graphml) under export_dir; returns row counts."""
+        unknown = set(formats) - set(self.FORMATS)
+        if unknown: raise TheoryToolError(f"Unknown table format(s): {', '.join(sorted(unknown))}.")
+        os.makedirs(export_dir, exist_ok=True)
+        counts = dict.fromkeys(self.TABLES, 0)
+        writers = {}
+        try:
+            for file_format in formats:
+                for table in self.TABLES: writers[(table, file_format)] = self.open_table(export_dir, table, file_format)
+            with metrics.span("export_tables", formats=",".join(formats)):
+                data_manager.build_graph()
+                for table, row in itertools.chain(self.corpus_rows(data_manager), self.graph_rows(data_manager.graph)):
+                    counts[table] += 1
+                    for file_format in formats: writers[(table, file_format)].write(row)
+        finally:
+            for writer in writers.values(): writer.close()
+        if graphml: self.write_graphml(data_manager.graph, os.path.join(export_dir, "graph.graphml"))
+        return counts
+
+    @staticmethod
+    def write_graphml(graph, path):
+        """Streams the graph to GraphML, one element per line; list attributes are newline-joined."""
+        from xml.sax.saxutils import escape, quoteattr
+        keys = [("d0", "node", "type"), ("d1", "node", "description"), ("d2", "node", "annotations"),
+                ("d3", "edge", "label"), ("d4", "edge", "theories")]
+        def data(key, value):
+            return f'<data key="{key}">{escape(value)}</data>' if value else ""
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                    '<graphml xmlns="http://graphml.graphdrawing.org/xmlns" '
+                    'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+                    'xsi:schemaLocation="http://graphml.graphdrawing.org/xmlns http://graphml.graphdrawing.org/xmlns/1.0/graphml.xsd">\n')
+            for key, domain, name in keys: f.write(f'  <key id="{key}" for="{domain}" attr.name="{name}" attr.type="string"/>\n')
+            f.write('  <graph id="theories" edgedefault="directed">\n')
+            for node, attrs in graph.nodes(data=True):
+                f.write(f'    <node id={quoteattr(node)}>{data("d0", attrs.get("type", ""))}{data("d1", attrs.get("description", ""))}'
+                        f'{data("d2", chr(10).join(attrs.get("annotations", [])))}</node>\n')
+            for u, v, attrs in graph.edges(data=True):
+                f.write(f'    <edge source={quoteattr(u)} target={quoteattr(v)}>{data("d3", attrs.get("label", ""))}'
+                        f'{data("d4", " ".join(map(str, attrs.get("theories", []))))}</edge>\n')
+            f.write('  </graph>\n</graphml>\n')
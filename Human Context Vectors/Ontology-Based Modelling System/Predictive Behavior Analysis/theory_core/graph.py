@@ -0,0 +1,130 @@
+"""Graph layout and SVG rendering in a worker process."""
+import os
+import json
+import threading
+import hashlib
+import math
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .tracing import metrics
+
+
+def _layout_and_draw(nodes, edges, seed_positions, out_path, title):
+    """Worker-process entry point: lays out the graph, writes it as SVG, returns (path, positions).
+
+    Nodes that already have a position keep it; only new nodes are placed, so
+    repeated renders of a slowly changing graph stay visually stable.
+    """
+    import matplotlib
+    import networkx as nx
+    from matplotlib.figure import Figure
+    graph = nx.DiGraph()
+    graph.add_nodes_from((name, {"type": node_type}) for name, node_type in nodes)
+    graph.add_edges_from((u, v, {"label": label}) for u, v, label in edges)
+
+    known = {n: tuple(seed_positions[n]) for n in graph if n in seed_positions}
+    if len(known) == graph.number_of_nodes():
+        pos = known
+    elif not known:
+        try:
+            from networkx.drawing.nx_pydot import graphviz_layout
+            pos = graphviz_layout(graph, prog='neato')
+        except (ImportError, OSError, FileNotFoundError):
+            pos = nx.spring_layout(graph, k=0.15, iterations=50, seed=42)
+    else:
+        initial = dict(known)
+        for n in graph:
+            if n in initial: continue
+            placed = [initial[m] for m in nx.all_neighbors(graph, n) if m in initial]
+            if placed: initial[n] = (sum(x for x, _ in placed) / len(placed), sum(y for _, y in placed) / len(placed))
+        pos = nx.spring_layout(graph, pos=initial or None, fixed=list(known), k=0.15, iterations=50, seed=42)
+
+    # Scale the canvas with the graph, within bounds; SVG keeps it sharp at any zoom.
+    # Text stays as SVG <text> and labels are plain ax.text calls: converting glyphs to
+    # paths and laying out rotated label boxes cost far more than the layout itself.
+    size = min(60, max(8, math.sqrt(graph.number_of_nodes()) * 1.2))
+    with matplotlib.rc_context({'svg.fonttype': 'none'}):
+        fig = Figure(figsize=(size, size))
+        ax = fig.add_subplot()
+        ax.set_axis_off()
+        node_colors = ['red' if d.get('type') == 'theory' else 'skyblue' for _, d in graph.nodes(data=True)]
+        nx.draw_networkx_edges(graph, pos, ax=ax, arrows=graph.number_of_edges() <= GraphRenderer.ARROW_EDGE_LIMIT, node_size=600, edge_color='gray', width=0.6)
+        nx.draw_networkx_nodes(graph, pos, ax=ax, node_color=node_colors, node_size=600)
+        for node, (x, y) in pos.items(): ax.text(x, y, node, fontsize=6, ha='center', va='center')
+        for u, v, label in edges:
+            (x1, y1), (x2, y2) = pos[u], pos[v]
+            ax.text((x1 + x2) / 2, (y1 + y2) / 2, label, fontsize=5, color='green', ha='center', va='center')
+        ax.set_title(title, size=max(12, size / 2))
+        fig.savefig(out_path, format='svg')
+    return out_path, {n: [float(x), float(y)] for n, (x, y) in pos.items()}
+
+
+class GraphRenderer:
+    """Renders graphs to SVG in a worker process, reusing cached node positions.
+
+    Positions are cached on disk keyed by a hash of the graph's structure, so an
+    unchanged graph is never laid out twice. A changed graph is seeded with the
+    most recent positions, so only new nodes move.
+    """
+    MAX_CACHED_LAYOUTS = 8
+    ARROW_EDGE_LIMIT = 500  # Above this, edges are drawn as plain lines; per-edge arrow patches are slow.
+
+    def __init__(self, output_dir="output"):
+        self.output_dir = output_dir
+        self.cache_path = os.path.join(output_dir, "graph_layout_cache.json")
+        self.lock = threading.Lock()
+        self.executor = None
+        self.pending = 0  # Renders submitted and not yet finished.
+        self.layouts = {}  # graph hash -> {node: [x, y]}, oldest first
+        self.positions = {}  # latest known position of every node ever laid out
+        if os.path.exists(self.cache_path):
+            with open(self.cache_path, 'r', encoding='utf-8') as f: self.layouts = json.load(f)
+            for layout in self.layouts.values(): self.positions.update(layout)
+
+    @staticmethod
+    def graph_hash(graph):
+        digest = hashlib.sha1()
+        for node in sorted(map(str, graph.nodes)): digest.update(node.encode('utf-8') + b"\0")
+        digest.update(b"\1")
+        for u, v in sorted((str(u), str(v)) for u, v in graph.edges): digest.update(u.encode('utf-8') + b"\0" + v.encode('utf-8') + b"\0")
+        return digest.hexdigest()
+
+    def render(self, graph, filename, title):
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+        os.makedirs(self.output_dir, exist_ok=True)
+        out_path = os.path.abspath(os.path.join(self.output_dir, filename))
+        key = self.graph_hash(graph)
+        with self.lock: seed = self.layouts.get(key) or {n: self.positions[n] for n in graph if n in self.positions}
+        nodes = [(n, d.get('type', 'construct')) for n, d in graph.nodes(data=True)]
+        edges = [(u, v, d.get('label', '')) for u, v, d in graph.edges(data=True)]
+        with self.lock: self.pending += 1
+        metrics.observe("graph_render_queue_depth", self.pending - 1)
+        submitted = time.perf_counter()
+        future = self.executor.submit(_layout_and_draw, nodes, edges, seed, out_path, title)
+        future.add_done_callback(lambda f: self._render_done(key, f, submitted))
+        return future
+
+    def _render_done(self, key, future, submitted):
+        with self.lock: self.pending -= 1
+        # Measured from submission, so time spent queued behind an earlier render is included.
+        metrics.observe("graph_render_seconds", time.perf_counter() - submitted, cached_layout=str(key in self.layouts).lower())
+        metrics.count("graph_renders_total", outcome="failed" if future.cancelled() or future.exception() else "ok")
+        self._remember_layout(key, future)
+
+    def _remember_layout(self, key, future):
+        if future.cancelled() or future.exception(): return
+        _, positions = future.result()
+        with self.lock:
+            self.layouts.pop(key, None)
+            self.layouts[key] = positions
+            while len(self.layouts) > self.MAX_CACHED_LAYOUTS: self.layouts.pop(next(iter(self.layouts)))
+            self.positions.update(positions)
+            tmp_path = self.cache_path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f: json.dump(self.layouts, f)
+            os.replace(tmp_path, self.cache_path)
+
+    def shutdown(self):
+        if self.executor: self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,108 @@
+"""Background decoding of theory pictures into cached thumbnails."""
+import os
+import json
+import threading
+import hashlib
+
+from .tracing import metrics
+
+
+class ThumbnailCache:
+    """Downsampled copies of theory pictures, decoded off the Tk thread and cached on disk.
+
+    Thumbnails are PNG files in `directory`, keyed by the picture's absolute path, mtime,
+    file size and the requested box, so editing a picture invalidates its thumbnails.
+    JPEGs are decoded at reduced scale with PIL's `draft`; other formats are shrunk with
+    `reduce` before the final resample. The oldest files are evicted once the cache
+    exceeds `max_bytes`. Pillow is imported on first use.
+    """
+    BOX_STEP = 32  # Requested boxes are rounded down to this, so small resizes reuse thumbnails.
+    PRUNE_EVERY = 50
+
+    def __init__(self, directory="thumbnail_cache", max_bytes=100 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = self.misses = 0
+        self.writes = 0
+        self.lock = threading.Lock()
+
+    @classmethod
+    def quantize(cls, box):
+        return tuple(max(cls.BOX_STEP, side - side % cls.BOX_STEP) for side in box)
+
+    @staticmethod
+    def signature(path):
+        """(absolute path, mtime_ns, size) of a picture, or None if it does not exist."""
+        try: stat = os.stat(path)
+        except OSError: return None
+        return os.path.abspath(path), stat.st_mtime_ns, stat.st_size
+
+    def cache_path(self, signature, box):
+        key = hashlib.sha1(json.dumps([*signature, *box]).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, key[:2], key + ".png")
+
+    def thumbnail(self, path, box):
+        """Returns a loaded PIL image no larger than `box` (quantized); safe to call from worker threads."""
+        from PIL import Image
+        box = self.quantize(box)
+        signature = self.signature(path)
+        if signature is None: raise FileNotFoundError(path)
+        cached = self.cache_path(signature, box)
+        if os.path.exists(cached):
+            try:
+                with Image.open(cached) as image:
+                    image.load()
+                    with self.lock: self.hits += 1
+                    metrics.count("thumbnail_cache_total", outcome="hit")
+                    return image.copy()
+            except OSError:
+                pass  # A truncated cache file; decode the original again.
+        with self.lock: self.misses += 1
+        metrics.count("thumbnail_cache_total", outcome="miss")
+        with metrics.span("thumbnail_decode") as span, Image.open(path) as image:
+            span.set(width=image.width, height=image.height, format=image.format)
+            if image.format == "JPEG": image.draft("RGB", box)  # Let the decoder scale by 1/2, 1/4 or 1/8.
+            image.load()
+            thumb = image
+            if thumb.mode not in ("RGB", "RGBA"): thumb = thumb.convert("RGBA" if "transparency" in thumb.info or thumb.mode in ("LA", "PA") else "RGB")
+            factor = min(thumb.width // box[0], thumb.height // box[1])
+            thumb = thumb.reduce(factor) if factor >= 2 else thumb.copy()
+            thumb.thumbnail(box, Image.Resampling.LANCZOS)
+        self._store(cached, thumb)
+        return thumb
+
+    def _store(self, cached, thumb):
+        os.makedirs(os.path.dirname(cached), exist_ok=True)
+        temp = f"{cached}.{threading.get_ident()}.tmp"
+        try:
+            thumb.save(temp, "PNG")
+            os.replace(temp, cached)
+        except OSError:
+            if os.path.exists(temp): os.remove(temp)
+            return
+        with self.lock:
+            self.writes += 1
+            prune = self.writes % self.PRUNE_EVERY == 0
+        if prune: self.prune()
+
+    def prune(self):
+        """Deletes the least recently written thumbnails until the cache fits in `max_bytes`."""
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if not name.endswith(".png"): continue
+                full = os.path.join(root, name)
+                try: stat = os.stat(full)
+                except OSError: continue
+                files.append((stat.st_mtime, stat.st_size, full))
+        total = sum(size for _, size, _ in files)
+        for _, size, full in sorted(files):
+            if total <= self.max_bytes: break
+            try: os.remove(full)
+            except OSError: continue
+            total -= size
+        return total
+
+    def clear(self):
+        import shutil
+        shutil.rmtree(self.directory, ignore_errors=True)
@@ -0,0 +1,181 @@
+"""Background work: a rate limiter and the prioritized, cancellable job scheduler."""
+import threading
+import time
+import heapq
+import itertools
+import queue
+
+from .tracing import metrics
+
+
+class RateLimiter:
+    """Thread-safe limiter that spaces calls evenly to at most `per_minute` per minute."""
+    def __init__(self, per_minute):
+        self.interval = 60.0 / per_minute if per_minute else 0.0
+        self.next_slot = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until the caller may proceed; returns the seconds spent waiting."""
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        wait = slot - now
+        if wait > 0: time.sleep(wait)
+        metrics.observe("rate_limit_wait_seconds", max(wait, 0.0))
+        return wait
+
+
+class Job:
+    """One unit of background work tracked by a JobScheduler; `function(job, *args)` may poll `job.cancel_event`."""
+    __slots__ = ('id', 'label', 'key', 'priority', 'function', 'args', 'on_done', 'on_error', 'cancel_event',
+                 'state', 'detail', 'submitted', 'started', 'finished', 'future')
+
+    def __init__(self, job_id, label, key, priority, function, args, on_done, on_error):
+        self.id, self.label, self.key, self.priority = job_id, label, key, priority
+        self.function, self.args, self.on_done, self.on_error = function, args, on_done, on_error
+        self.cancel_event = threading.Event()
+        self.state, self.detail = "queued", ""
+        self.submitted, self.started, self.finished = time.monotonic(), None, None
+        self.future = None
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    @property
+    def elapsed(self):
+        if self.started is None: return 0.0
+        return (self.finished or time.monotonic()) - self.started
+
+
+class JobScheduler:
+    """Bounded, prioritized worker pool that hands results back to a single UI thread.
+
+    `submit` queues `function(job, *args)`; a job whose `key` matches one still queued or
+    running is not queued again, the existing job is returned instead. Lower priority
+    numbers run first (CHAT, then INTERACTIVE, then BULK), in submission order within a
+    priority. Workers never call back into the UI: completions and `call_soon` callbacks
+    are queued and run by `drain`, which the UI calls from its own event loop. A cancelled
+    job's `cancel_event` is set and its completion callback is dropped. Futures from other
+    executors (e.g. graph renders) can be listed and cancelled alongside via `track`.
+    """
+    CHAT, INTERACTIVE, BULK = 0, 5, 10
+    KEEP_FINISHED = 20
+
+    def __init__(self, max_workers=3):
+        self.max_workers = max_workers
+        self.lock = threading.Condition()
+        self.queue = []  # heap of (priority, sequence, job)
+        self.sequence = itertools.count(1)
+        self.active = {}  # key -> queued or running job
+        self.jobs = {}  # id -> job, oldest first; finished ones are trimmed to KEEP_FINISHED
+        self.workers = 0
+        self.idle = 0
+        self.callbacks = queue.SimpleQueue()
+        self.version = 0  # Bumped on every state change, so a job list knows when to redraw.
+        self.closed = False
+
+    def in_flight(self, key):
+        with self.lock: return self.active.get(key)
+
+    def submit(self, label, function, *args, key=None, priority=INTERACTIVE, on_done=None, on_error=None):
+        with self.lock:
+            if key is not None and key in self.active:
+                metrics.count("jobs_deduplicated_total")
+                return self.active[key]
+            job_id = next(self.sequence)
+            job = Job(job_id, label, key, priority, function, args, on_done, on_error)
+            self._add(job)
+            heapq.heappush(self.queue, (priority, job_id, job))
+            if self.idle == 0 and self.workers < self.max_workers:
+                self.workers += 1
+                threading.Thread(target=self._work, name=f"job-worker-{self.workers}", daemon=True).start()
+            self.lock.notify()
+        return job
+
+    def track(self, label, future, on_done=None, key=None):
+        """Lists a Future run elsewhere as a running job; `on_done(future)` runs on the UI thread."""
+        with self.lock:
+            on_error = (lambda error: on_done(future)) if on_done else None  # on_done inspects the future either way.
+            job = Job(next(self.sequence), label, key, self.INTERACTIVE, None, (), on_done, on_error)
+            job.state, job.started, job.future = "running", time.monotonic(), future
+            self._add(job)
+        future.add_done_callback(lambda f: self._finish(job, f, None if f.cancelled() else f.exception()))
+        return job
+
+    def _add(self, job):
+        self.jobs[job.id] = job
+        if job.key is not None: self.active[job.key] = job
+        self.version += 1
+
+    def cancel(self, job):
+        job.cancel_event.set()
+        if job.future is not None: job.future.cancel()
+        with self.lock:
+            if job.state == "queued":
+                job.state, job.finished = "cancelled", time.monotonic()
+                self._release(job)
+            elif job.state == "running": job.detail = "cancelling"
+            self.version += 1
+
+    def call_soon(self, callback, *args):
+        """Queues `callback(*args)` to run on the UI thread at the next `drain`; safe from any thread."""
+        self.callbacks.put((callback, args))
+
+    def drain(self, limit=500):
+        """Runs queued UI callbacks on the calling thread; returns how many ran."""
+        ran = 0
+        while ran < limit:
+            try: callback, args = self.callbacks.get_nowait()
+            except queue.Empty: break
+            ran += 1
+            callback(*args)
+        return ran
+
+    def snapshot(self):
+        with self.lock: return [{"id": j.id, "label": j.label, "state": j.state, "detail": j.detail, "elapsed": j.elapsed} for j in self.jobs.values()]
+
+    def shutdown(self):
+        with self.lock:
+            self.closed = True
+            jobs = [j for j in self.jobs.values() if j.state in ("queued", "running")]
+            self.lock.notify_all()
+        for job in jobs: self.cancel(job)
+
+    def _release(self, job):
+        if job.key is not None and self.active.get(job.key) is job: del self.active[job.key]
+        finished = [j for j in self.jobs.values() if j.finished is not None]
+        for old in finished[:max(0, len(finished) - self.KEEP_FINISHED)]: del self.jobs[old.id]
+
+    def _work(self):
+        while True:
+            with self.lock:
+                self.idle += 1
+                while not self.queue and not self.closed: self.lock.wait()
+                self.idle -= 1
+                if self.closed:
+                    self.workers -= 1
+                    return
+                _, _, job = heapq.heappop(self.queue)
+                if job.state != "queued": continue  # Cancelled while queued.
+                job.state, job.started = "running", time.monotonic()
+                self.version += 1
+            metrics.observe("job_queue_wait_seconds", job.started - job.submitted, priority=job.priority)
+            try: result, error = job.function(job, *job.args), None
+            except Exception as e: result, error = None, e
+            self._finish(job, result, error)
+
+    def _finish(self, job, result, error):
+        with self.lock:
+            job.finished = time.monotonic()
+            job.state = "cancelled" if job.cancelled else "failed" if error is not None else "done"
+            if error is not None: job.detail = str(error)
+            self._release(job)
+            self.version += 1
+        metrics.count("jobs_total", state=job.state)
+        if job.cancelled: return
+        if error is not None:
+            if job.on_error: self.call_soon(job.on_error, error)
+        elif job.on_done: self.call_soon(job.on_done, result)
@@ -0,0 +1,576 @@
+"""The LLM client, its response cache, chat context selection and bulk ingestion."""
+import os
+import json
+import threading
+import re
+import sqlite3
+import hashlib
+import time
+import random
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .errors import LLMError, PatchError
+from .jobs import RateLimiter
+from .parsing import RawTheoryParser, TheoryPatch
+from .tracing import metrics
+from .validation import TheoryValidator
+
+
+class LLMResponseCache:
+    """On-disk cache of LLM responses keyed by a hash of endpoint (model) + request payload.
+
+    Entries are evicted least-recently-used once the cache exceeds `max_bytes`, and
+    expire after `max_age_days`. Safe to share between worker threads.
+    """
+    def __init__(self, path="llm_cache.db", max_bytes=200 * 1024 * 1024, max_age_days=30):
+        self.max_bytes = max_bytes
+        self.max_age_s = max_age_days * 86400
+        self.hits = self.misses = self.evictions = 0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL,
+                created_at REAL NOT NULL, last_used REAL NOT NULL);
+            CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used);
+        """)
+
+    @staticmethod
+    def make_key(endpoint, payload):
+        return hashlib.sha256(json.dumps([endpoint, payload], sort_keys=True).encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        now = time.time()
+        with self.lock, self.conn:
+            row = self.conn.execute("SELECT response, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.max_age_s:
+                if row is not None: self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            self.conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, response):
+        now = time.time()
+        size = len(response.encode('utf-8'))
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)", (key, response, size, now, now))
+            self.conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.max_age_s,))
+            total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total <= self.max_bytes: return
+            for old_key, old_size in self.conn.execute("SELECT key, size FROM responses ORDER BY last_used").fetchall():
+                if total <= self.max_bytes: break
+                self.conn.execute("DELETE FROM responses WHERE key = ?", (old_key,))
+                total -= old_size
+                self.evictions += 1
+
+    def discard(self, key):
+        with self.lock, self.conn: self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    def clear(self):
+        with self.lock, self.conn: self.conn.execute("DELETE FROM responses")
+
+    def stats(self):
+        with self.lock:
+            entries, total = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {"entries": entries, "bytes": total, "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+class LLMProcessor:
+    """Handles interaction with the Gemini LLM for data parsing and generation.
+
+    `endpoint` can point at any generateContent-compatible server (e.g. a local mock),
+    and `error_handler(title, message)` replaces the default of raising `LLMError`.
+    All instances share one pooled keep-alive HTTP session, so creating a processor per
+    action is cheap. With an `LLMResponseCache`, identical requests are answered from disk.
+    """
+    DEFAULT_ENDPOINT = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent"
+    TIMEOUT = (10, 90)  # (connect, read) seconds
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+    MAX_RETRIES = 4
+    BACKOFF_BASE_S = 1.0
+    BACKOFF_CAP_S = 30.0
+    _session = None
+    _session_lock = threading.Lock()
+
+    def __init__(self, api_key, endpoint=DEFAULT_ENDPOINT, error_handler=None, cache=None):
+        self.api_key = api_key
+        self.endpoint = endpoint
+        self.cache = cache
+        self.api_url = f"{endpoint}?key={self.api_key}"
+        self.stream_url = f"{endpoint.replace(':generateContent', ':streamGenerateContent')}?alt=sse&key={self.api_key}"
+        self.report_error = error_handler or self.raise_error
+
+    @staticmethod
+    def raise_error(title, message):
+        raise LLMError(title, message)
+
+    @classmethod
+    def shared_session(cls):
+        with cls._session_lock:
+            if cls._session is None:
+                import requests
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                cls._session = session
+            return cls._session
+
+    def create_parsing_prompt(self):
+        """Creates the detailed instruction prompt for parsing raw data."""
+        return """
+You are an expert data parsing assistant. Your task is to read raw text containing behavioral theory data and convert it into a structured JSON object. The JSON object must have three keys: "constructs", "triples", and "annotations".
+
+1.  **Parse "Theory triples"**:
+    * This section starts with the line "Theory triples".
+    * Each line represents a relationship: "Subject Predicate Object".
+    * Convert each line into a JSON object `{"subject": "...", "predicate": "...", "object": "..."}`.
+    * For complex relationships like "Subject influences the 'ObjectA' to 'ObjectB' Predicate relationship", the object is the entire quoted phrase. Example: `{"subject": "Situational Forces", "predicate": "influences", "object": "the 'Performance of goal-directed behaviours' to 'Goal attainment / failure' Influences relationship"}`.
+    * The output should be a JSON list under the key "triples".
+
+2.  **Parse "Theory constructs and annotations"**:
+    * This section starts with "Theory constructs and annotations".
+    * From this section, you will populate TWO JSON lists: "constructs" and "annotations".
+    * **"constructs" list**: Create a list of all unique construct names found in this section. Each item should be a JSON object `{"name": "Construct Name", "description": ""}`. The description will be empty.
+    * **"annotations" list**: Each line in the raw text represents one or more annotations for a construct. A line looks like: `ConstructName [ ID (Value) SourceNumbers , ID2 (Value2) SourceNumbers2 ]`.
+    * For each annotation block `[ ... ]`, create a separate JSON object.
+    * Each annotation object must have the keys: "construct", "relation", "value", "source".
+    * `"construct"`: The name of the construct on that line.
+    * `"relation"`: The identifier string (e.g., "BCIO:050564").
+    * `"value"`: The text inside the parentheses (e.g., "Affective attitude acquired through association").
+    * `"source"`: All the numbers following the value, joined into a single string (e.g., "1 82 69 22 5"). If there is only one number, it is the source.
+
+Example: `Desire [ MF:0000045 (Wanting) 1 , BCIO:006075 (Subjective need) 1 82 69 22 5 ]` should produce TWO annotation objects:
+- `{"construct": "Desire", "relation": "MF:0000045", "value": "Wanting", "source": "1"}`
+- `{"construct": "Desire", "relation": "BCIO:006075", "value": "Subjective need", "source": "1 82 69 22 5"}`
+
+Output ONLY the final, validated JSON object and nothing else.
+"""
+
+    def create_description_prompt(self, theory_name, constructs, triples):
+        """Creates a prompt for the LLM to generate a theory description."""
+        construct_list = "\n".join([f"- {c['name']}" for c in constructs])
+        triple_list = "\n".join([f"- {t['subject']} {t['predicate']} {t['object']}" for t in triples])
+        
+        return f"""
+You are a behavioral science expert. Based on the provided components of a theory, write a concise, academic paragraph summarizing it. The summary should explain the core idea of the theory by integrating its constructs and their relationships.
+
+**Theory Name:** {theory_name}
+**Core Constructs:**
+{construct_list}
+**Relationships (Triples):**
+{triple_list}
+
+**Generated Summary:**
+"""
+
+    def create_chat_prompt(self):
+        """Creates the system prompt for the conversational chat agent."""
+        return """
+You are a conversational AI assistant embedded in a data entry tool for behavioral theories.
+Your capabilities are:
+1.  **Answering Questions**: You can answer questions about any of the theories provided in the context.
+2.  **Modifying Data**: You can modify the data for the **currently selected theory ONLY**. The current theory is identified by its ID.
+
+**Input Format:**
+The user's prompt will be preceded by a JSON list of theories and the ID of the currently selected one. The current theory is always included in full. The other theories are the ones most related to the current theory and the user's message; some of them may be abbreviated to their name, description and construct names. If a question needs a theory that is not in the context, say so.
+
+**Output Format:**
+You MUST respond with a single JSON object. Your response format depends on the user's request:
+
+A) **For simple conversation or questions** (e.g., "Hello", "What is Theory of Planned Behavior?", "Compare theory 1 and 2"):
+   Respond with a JSON object containing a single "response" key.
+   Example:
+   {
+     "response": "Hello! I am ready to assist you with your behavioral theories. How can I help?"
+   }
+
+B) **For modification requests** (e.g., "change the name to 'New Name'", "add a construct for 'self-efficacy'", "remove the triple about desire", "update the description"):
+   Respond with a JSON object with a "patch" key holding a list of edit operations on the **currently selected theory**, and a "summary" key with one sentence describing the change. Change only what was asked and never repeat unchanged rows.
+   Operations follow JSON Patch (RFC 6902). Paths are JSON Pointers into the theory, and row indices count from 0 in the order the rows appear in the context:
+   * `{"op": "replace", "path": "/name", "value": "New Name"}` (likewise "/description", "/picture_path" and "/complete").
+   * `{"op": "add", "path": "/constructs/-", "value": {"name": "...", "description": "..."}}` appends a row; "/triples/4" would insert before row 4.
+   * `{"op": "replace", "path": "/triples/4/object", "value": "..."}` changes one field; "/triples/4" with a full row replaces the row.
+   * `{"op": "remove", "path": "/annotations/7"}` removes a row.
+   * `{"op": "test", "path": "/triples/4", "value": {"subject": "...", "predicate": "...", "object": "..."}}` checks a row. Put a test before every remove or replace that uses an index.
+   * `{"op": "remove", "path": "/triples", "match": {"subject": "Desire"}}` removes every row whose fields equal "match"; `{"op": "replace", "path": "/triples", "match": {...}, "value": {"predicate": "..."}}` sets fields on every matching row.
+   * `{"op": "rename", "from": "Old Name", "to": "New Name"}` renames a construct in its row, the triples and the annotations.
+   Operations apply in order, so indices refer to the theory as changed by the earlier operations. Rows are constructs `{"name", "description"}`, triples `{"subject", "predicate", "object"}` and annotations `{"construct", "relation", "value", "source"}`.
+
+C) **Only when a change rewrites most of the theory**, or when told that your patch could not be applied, respond instead with a JSON object containing a single "updated_theory_data" key whose value is the **complete, entire JSON object for the modified theory**.
+
+**Example Modification Request:**
+- User asks: "For the current theory, add a construct named 'Test Construct' with the description 'A test.' and rename 'Desire' to 'Craving'"
+- Your response should be:
+  {
+    "patch": [
+      {"op": "add", "path": "/constructs/-", "value": {"name": "Test Construct", "description": "A test."}},
+      {"op": "rename", "from": "Desire", "to": "Craving"}
+    ],
+    "summary": "Added the construct 'Test Construct' and renamed 'Desire' to 'Craving'."
+  }
+
+If a request is ambiguous, ask for clarification. Do not make assumptions. Always adhere to the JSON output format.
+"""
+
+    def _backoff_delay(self, attempt, retry_after=None):
+        """Full-jitter exponential backoff, never shorter than a server-sent Retry-After."""
+        delay = random.uniform(0, min(self.BACKOFF_CAP_S, self.BACKOFF_BASE_S * 2 ** attempt))
+        if retry_after and retry_after.isdigit(): delay = max(delay, float(retry_after))
+        return delay
+
+    def _post(self, url, payload, cancel_event=None, stream=False):
+        """POSTs with retries on connection errors and 429/5xx; returns None if cancelled."""
+        import requests
+        for attempt in range(self.MAX_RETRIES + 1):
+            if cancel_event is not None and cancel_event.is_set(): return None
+            try:
+                response = self.shared_session().post(url, json=payload, timeout=self.TIMEOUT, stream=stream)
+                if response.status_code not in self.RETRY_STATUSES or attempt == self.MAX_RETRIES:
+                    response.raise_for_status()
+                    return response
+                retry_after = response.headers.get("Retry-After")
+                response.close()
+                metrics.count("llm_retries_total", reason=str(response.status_code))
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt == self.MAX_RETRIES: raise
+                retry_after = None
+                metrics.count("llm_retries_total", reason="connection")
+            delay = self._backoff_delay(attempt, retry_after)
+            if cancel_event is None: time.sleep(delay)
+            elif cancel_event.wait(delay): return None
+
+    def make_api_call(self, prompt_text, on_text=None, cancel_event=None):
+        """Generic method to make an API call to the LLM.
+
+        With `on_text`, the response is streamed and `on_text(text_so_far)` is called as
+        chunks arrive. Setting `cancel_event` abandons the call and returns None.
+        """
+        import requests
+        payload = {"contents": [{"parts": [{"text": prompt_text}]}]}
+        if metrics.enabled:
+            metrics.observe("llm_prompt_bytes", len(prompt_text.encode('utf-8')))
+            metrics.observe("llm_prompt_tokens", ChatContextBuilder.estimate_tokens(prompt_text))
+        cache_key = LLMResponseCache.make_key(self.endpoint, payload) if self.cache else None
+        if cache_key:
+            cached = self.cache.get(cache_key)
+            metrics.count("llm_cache_total", outcome="miss" if cached is None else "hit")
+            if cached is not None:
+                if on_text: on_text(cached)
+                return cached
+        raw_response = ""
+        with metrics.span("llm_call", mode="blocking" if on_text is None else "stream") as span:
+            try:
+                if on_text is None:
+                    response = self._post(self.api_url, payload, cancel_event)
+                    if response is None: return None
+                    raw_response = response.text
+                    result_json = response.json()
+                    content_text = result_json['candidates'][0]['content']['parts'][0]['text']
+                else:
+                    response = self._post(self.stream_url, payload, cancel_event, stream=True)
+                    if response is None: return None
+                    content_text = self._read_stream(response, on_text, cancel_event)
+                if cache_key and content_text: self.cache.put(cache_key, content_text)
+                if metrics.enabled and content_text:
+                    metrics.observe("llm_response_bytes", len(content_text.encode('utf-8')))
+                    span.set(prompt_chars=len(prompt_text), response_chars=len(content_text))
+                return content_text
+            except requests.exceptions.RequestException as e:
+                metrics.count("llm_errors_total", kind="network")
+                self.report_error("Network Error", f"Failed to connect to the API: {e}")
+                return None
+            except (KeyError, IndexError, ValueError) as e:
+                metrics.count("llm_errors_total", kind="response")
+                self.report_error("API Error", f"Could not parse the API's response: {e}\n\nResponse was:\n{raw_response}")
+                return None
+
+    def forget(self, prompt_text):
+        """Drops a cached response, e.g. one that turned out not to be valid JSON."""
+        if self.cache: self.cache.discard(LLMResponseCache.make_key(self.endpoint, {"contents": [{"parts": [{"text": prompt_text}]}]}))
+
+    def _read_stream(self, response, on_text, cancel_event):
+        """Collects text from a server-sent-events generateContent stream."""
+        chunks = []
+        with response:
+            response.encoding = 'utf-8'
+            for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+                if cancel_event is not None and cancel_event.is_set(): return None
+                if not line or not line.startswith("data:"): continue
+                event = json.loads(line[len("data:"):])
+                for candidate in event.get('candidates', [])[:1]:
+                    for part in candidate.get('content', {}).get('parts', []):
+                        chunks.append(part.get('text', ''))
+                on_text("".join(chunks))
+        return "".join(chunks)
+
+    def parse_raw_text(self, raw_text, cancel_event=None, parser=None):
+        """Parses the raw text locally and sends only the lines the parser could not read to the LLM.
+
+        The result carries the parser's per-line "report"; lines answered by the LLM are
+        marked "llm". Without an API key, unparsed lines are simply left out.
+        """
+        with metrics.span("local_parse") as span:
+            parsed = (parser or RawTheoryParser()).parse(raw_text)
+            leftovers = RawTheoryParser.unparsed_text(parsed["report"])
+            span.set(lines=len(parsed["report"]), unparsed=sum(r["status"] == "unparsed" for r in parsed["report"]))
+        metrics.count("local_parse_total", outcome="complete" if not leftovers else "partial")
+        if leftovers and self.api_key: self.merge_fallback(parsed, self.parse_with_llm(leftovers, cancel_event))
+        return parsed
+
+    @staticmethod
+    def merge_fallback(parsed, fallback):
+        """Adds the LLM's parse of the unparsed lines to a local parse, in place."""
+        if not isinstance(fallback, dict): return parsed
+        names = {c["name"] for c in parsed["constructs"]}
+        parsed["constructs"] += [c for c in fallback.get("constructs", []) if c.get("name") not in names]
+        parsed["triples"] += fallback.get("triples", [])
+        parsed["annotations"] += fallback.get("annotations", [])
+        for record in parsed["report"]:
+            if record["status"] == "unparsed": record["status"] = "llm"
+        return parsed
+
+    def parse_with_llm(self, raw_text, cancel_event=None):
+        """Sends the raw text to the LLM and gets structured data back."""
+        prompt = self.create_parsing_prompt() + "\n\nHere is the raw data to parse:\n\n" + raw_text
+        content_text = self.make_api_call(prompt, cancel_event=cancel_event)
+        if content_text:
+            try:
+                cleaned_json_text = content_text.strip().replace('```json', '').replace('```', '').strip()
+                parsed = json.loads(cleaned_json_text)
+                metrics.count("llm_json_parse_total", kind="parse", outcome="ok")
+                return parsed
+            except json.JSONDecodeError as e:
+                metrics.count("llm_json_parse_total", kind="parse", outcome="failed")
+                self.forget(prompt)
+                self.report_error("Parsing Error", f"Could not parse the LLM's JSON response: {e}\n\nResponse was:\n{content_text}")
+                return None
+        return None
+        
+    def generate_description(self, theory_name, constructs, triples, on_text=None, cancel_event=None):
+        """Sends theory data to LLM to generate a description."""
+        prompt = self.create_description_prompt(theory_name, constructs, triples)
+        return self.make_api_call(prompt, on_text, cancel_event)
+
+    def create_chat_turn_prompt(self, user_message, context_json, current_theory_id):
+        """Assembles the full prompt for one chat turn."""
+        return (f"{self.create_chat_prompt()}\n\n"
+                f"--- Data Context ---\n{context_json}\n\n"
+                f"--- Current Theory ID for Modification ---\n{current_theory_id}\n\n"
+                f"--- User Message ---\n{user_message}")
+
+    def chat(self, user_message, context_json, current_theory_id, on_text=None, cancel_event=None, theory=None):
+        """Handles a conversational chat turn.
+
+        With `theory` (the current theory as sent in the context), an edit patch that does
+        not apply to it is sent back once, asking for the full updated object instead.
+        """
+        parsed = self._chat_turn(user_message, context_json, current_theory_id, on_text, cancel_event)
+        if theory is None or not isinstance(parsed, dict): return parsed
+        if "updated_theory_data" in parsed: metrics.count("chat_edit_total", kind="full")
+        if "patch" not in parsed: return parsed
+        try:
+            TheoryPatch(parsed["patch"]).apply(theory)
+            metrics.count("chat_edit_total", kind="patch")
+            return parsed
+        except PatchError as e:
+            metrics.count("chat_edit_total", kind="patch_rejected")
+            retry = (f"{user_message}\n\n(Your previous patch could not be applied: {e}. "
+                     f"Respond with the complete \"updated_theory_data\" object instead.)")
+            return self._chat_turn(retry, context_json, current_theory_id, on_text, cancel_event)
+
+    def _chat_turn(self, user_message, context_json, current_theory_id, on_text=None, cancel_event=None):
+        prompt = self.create_chat_turn_prompt(user_message, context_json, current_theory_id)
+        content_text = self.make_api_call(prompt, on_text, cancel_event)
+        if content_text:
+            try:
+                cleaned_json_text = content_text.strip().replace('```json', '').replace('```', '').strip()
+                parsed = json.loads(cleaned_json_text)
+                metrics.count("llm_json_parse_total", kind="chat", outcome="ok")
+                return parsed
+            except json.JSONDecodeError as e:
+                metrics.count("llm_json_parse_total", kind="chat", outcome="failed")
+                self.forget(prompt)
+                self.report_error("Chat Error", f"Could not parse the LLM's chat response: {e}\n\nResponse was:\n{content_text}")
+                return None
+        return None
+
+
+class ChatContextBuilder:
+    """Chooses which theories accompany a chat turn, within a token budget.
+
+    The current theory is always sent in full. Other theories are ranked by the
+    constructs they share with it (from the live graph's construct index) and by
+    words of the user's message that match their name or constructs. They are then
+    added in full, or abbreviated to name, description and construct names,
+    until the budget runs out.
+    """
+    CHARS_PER_TOKEN = 4  # Rough average for English text and JSON punctuation.
+    DEFAULT_TOKEN_BUDGET = 12000
+
+    def __init__(self, data_manager, token_budget=DEFAULT_TOKEN_BUDGET):
+        self.data_manager = data_manager
+        self.token_budget = token_budget
+
+    @classmethod
+    def estimate_tokens(cls, text):
+        return (len(text) + cls.CHARS_PER_TOKEN - 1) // cls.CHARS_PER_TOKEN
+
+    def rank_related(self, current_theory_id, user_message):
+        """Returns other theory ids, most relevant first."""
+        self.data_manager.build_graph()
+        construct_refs = self.data_manager.construct_refs
+        scores = {}
+        for construct in self.data_manager.get_theory(current_theory_id).get('constructs', []):
+            for theory_id in construct_refs.get(construct['name'], {}):
+                scores[theory_id] = scores.get(theory_id, 0) + 1
+        words = {w for w in re.findall(r"[a-z0-9]+", user_message.lower()) if len(w) > 3}
+        for number in re.findall(r"\btheory\s+(\d+)\b", user_message.lower()):
+            scores[int(number)] = scores.get(int(number), 0) + 100
+        if words:
+            for theory_id, name, _ in self.data_manager.theory_summaries():
+                if words & set(re.findall(r"[a-z0-9]+", name.lower())): scores[theory_id] = scores.get(theory_id, 0) + 50
+            for construct_name, refs in construct_refs.items():
+                if words & set(re.findall(r"[a-z0-9]+", construct_name.lower())):
+                    for theory_id in refs: scores[theory_id] = scores.get(theory_id, 0) + 5
+        scores.pop(current_theory_id, None)
+        valid_ids = {theory_id for theory_id, _, _ in self.data_manager.theory_summaries()}
+        return [theory_id for theory_id, _ in sorted(scores.items(), key=lambda kv: (-kv[1], kv[0])) if theory_id in valid_ids]
+
+    def build(self, current_theory_id, user_message):
+        """Returns (context_json, stats) where stats reports what was sent and its token cost."""
+        with metrics.span("chat_context") as span:
+            context_json, stats = self._build(current_theory_id, user_message)
+            span.set(context_bytes=len(context_json), **stats)
+        return context_json, stats
+
+    def _build(self, current_theory_id, user_message):
+        current = self.data_manager.get_theory(current_theory_id)
+        entries = [json.dumps(current, separators=(',', ':'))]
+        used = self.estimate_tokens(entries[0])
+        full, abbreviated, dropped = 1, 0, 0
+        for theory_id in self.rank_related(current_theory_id, user_message):
+            theory = self.data_manager.get_theory(theory_id)
+            candidate = json.dumps(theory, separators=(',', ':'))
+            if used + self.estimate_tokens(candidate) > self.token_budget:
+                summary = {"id": theory['id'], "name": theory['name'], "description": theory.get('description', ''),
+                           "constructs": [c['name'] for c in theory.get('constructs', [])]}
+                candidate = json.dumps(summary, separators=(',', ':'))
+                if used + self.estimate_tokens(candidate) > self.token_budget:
+                    dropped += 1
+                    continue
+                abbreviated += 1
+            else:
+                full += 1
+            entries.append(candidate)
+            used += self.estimate_tokens(candidate)
+        context_json = "[" + ",\n".join(entries) + "]"
+        return context_json, {"full": full, "abbreviated": abbreviated, "dropped": dropped, "context_tokens": used}
+
+
+class BulkIngestor:
+    """Parses many raw theory texts concurrently and merges them in one write.
+
+    Items come from a JSONL file (one {"theory": name or "theory_id": id, "text": ...}
+    per line) or a directory of .txt files named after the theory name or id.
+    Each item is parsed locally with `RawTheoryParser`; only lines it cannot read go to
+    the LLM, on a bounded thread pool behind a shared rate limiter. Items that still have
+    unparsed lines are reported as "partial", and items whose merged theory fails
+    `TheoryValidator` with errors as "invalid"; neither is written. Items that target the same
+    theory are all reported as "duplicate theory" and none of them is parsed, since either
+    text could be the one meant. An item whose parse raises is reported as "failed". Nothing
+    is written until every item has finished, and then all successful results are committed
+    together.
+    """
+    def __init__(self, data_manager, processor_factory, max_workers=4, requests_per_minute=60, progress=print):
+        self.data_manager = data_manager
+        self.processor_factory = processor_factory
+        self.max_workers = max_workers
+        self.rate_limiter = RateLimiter(requests_per_minute)
+        self.progress = progress
+        self.validator = TheoryValidator()
+
+    def load_items(self, path):
+        """Returns [(label, theory_id, raw_text)]; unknown theories get theory_id None."""
+        raw_items = []
+        if os.path.isdir(path):
+            for filename in sorted(os.listdir(path)):
+                if not filename.lower().endswith(".txt"): continue
+                with open(os.path.join(path, filename), 'r', encoding='utf-8') as f:
+                    raw_items.append((os.path.splitext(filename)[0], f.read()))
+        else:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip(): continue
+                    record = json.loads(line)
+                    raw_items.append((record.get('theory_id', record.get('theory')), record['text']))
+        items = []
+        for ref, text in raw_items:
+            if isinstance(ref, int) or (isinstance(ref, str) and ref.isdigit()):
+                theory_id = int(ref)
+                if theory_id not in {i for i, _, _ in self.data_manager.theory_summaries()}: theory_id = None
+            else:
+                theory_id = self.data_manager.find_theory_id(ref)
+            items.append((str(ref), theory_id, text))
+        return items
+
+    def _parse_item(self, item):
+        label, theory_id, text = item
+        errors = []
+        processor = self.processor_factory(lambda title, message: errors.append(f"{title}: {message}"))
+        started = time.perf_counter()
+        parsed = RawTheoryParser().parse(text)
+        leftovers = RawTheoryParser.unparsed_text(parsed["report"])
+        waited = 0.0
+        if leftovers and processor.api_key:
+            waited = self.rate_limiter.acquire()
+            processor.merge_fallback(parsed, processor.parse_with_llm(leftovers))
+        return item, parsed, errors, waited, time.perf_counter() - started - waited
+
+    def run(self, items):
+        """Parses all items and commits the successful ones; returns a per-item report."""
+        report, updates = [], []
+        runnable = []
+        targets = Counter(item[1] for item in items if item[1] is not None)
+        for item in items:
+            if item[1] is None:
+                report.append({"item": item[0], "status": "unknown theory"})
+                self.progress(f"[skip] {item[0]}: no matching theory")
+            elif targets[item[1]] > 1:
+                others = [other[0] for other in items if other[1] == item[1] and other is not item]
+                report.append({"item": item[0], "theory_id": item[1], "status": "duplicate theory",
+                               "errors": [f"theory {item[1]} is also targeted by {', '.join(others)}"]})
+                self.progress(f"[skip] {item[0]}: theory {item[1]} is also targeted by {', '.join(others)}")
+            else:
+                runnable.append(item)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {pool.submit(self._parse_item, item): item for item in runnable}
+            for done, future in enumerate(as_completed(futures), 1):
+                try: (label, theory_id, _), parsed, errors, waited, latency = future.result()
+                except Exception as e:
+                    label, theory_id, _ = futures[future]
+                    report.append({"item": label, "theory_id": theory_id, "status": "failed", "errors": [f"{type(e).__name__}: {e}"]})
+                    self.progress(f"[{done}/{len(runnable)}] {label}: failed ({type(e).__name__}: {str(e)[:120]})")
+                    continue
+                unparsed = [r["line"] for r in parsed["report"] if r["status"] == "unparsed"]
+                theory = dict(self.data_manager.get_theory(theory_id))
+                theory['constructs'] = parsed.get('constructs', [])
+                theory['triples'] = parsed.get('triples', [])
+                theory['annotations'] = parsed.get('annotations', [])
+                issues = self.validator.check(theory, theory_id)
+                invalid = [issue["message"] for issue in issues if issue["severity"] == "error"]
+                status = "partial" if unparsed else "invalid" if invalid else "ok"
+                report.append({"item": label, "theory_id": theory_id, "status": status,
+                               "llm_lines": sum(r["status"] == "llm" for r in parsed["report"]), "unparsed_lines": unparsed,
+                               "invalid": invalid, "warnings": len(issues) - len(invalid),
+                               "latency_s": round(latency, 3), "rate_wait_s": round(waited, 3), "errors": errors})
+                self.progress(f"[{done}/{len(runnable)}] {label}: {status} in {latency:.2f}s"
+                              + (f", {len(unparsed)} unparsed lines" if unparsed else "") + (f" ({invalid[0][:120]})" if invalid else "")
+                              + (f" ({errors[0][:120]})" if errors else ""))
+                if status == "ok": updates.append(theory)
+        if updates: self.data_manager.update_theories(updates)
+        self.progress(f"Committed {len(updates)} of {len(items)} items.")
+        return report
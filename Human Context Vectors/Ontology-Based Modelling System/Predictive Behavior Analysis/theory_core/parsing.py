@@ -0,0 +1,290 @@
+"""The raw theory text parser and RFC 6902-style patches applied to chat edits."""
+import json
+import re
+import itertools
+
+from .errors import PatchError
+
+
+class RawTheoryParser:
+    """Deterministic, line-streaming parser for the raw text format in `create_parsing_prompt`.
+
+    Feed lines one at a time (or call `parse`) and `finish` returns the same
+    {"constructs", "triples", "annotations"} structure the LLM produces, plus a
+    "report" with one {line, section, status, confidence, text} entry per non-blank line.
+    Triples are split on the known predicates; when a line contains more than one, the
+    split whose subject and object are known construct names wins, so ambiguous triples
+    are resolved only once the whole text (and its construct section) has been read.
+    Lines scoring below `min_confidence` are reported as "unparsed" and left out.
+    """
+    TRIPLES_HEADER = "theory triples"
+    ANNOTATIONS_HEADER = "theory constructs and annotations"
+    PREDICATES = ('positively influences', 'negatively influences', 'may influence', 'influences (*)', 'influences',
+                  'transitions to', 'correlates with', 'protection type of', 'risk type of', 'means type of',
+                  'type of', 'part of', 'has attribute')
+    MIN_CONFIDENCE = 0.6
+    RELATIONSHIP_OBJECT = re.compile(r"\s(the\s+'.+'\s+to\s+'.+'\s+.*relationship)\s*$", re.IGNORECASE)
+    ANNOTATION_ID = re.compile(r"[A-Za-z][\w.-]*:[\w.-]+")
+
+    def __init__(self, predicates=(), constructs=(), min_confidence=MIN_CONFIDENCE):
+        vocabulary = {p.strip().lower() for p in itertools.chain(self.PREDICATES, predicates) if p.strip()}
+        self.predicate_pattern = re.compile(
+            r"(?<=\s)(" + "|".join(re.escape(p) for p in sorted(vocabulary, key=len, reverse=True)) + r")(?=\s)", re.IGNORECASE)
+        self.known_constructs = {c.strip().lower() for c in constructs}
+        self.min_confidence = min_confidence
+        self.section = None
+        self.line_number = 0
+        self.constructs, self.annotations, self.report = {}, [], []
+        self.triple_lines = []
+
+    def parse(self, text):
+        for line in text.splitlines(): self.feed(line)
+        return self.finish()
+
+    def feed(self, line):
+        self.line_number += 1
+        text = line.strip()
+        if not text: return
+        header = text.rstrip(':').strip().lower()
+        if header in (self.TRIPLES_HEADER, self.ANNOTATIONS_HEADER):
+            self.section = "triples" if header == self.TRIPLES_HEADER else "annotations"
+            return
+        section = self.section or ("annotations" if '[' in text else "triples")
+        if section == "triples": self.triple_lines.append((self.line_number, text))
+        else: self._feed_annotation(self.line_number, text)
+
+    def _feed_annotation(self, number, text):
+        name, bracket, rest = text.partition('[')
+        name = name.strip()
+        entries = []
+        if bracket:
+            body, closed, tail = rest.rpartition(']')
+            entries = [self._parse_entry(e) for e in self._split_entries(body)] if closed and not tail.strip() else [None]
+        confidence = min([1.0 if bracket else 0.9] + [e[1] if e else 0.0 for e in entries]) if name else 0.0
+        if self.section is None: confidence = min(confidence, 0.8)
+        if confidence < self.min_confidence:
+            self._record(number, "annotations", text, confidence, parsed=False)
+            return
+        self.constructs.setdefault(name, {"name": name, "description": ""})
+        self.known_constructs.add(name.lower())
+        for (relation, value, source), _ in entries:
+            self.annotations.append({"construct": name, "relation": relation, "value": value, "source": source})
+        self._record(number, "annotations", text, confidence)
+
+    @staticmethod
+    def _split_entries(body):
+        """Splits on commas outside parentheses."""
+        entries, depth, start = [], 0, 0
+        for i, ch in enumerate(body):
+            if ch == '(': depth += 1
+            elif ch == ')': depth = max(depth - 1, 0)
+            elif ch == ',' and depth == 0:
+                entries.append(body[start:i])
+                start = i + 1
+        entries.append(body[start:])
+        return [e.strip() for e in entries if e.strip()]
+
+    def _parse_entry(self, entry):
+        """Returns ((relation, value, source), confidence) or None for `ID (Value) 1 82 5`."""
+        opening = entry.find('(')
+        if opening <= 0: return None
+        depth = 0
+        for closing in range(opening, len(entry)):
+            depth += {'(': 1, ')': -1}.get(entry[closing], 0)
+            if depth == 0: break
+        else:
+            return None
+        relation, value, sources = entry[:opening].strip(), entry[opening + 1:closing].strip(), entry[closing + 1:].split()
+        confidence = 1.0 if self.ANNOTATION_ID.fullmatch(relation) else 0.8
+        if not sources or not all(s.isdigit() for s in sources): confidence = min(confidence, 0.7)
+        return (relation, value, " ".join(sources)), confidence
+
+    def _split_triple(self, text):
+        """Returns ((subject, predicate, object), confidence), or None when no predicate fits."""
+        relationship = self.RELATIONSHIP_OBJECT.search(text)
+        if relationship:
+            head, obj = text[:relationship.start()], relationship.group(1)
+            candidates = [m for m in self.predicate_pattern.finditer(head + " ") if not head[m.end():].strip()]
+        else:
+            obj = None
+            candidates = list(self.predicate_pattern.finditer(text))
+        splits = []
+        for m in candidates:
+            subject, predicate = text[:m.start()].strip(), m.group(1)
+            target = obj if obj is not None else text[m.end():].strip()
+            if subject and target: splits.append((subject, predicate, target))
+        if not splits: return None
+        if len(splits) == 1: return splits[0], 1.0
+        known = self.known_constructs
+        scored = sorted(((s.lower() in known) + (obj is not None or o.lower() in known), -i, (s, p, o))
+                        for i, (s, p, o) in enumerate(splits))
+        best, runner_up = scored[-1], scored[-2]
+        return best[2], 0.9 if best[0] > runner_up[0] else 0.5
+
+    def finish(self):
+        """Resolves the buffered triples and returns the parsed structure with its report."""
+        triples = []
+        for number, text in self.triple_lines:
+            split = self._split_triple(text)
+            confidence = 0.0 if split is None else split[1] if self.section is not None else min(split[1], 0.8)
+            parsed = confidence >= self.min_confidence
+            if parsed:
+                subject, predicate, obj = split[0]
+                triples.append({"subject": subject, "predicate": predicate, "object": obj})
+            self._record(number, "triples", text, confidence, parsed)
+        self.report.sort(key=lambda r: r["line"])
+        return {"constructs": list(self.constructs.values()), "triples": triples,
+                "annotations": self.annotations, "report": self.report}
+
+    def _record(self, number, section, text, confidence, parsed=True):
+        self.report.append({"line": number, "section": section, "status": "parsed" if parsed else "unparsed",
+                            "confidence": round(confidence, 2), "text": text})
+
+    @staticmethod
+    def unparsed_text(report):
+        """Re-assembles the unparsed lines under their section headers, for the LLM."""
+        sections = {"triples": "Theory triples", "annotations": "Theory constructs and annotations"}
+        blocks = []
+        for section, header in sections.items():
+            lines = [r["text"] for r in report if r["section"] == section and r["status"] == "unparsed"]
+            if lines: blocks.append("\n".join([header] + lines))
+        return "\n\n".join(blocks)
+
+
+class TheoryPatch:
+    """RFC 6902-style edit operations for one theory, validated as they are applied.
+
+    Supports "add", "remove", "replace" and "test" on JSON Pointer paths to the theory's
+    fields ("/name", "/complete") and rows ("/triples/3", "/constructs/-",
+    "/annotations/0/value"), plus two compact forms: "remove" or "replace" on a section
+    with a "match" object, acting on every row whose fields equal it, and
+    {"op": "rename", "from": old, "to": new}, which renames a construct in its row, the
+    triples and the annotations. Operations apply in order to a copy, so a patch that
+    does not fit the theory raises `PatchError` and changes nothing.
+    """
+    FIELDS = {"name": str, "description": str, "picture_path": str, "complete": bool}
+    SECTIONS = {"constructs": ("name", "description"), "triples": ("subject", "predicate", "object"),
+                "annotations": ("construct", "relation", "value", "source")}
+    OPS = ("add", "remove", "replace", "test", "rename")
+
+    def __init__(self, ops):
+        if not isinstance(ops, list): raise PatchError("A patch must be a list of operations.")
+        for i, op in enumerate(ops):
+            if not isinstance(op, dict) or op.get("op") not in self.OPS: raise PatchError(f"Operation {i}: unsupported operation {op!r}.")
+        self.ops = ops
+
+    def apply(self, theory):
+        """Returns (new theory, changes); changes are ("field", name, value), ("insert", section,
+        index, row), ("replace", section, index, row), ("delete", section, index) or
+        ("reset", section, rows), in order, for updating views row by row."""
+        work, changes = dict(theory), []
+        for section in self.SECTIONS: work[section] = list(work.get(section, []))
+        for i, op in enumerate(self.ops):
+            try: getattr(self, f"_{op['op']}")(work, op, changes)
+            except PatchError as e: raise PatchError(f"Operation {i} ({op['op']} {op.get('path', op.get('from', ''))}): {e}") from None
+        return work, changes
+
+    def _resolve(self, work, path):
+        """Returns (field or section, row index or None, row field or None) for a JSON Pointer."""
+        if not isinstance(path, str) or not path.startswith("/"): raise PatchError(f"bad path {path!r}")
+        parts = [part.replace("~1", "/").replace("~0", "~") for part in path[1:].split("/")]
+        if parts[0] in self.FIELDS and len(parts) == 1: return parts[0], None, None
+        if parts[0] not in self.SECTIONS or len(parts) > 3: raise PatchError("the path is not a theory field or row")
+        if len(parts) == 1: return parts[0], None, None
+        if parts[1] == "-": index = len(work[parts[0]])
+        elif parts[1].isdigit() and not (len(parts[1]) > 1 and parts[1].startswith("0")): index = int(parts[1])
+        else: raise PatchError(f"bad row index {parts[1]!r}")
+        key = parts[2] if len(parts) == 3 else None
+        if key is not None and key not in self.SECTIONS[parts[0]]: raise PatchError(f"{parts[0]} rows have no field {key!r}")
+        return parts[0], index, key
+
+    def _row(self, section, value):
+        keys = self.SECTIONS[section]
+        if not isinstance(value, dict) or not value.keys() <= set(keys) or not all(isinstance(v, str) for v in value.values()):
+            raise PatchError(f"{section} rows are objects with string fields {', '.join(keys)}")
+        return {key: value.get(key, "") for key in keys}
+
+    def _field(self, name, value):
+        if not isinstance(value, self.FIELDS[name]): raise PatchError(f"{name} must be a {self.FIELDS[name].__name__}")
+        return value
+
+    @staticmethod
+    def _check_index(rows, index, allow_end=False):
+        if index >= len(rows) + allow_end: raise PatchError(f"row {index} does not exist (there are {len(rows)})")
+
+    def _matches(self, work, section, match):
+        if not isinstance(match, dict) or not match or not match.keys() <= set(self.SECTIONS[section]):
+            raise PatchError(f"match must be an object with some of the fields {', '.join(self.SECTIONS[section])}")
+        found = [i for i, row in enumerate(work[section]) if all(row.get(k) == v for k, v in match.items())]
+        if not found: raise PatchError(f"no {section} row matches {match}")
+        return found
+
+    def _add(self, work, op, changes):
+        section, index, key = self._resolve(work, op.get("path"))
+        if "value" not in op: raise PatchError("missing value")
+        if section in self.FIELDS or index is None or key is not None: return self._replace(work, op, changes)
+        self._check_index(work[section], index, allow_end=True)
+        row = self._row(section, op["value"])
+        work[section].insert(index, row)
+        changes.append(("insert", section, index, row))
+
+    def _replace(self, work, op, changes):
+        section, index, key = self._resolve(work, op.get("path"))
+        if "value" not in op: raise PatchError("missing value")
+        value = op["value"]
+        if section in self.FIELDS:
+            work[section] = self._field(section, value)
+            changes.append(("field", section, value))
+        elif index is None and "match" in op:
+            if not isinstance(value, dict): raise PatchError("with match, value holds the fields to set")
+            for i in self._matches(work, section, op["match"]):
+                work[section][i] = self._row(section, dict(work[section][i], **value))
+                changes.append(("replace", section, i, work[section][i]))
+        elif index is None:
+            if not isinstance(value, list): raise PatchError(f"{section} must be a list of rows")
+            work[section] = [self._row(section, row) for row in value]
+            changes.append(("reset", section, work[section]))
+        else:
+            self._check_index(work[section], index)
+            if key is not None:
+                if not isinstance(value, str): raise PatchError(f"{key} must be a string")
+                work[section][index] = dict(work[section][index], **{key: value})
+            else:
+                work[section][index] = self._row(section, value)
+            changes.append(("replace", section, index, work[section][index]))
+
+    def _remove(self, work, op, changes):
+        section, index, key = self._resolve(work, op.get("path"))
+        if section in self.FIELDS or key is not None: raise PatchError("only rows can be removed")
+        if index is None:
+            if "match" not in op: raise PatchError("removing rows from a whole section needs a match object")
+            for i in reversed(self._matches(work, section, op["match"])):
+                del work[section][i]
+                changes.append(("delete", section, i))
+            return
+        self._check_index(work[section], index)
+        del work[section][index]
+        changes.append(("delete", section, index))
+
+    def _test(self, work, op, changes):
+        section, index, key = self._resolve(work, op.get("path"))
+        if section in self.FIELDS or index is None: current = work.get(section)
+        else:
+            self._check_index(work[section], index)
+            row = work[section][index]
+            current = row.get(key, "") if key is not None else {k: row.get(k, "") for k in self.SECTIONS[section]}
+        expected = op.get("value")
+        if isinstance(expected, dict) and index is not None and key is None:
+            expected = {k: expected.get(k, "") for k in self.SECTIONS[section]}
+        if current != expected: raise PatchError(f"test failed, found {json.dumps(current)[:200]}")
+
+    def _rename(self, work, op, changes):
+        old, new = op.get("from"), op.get("to")
+        if not isinstance(old, str) or not isinstance(new, str) or not new.strip(): raise PatchError("rename needs string from and to names")
+        if not any(c.get("name") == old for c in work["constructs"]): raise PatchError(f"no construct is named {old!r}")
+        for section, keys in (("constructs", ("name",)), ("triples", ("subject", "object")), ("annotations", ("construct",))):
+            for i, row in enumerate(work[section]):
+                renamed = {k: new for k in keys if row.get(k) == old}
+                if renamed:
+                    work[section][i] = dict(row, **renamed)
+                    changes.append(("replace", section, i, work[section][i]))
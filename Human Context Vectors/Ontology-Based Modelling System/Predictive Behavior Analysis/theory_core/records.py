@@ -0,0 +1,90 @@
+"""Compact in-memory theory records over a shared string pool."""
+from array import array
+from collections.abc import Mapping
+
+
+class StringPool:
+    """Interns strings to dense integer ids shared by every theory of a corpus."""
+    __slots__ = ('ids', 'strings')
+
+    def __init__(self):
+        self.ids = {}
+        self.strings = []
+
+    def intern(self, text):
+        string_id = self.ids.get(text)
+        if string_id is None:
+            string_id = self.ids[text] = len(self.strings)
+            self.strings.append(text)
+        return string_id
+
+    def __getitem__(self, string_id):
+        return self.strings[string_id]
+
+    def __len__(self):
+        return len(self.strings)
+
+
+class CompactTheory(Mapping):
+    """A theory stored as interned string ids in flat arrays, read through a dict-compatible view.
+
+    Constructs, triples and annotations keep one array each, holding a fixed number of
+    string ids per record (RECORD_FIELDS), so a record costs a few bytes instead of a
+    dict, and joins such as grouping annotations by construct compare integers. Reading
+    a list field rebuilds fresh dicts; use `pack` to store edits.
+    """
+    __slots__ = ('pool', 'header', 'columns')
+    RECORD_FIELDS = {"constructs": ("name", "description"),
+                     "triples": ("subject", "predicate", "object"),
+                     "annotations": ("construct", "relation", "value", "source")}
+
+    def __init__(self, pool, header, columns):
+        self.pool = pool
+        self.header = header  # The theory's own keys, in order; list fields map to None.
+        self.columns = columns  # list field -> array of string ids, len(RECORD_FIELDS[field]) per record
+
+    @classmethod
+    def pack(cls, theory, pool):
+        """A CompactTheory for `theory`, with each record's keys put in RECORD_FIELDS order, or `theory`
+        itself if a record is missing a field, has an extra one, or holds anything but text."""
+        columns, intern = {}, pool.intern
+        for key, fields in cls.RECORD_FIELDS.items():
+            records = theory.get(key)
+            if not isinstance(records, list): return theory
+            ids = array('I')
+            for record in records:
+                if type(record) is not dict: return theory
+                if tuple(record) == fields: values = tuple(record.values())
+                elif len(record) == len(fields) and all(field in record for field in fields): values = tuple(map(record.__getitem__, fields))
+                else: return theory
+                if any(type(value) is not str for value in values): return theory
+                ids.extend(map(intern, values))
+            columns[key] = ids
+        header = {key: (None if key in columns else value) for key, value in theory.items()}
+        return cls(pool, header, columns)
+
+    def __getitem__(self, key):
+        if key not in self.columns: return self.header[key]
+        fields, ids, strings = self.RECORD_FIELDS[key], self.columns[key], self.pool.strings
+        width = len(fields)
+        return [dict(zip(fields, map(strings.__getitem__, ids[i:i + width]))) for i in range(0, len(ids), width)]
+
+    def __iter__(self):
+        return iter(self.header)
+
+    def __len__(self):
+        return len(self.header)
+
+    def to_dict(self):
+        return {key: self[key] for key in self.header}
+
+    def construct_name_ids(self):
+        return set(self.columns["constructs"][::2])
+
+    def annotations_by_construct(self):
+        """{construct name: [annotation, ...]}, grouped on interned ids."""
+        ids, strings, fields = self.columns["annotations"], self.pool.strings, self.RECORD_FIELDS["annotations"]
+        grouped = {}
+        for i in range(0, len(ids), 4): grouped.setdefault(ids[i], []).append(i)
+        return {strings[construct_id]: [dict(zip(fields, map(strings.__getitem__, ids[i:i + 4]))) for i in positions]
+                for construct_id, positions in grouped.items()}
@@ -0,0 +1,756 @@
+"""The JSON, lazily indexed and SQLite theory stores, and the graph they maintain."""
+import os
+import json
+import copy
+import threading
+import sqlite3
+from collections import Counter
+from collections.abc import Sequence
+
+from .analysis import BehaviorSimulator, InfluenceIndex, TheorySearchIndex
+from .errors import GraphEmptyError
+from .records import CompactTheory, StringPool
+from .tracing import metrics
+from .validation import TheoryValidator
+
+
+class TheoryDataManager:
+    """Owns the theory corpus and its on-disk persistence.
+
+    Single-theory saves are appended to a journal file next to the main JSON
+    file instead of rewriting the whole corpus. The journal is replayed on load
+    and folded back into the main file by `compact`, which writes to a temp
+    file and atomically renames it over the original.
+
+    Construct aliases ({alias: canonical name}, see ConstructResolver) live in a
+    sidecar file and are applied wherever constructs meet across theories: the
+    graph, the Cypher export and the search index.
+
+    In memory, `theories` holds CompactTheory records over one shared StringPool;
+    `get_theory` hands out a plain dict copy.
+    """
+    JOURNAL_SUFFIX = ".journal"
+    ALIASES_SUFFIX = ".aliases.json"
+    COMPACT_AFTER_ENTRIES = 50
+
+    def __init__(self, filepath="theory_data.json"):
+        self.filepath = filepath
+        self.journal_path = filepath + self.JOURNAL_SUFFIX
+        self.aliases_path = filepath + self.ALIASES_SUFFIX
+        self.journal_entries = 0
+        self.theories = []
+        self.pool = StringPool()
+        self.aliases = {}
+        self._reset_views()
+        self.load_data()
+
+    def _pack(self, theory):
+        return CompactTheory.pack(theory, self.pool)
+
+    def load_data(self):
+        self._reset_views()
+        self.aliases = self._load_aliases()
+        if os.path.exists(self.filepath):
+            self.pool = StringPool()
+            with metrics.span("load_data") as span:
+                with open(self.filepath, 'r', encoding='utf-8') as f:
+                    self.theories = [self._pack(theory) for theory in json.load(f)]
+                self._replay_journal()
+                span.set(theories=len(self.theories), journal_entries=self.journal_entries)
+        else:
+            self.theories = [self._pack({"id": i, "name": f"Theory {i}", "description": "", "picture_path": "", "complete": False, "constructs": [], "triples": [], "annotations": []}) for i in range(1, 77)]
+            self.save_data()
+
+    def _replay_journal(self):
+        """Applies journaled theory updates on top of the main file.
+
+        A torn trailing line left by a crash is cut off so later appends start on a clean line.
+        """
+        self.journal_entries = 0
+        if not os.path.exists(self.journal_path): return
+        good_offset = 0
+        with open(self.journal_path, 'rb') as f:
+            for line in f:
+                try: entry = json.loads(line.decode('utf-8'))
+                except (UnicodeDecodeError, json.JSONDecodeError): break
+                if not line.endswith(b"\n"): break
+                self.theories[entry['id'] - 1] = self._pack(entry)
+                self.journal_entries += 1
+                good_offset += len(line)
+        if good_offset != os.path.getsize(self.journal_path):
+            with open(self.journal_path, 'r+b') as f: f.truncate(good_offset)
+
+    def save_data(self):
+        """Rewrites the full corpus atomically and clears the journal."""
+        tmp_path = self.filepath + ".tmp"
+        with metrics.span("save_data") as span:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.theories, f, indent=4, default=CompactTheory.to_dict)
+                f.flush()
+                os.fsync(f.fileno())
+                span.set(bytes=f.tell())
+            os.replace(tmp_path, self.filepath)
+        if os.path.exists(self.journal_path): os.remove(self.journal_path)
+        self.journal_entries = 0
+
+    def compact(self):
+        """Folds the journal into the main file if there is anything to fold."""
+        if self.journal_entries: self.save_data()
+
+    def get_theory(self, theory_id):
+        """A copy of the theory as a plain dict; edits reach the store only through update_theory or stage_theory."""
+        theory = self.theories[theory_id - 1]
+        return theory.to_dict() if isinstance(theory, CompactTheory) else copy.deepcopy(theory)
+
+    def update_theory(self, theory_id, data):
+        self.theories[theory_id - 1] = self._pack(data)
+        self._theory_changed(theory_id)
+        self._append_journal(data)
+        if self.journal_entries >= self.COMPACT_AFTER_ENTRIES: self.compact()
+
+    def update_theories(self, theories):
+        """Replaces several theories and persists them in a single atomic write."""
+        for theory in theories:
+            self.theories[theory['id'] - 1] = self._pack(theory)
+            self._theory_changed(theory['id'])
+        self.save_data()
+
+    def _append_journal(self, theory):
+        with metrics.span("journal_append") as span, open(self.journal_path, 'a', encoding='utf-8') as f:
+            line = json.dumps(theory, separators=(',', ':')) + "\n"
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+            span.set(theory_id=theory.get('id'), chars=len(line))
+        self.journal_entries += 1
+
+    def _load_aliases(self):
+        if not os.path.exists(self.aliases_path): return {}
+        with open(self.aliases_path, 'r', encoding='utf-8') as f: return json.load(f)
+
+    def _save_aliases(self):
+        tmp_path = self.aliases_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f: json.dump(self.aliases, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.aliases_path)
+
+    def set_aliases(self, aliases):
+        """Replaces the alias table, following chains (a -> b -> c becomes a -> c) and dropping cycles."""
+        resolved = {}
+        for alias, target in aliases.items():
+            seen = {alias}
+            while target in aliases and target not in seen:
+                seen.add(target)
+                target = aliases[target]
+            if target != alias: resolved[alias] = target
+        self.aliases = resolved
+        self._save_aliases()
+        self._reset_views()  # Merged names change nodes and index entries all over the corpus.
+
+    def canonical(self, name):
+        return self.aliases.get(name, name)
+
+    def canonical_theory(self, theory):
+        """The theory with every construct reference replaced by its canonical name."""
+        if not self.aliases: return theory
+        canonical = self.canonical
+        return dict(theory,
+                    constructs=[dict(c, name=canonical(c['name'])) for c in theory.get('constructs', [])],
+                    triples=[dict(t, subject=canonical(t['subject']), object=canonical(t['object'])) for t in theory.get('triples', [])],
+                    annotations=[dict(a, construct=canonical(a['construct'])) for a in theory.get('annotations', [])])
+
+    def construct_name_counts(self):
+        """{canonical construct name: number of theories declaring it}."""
+        id_counts, counts = Counter(), Counter()
+        for theory in self.theories:
+            if isinstance(theory, CompactTheory): id_counts.update(theory.construct_name_ids())
+            else: counts.update(self.canonical(name) for name in {c['name'] for c in theory.get('constructs', [])})
+        for name_id, count in id_counts.items(): counts[self.canonical(self.pool[name_id])] += count
+        return counts
+
+    def theory_summaries(self):
+        """Returns (id, name, complete) for every theory, without touching bodies."""
+        return [(t['id'], t['name'], bool(t.get('complete'))) for t in self.theories]
+
+    def find_theory_id(self, name):
+        return next((t['id'] for t in self.theories if t['name'] == name), None)
+
+    def annotations_by_construct(self, theory_id):
+        theory = self.theories[theory_id - 1]
+        if isinstance(theory, CompactTheory): return theory.annotations_by_construct()
+        grouped = {}
+        for ann in theory.get('annotations', []):
+            grouped.setdefault(ann['construct'], []).append(ann)
+        return grouped
+
+    def validate(self):
+        """Returns (theory id, "error" | "warning", message) for each problem in the corpus; see TheoryValidator."""
+        return [(issue["theory_id"], issue["severity"], issue["message"]) for issue in self.build_validator().report()]
+
+    @property
+    def graph(self):
+        """The networkx graph; networkx is only imported once something asks for it."""
+        if self._graph is None:
+            import networkx as nx
+            self._graph = nx.DiGraph()
+        return self._graph
+
+    def _reset_views(self):
+        """Drops everything derived from the corpus; each view is rebuilt on first use."""
+        self._reset_graph()
+        self.search_index = None
+        self.validator = None
+
+    def _theory_changed(self, theory_id):
+        """Patches every live derived view with one theory's current data."""
+        self.refresh_graph_theory(theory_id)
+        if self.search_index is not None: self.search_index.update_theory(self.get_theory(theory_id))
+        if self.validator is not None: self.validator.update(theory_id, self.theories[theory_id - 1])
+
+    def build_validator(self):
+        """Validates the whole corpus if needed; once built, only changed theories are re-checked."""
+        if self.validator is None:
+            validator = TheoryValidator()
+            with metrics.span("build_validator") as span:
+                for position, theory in enumerate(self.theories, 1): validator.update(position, theory)
+                span.set(theories=len(validator.local))
+            self.validator = validator
+        return self.validator
+
+    def theory_issues(self, theory_id):
+        """Validation issues for one theory. Lazily loaded stores check just that theory until
+        `build_validator` has run, since the corpus-wide label check would load every theory."""
+        if self.validator is None and isinstance(self.theories, _LazyTheorySequence):
+            return TheoryValidator().check(self.theories[theory_id - 1], theory_id)
+        return self.build_validator().issues(theory_id)
+
+    def build_search_index(self):
+        """Builds the search index if needed; once built, it is kept current as theories change."""
+        if self.search_index is None:
+            self.search_index = TheorySearchIndex(self.canonical)
+            self.search_index.build(self.theories)
+        return self.search_index
+
+    def search(self, query, limit=20):
+        return self.build_search_index().search(query, limit)
+
+    def _reset_graph(self):
+        """Drops the live graph; the next build_graph call rebuilds it from scratch."""
+        self._graph = None
+        self.graph_contributions = None  # theory id -> what that theory added to the graph
+        self.construct_refs = {}  # construct name -> {theory id: description}
+        self.theory_node_refs = {}  # theory name -> {theory id: description}
+        self.endpoint_refs = {}  # node -> set of theory ids using it in a triple
+        self.edge_refs = {}  # (u, v) -> {theory id: label}
+        self.annotation_refs = {}  # node -> {theory id: [formatted annotation, ...]}
+        self.influence_index = None
+
+    def stage_theory(self, data):
+        """Replaces a theory in memory without persisting it (e.g. an LLM edit awaiting review)."""
+        self.theories[data['id'] - 1] = self._pack(data)
+        self._theory_changed(data['id'])
+
+    def build_graph(self):
+        if self.graph_contributions is not None: return  # Already live; edits are patched in as they happen.
+        self._reset_graph()
+        self.graph_contributions = {}
+        with metrics.span("build_graph") as span:
+            for theory_id, _, _ in self.theory_summaries(): self.refresh_graph_theory(theory_id)
+            span.set(nodes=self.graph.number_of_nodes(), edges=self.graph.number_of_edges())
+
+    def _graph_contribution(self, theory):
+        theory = self.canonical_theory(theory)
+        constructs = {c['name']: c.get('description', '') for c in theory.get('constructs', [])}
+        contribution = {"constructs": constructs, "theory_node": None, "endpoints": set(), "edges": {}, "annotations": {}}
+        if not theory.get('complete'): return contribution
+        theory_name = theory['name']
+        contribution["theory_node"] = (theory_name, theory.get('description', ''))
+        for name in constructs: contribution["edges"][(theory_name, name)] = 'has_construct'
+        for triple in theory.get('triples', []):
+            subj, obj = triple['subject'], triple['object']
+            contribution["endpoints"].update((subj, obj))
+            contribution["edges"][(subj, obj)] = triple['predicate']
+        for annotation in theory.get('annotations', []):
+            formatted = f"{annotation['relation']}: {annotation['value']} (Source: {annotation['source']})"
+            node_annotations = contribution["annotations"].setdefault(annotation['construct'], [])
+            if formatted not in node_annotations: node_annotations.append(formatted)
+        return contribution
+
+    def refresh_graph_theory(self, theory_id):
+        """Patches the live graph with one theory's current data; cost scales with that theory only.
+
+        Every node, edge and annotation keeps the set of theories that contribute it, so
+        removing or un-completing a theory only drops what no other theory still provides.
+        """
+        if self.graph_contributions is None: return
+        old = self.graph_contributions.pop(theory_id, None) or {"constructs": {}, "theory_node": None, "endpoints": set(), "edges": {}, "annotations": {}}
+        new = self._graph_contribution(self.get_theory(theory_id))
+        self.graph_contributions[theory_id] = new
+
+        for name in old["constructs"]: self.construct_refs[name].pop(theory_id, None)
+        for name, desc in new["constructs"].items(): self.construct_refs.setdefault(name, {})[theory_id] = desc
+        if old["theory_node"]: self.theory_node_refs[old["theory_node"][0]].pop(theory_id, None)
+        if new["theory_node"]: self.theory_node_refs.setdefault(new["theory_node"][0], {})[theory_id] = new["theory_node"][1]
+        for node in old["endpoints"]: self.endpoint_refs[node].discard(theory_id)
+        for node in new["endpoints"]: self.endpoint_refs.setdefault(node, set()).add(theory_id)
+        for edge in old["edges"]: self.edge_refs[edge].pop(theory_id, None)
+        for edge, label in new["edges"].items(): self.edge_refs.setdefault(edge, {})[theory_id] = label
+        for node in old["annotations"]: self.annotation_refs[node].pop(theory_id, None)
+        for node, formatted in new["annotations"].items(): self.annotation_refs.setdefault(node, {})[theory_id] = formatted
+
+        touched_nodes = set(old["constructs"]) | set(new["constructs"]) | old["endpoints"] | new["endpoints"] | set(old["annotations"]) | set(new["annotations"])
+        for contribution in (old, new):
+            if contribution["theory_node"]: touched_nodes.add(contribution["theory_node"][0])
+        for edge in set(old["edges"]) | set(new["edges"]): self._refresh_graph_edge(edge)
+        for node in touched_nodes: self._refresh_graph_node(node)
+
+    def _refresh_graph_edge(self, edge):
+        refs = self.edge_refs.get(edge)
+        if not refs:
+            self.edge_refs.pop(edge, None)
+            if self.graph.has_edge(*edge): self.graph.remove_edge(*edge)
+            if self.influence_index is not None: self.influence_index.update_edge(*edge, None)
+            return
+        # The highest theory id wins a label conflict, matching the old full-rebuild order.
+        self.graph.add_edge(*edge, label=refs[max(refs)], theories=sorted(refs))
+        if self.influence_index is not None: self.influence_index.update_edge(*edge, refs[max(refs)])
+
+    def build_influence_index(self):
+        """Builds the graph and its reachability index if needed; both then follow theory edits."""
+        self.build_graph()
+        if self.influence_index is None: self.influence_index = InfluenceIndex(self.graph)
+        return self.influence_index
+
+    def _refresh_graph_node(self, node):
+        construct_refs = self.construct_refs.get(node) or {}
+        theory_refs = self.theory_node_refs.get(node) or {}
+        endpoint_refs = self.endpoint_refs.get(node) or set()
+        if not (construct_refs or theory_refs or endpoint_refs):
+            for refs in (self.construct_refs, self.theory_node_refs, self.endpoint_refs): refs.pop(node, None)
+            if self.graph.has_node(node): self.graph.remove_node(node)
+            return
+        attrs = {"type": 'theory' if theory_refs else 'construct'}
+        if theory_refs: attrs["description"] = theory_refs[max(theory_refs)]
+        elif construct_refs:
+            # Merged names can bring several descriptions; an empty one never hides a written one.
+            described = [theory_id for theory_id, description in construct_refs.items() if description]
+            attrs["description"] = construct_refs[max(described or construct_refs)]
+        if not self.annotation_refs.get(node): self.annotation_refs.pop(node, None)
+        annotations = []
+        for theory_id in sorted(self.annotation_refs.get(node) or {}):
+            annotations.extend(a for a in self.annotation_refs[node][theory_id] if a not in annotations)
+        if annotations: attrs["annotations"] = annotations
+        self.graph.add_node(node)
+        self.graph.nodes[node].clear()
+        self.graph.nodes[node].update(attrs)
+
+    def visualize_graph(self, renderer, graph=None, filename="behavioral_theory_relational_graph.svg", title="Behavioral Theory Relational Graph"):
+        """Starts an off-thread render of the graph (or a view of it); returns a Future of (path, positions)."""
+        graph = self.graph if graph is None else graph
+        if graph.number_of_nodes() == 0: raise GraphEmptyError("No completed theories to visualize.")
+        return renderer.render(graph, filename, title)
+
+    def build_simulator(self, theory_id=None):
+        """A BehaviorSimulator over one theory's triples, or over the merged graph's influence edges."""
+        if theory_id is not None: return BehaviorSimulator.from_theory(self.canonical_theory(self.get_theory(theory_id)))
+        self.build_graph()
+        return BehaviorSimulator.from_graph(self.graph)
+
+    def theory_subgraph(self, theory_name):
+        """The theory node, its constructs, and the triple edges between them."""
+        if not self.graph.has_node(theory_name): return self.graph.subgraph([])
+        return self.graph.subgraph([theory_name, *self.graph.successors(theory_name)])
+
+    def neighbourhood_subgraph(self, node, hops=1):
+        """Every node within `hops` edges of `node`, ignoring edge direction."""
+        if not self.graph.has_node(node): return self.graph.subgraph([])
+        import networkx as nx
+        return nx.ego_graph(self.graph, node, radius=hops, undirected=True)
+
+
+class _LazyTheorySequence(Sequence):
+    """List-like view over a manager's stored theories; bodies are hydrated only when indexed.
+
+    Like the JSON manager's list, it hands out the stored objects for read-only passes
+    (graph builds, validation); `get_theory` is what gives callers their own copy.
+    """
+    def __init__(self, manager):
+        self.manager = manager
+
+    def __len__(self):
+        return self.manager.theory_count()
+
+    def __getitem__(self, index):
+        if isinstance(index, slice): return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0: index += len(self)
+        if not 0 <= index < len(self): raise IndexError(index)
+        return self.manager._stored_theory(index + 1)
+
+    def __setitem__(self, index, theory):
+        # Mirrors list assignment on the JSON manager: an unsaved, in-memory edit.
+        self.manager.keep_in_memory(index + 1, theory)
+
+
+class SQLiteTheoryDataManager(TheoryDataManager):
+    """TheoryDataManager backed by an SQLite database with normalized, indexed tables.
+
+    Keeps the `theories` / `get_theory` / `update_theory` API of the JSON manager,
+    but only theories that are actually opened are held in memory. Lookups by
+    theory name, construct, triple endpoint or annotation relation run as indexed
+    queries instead of list scans. A NULL picture_path stands for a theory without the
+    key, so `export_json` reproduces the imported file. `update_theory` writes through
+    at once; a staged theory lives only in memory until it is committed that way.
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS theories (
+            id INTEGER PRIMARY KEY, name TEXT NOT NULL, description TEXT NOT NULL DEFAULT '',
+            picture_path TEXT, complete INTEGER NOT NULL DEFAULT 0);
+        CREATE TABLE IF NOT EXISTS constructs (
+            theory_id INTEGER NOT NULL REFERENCES theories(id) ON DELETE CASCADE, position INTEGER NOT NULL,
+            name TEXT NOT NULL, description TEXT NOT NULL DEFAULT '', PRIMARY KEY (theory_id, position));
+        CREATE TABLE IF NOT EXISTS triples (
+            theory_id INTEGER NOT NULL REFERENCES theories(id) ON DELETE CASCADE, position INTEGER NOT NULL,
+            subject TEXT NOT NULL, predicate TEXT NOT NULL, object TEXT NOT NULL, PRIMARY KEY (theory_id, position));
+        CREATE TABLE IF NOT EXISTS annotations (
+            theory_id INTEGER NOT NULL REFERENCES theories(id) ON DELETE CASCADE, position INTEGER NOT NULL,
+            construct TEXT NOT NULL, relation TEXT NOT NULL, value TEXT NOT NULL DEFAULT '', source TEXT NOT NULL DEFAULT '',
+            PRIMARY KEY (theory_id, position));
+        CREATE INDEX IF NOT EXISTS idx_theories_name ON theories(name);
+        CREATE INDEX IF NOT EXISTS idx_constructs_name ON constructs(name);
+        CREATE INDEX IF NOT EXISTS idx_triples_subject ON triples(subject);
+        CREATE INDEX IF NOT EXISTS idx_triples_object ON triples(object);
+        CREATE INDEX IF NOT EXISTS idx_triples_predicate ON triples(predicate);
+        CREATE INDEX IF NOT EXISTS idx_annotations_construct ON annotations(theory_id, construct);
+        CREATE INDEX IF NOT EXISTS idx_annotations_relation ON annotations(relation);
+        CREATE TABLE IF NOT EXISTS construct_aliases (alias TEXT PRIMARY KEY, canonical TEXT NOT NULL);
+    """
+
+    def __init__(self, filepath="theory_data.db", json_path="theory_data.json"):
+        self.filepath = filepath
+        self.json_path = json_path
+        self.hydrated = {}
+        self.staged = set()  # ids whose in-memory theory was staged but not committed
+        self.aliases = {}
+        self._reset_views()
+        self.conn = sqlite3.connect(filepath)
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.executescript(self.SCHEMA)
+        self._migrate_picture_path()
+        self.theories = _LazyTheorySequence(self)
+        self.load_data()
+
+    def _migrate_picture_path(self):
+        """Rebuilds a theories table from before picture_path was nullable; its rows keep their '' paths."""
+        if not any(name == "picture_path" and notnull for _, name, _, notnull, _, _ in self.conn.execute("PRAGMA table_info(theories)")): return
+        self.conn.execute("PRAGMA foreign_keys = OFF")  # Dropping the old table must not cascade to the row tables.
+        try:
+            self.conn.executescript("""
+                BEGIN;
+                CREATE TABLE theories_new (
+                    id INTEGER PRIMARY KEY, name TEXT NOT NULL, description TEXT NOT NULL DEFAULT '',
+                    picture_path TEXT, complete INTEGER NOT NULL DEFAULT 0);
+                INSERT INTO theories_new SELECT id, name, description, picture_path, complete FROM theories;
+                DROP TABLE theories;
+                ALTER TABLE theories_new RENAME TO theories;
+                COMMIT;
+            """)
+            self.conn.executescript(self.SCHEMA)  # Recreates the name index dropped with the old table.
+        finally:
+            self.conn.execute("PRAGMA foreign_keys = ON")
+
+    def load_data(self):
+        self.hydrated, self.staged = {}, set()
+        self._reset_views()
+        self.aliases = self._load_aliases()
+        if len(self.theories): return
+        if os.path.exists(self.json_path):
+            self.import_json(self.json_path)
+        else:
+            self.import_theories([{"id": i, "name": f"Theory {i}", "description": "", "picture_path": "", "complete": False, "constructs": [], "triples": [], "annotations": []} for i in range(1, 77)])
+
+    def save_data(self):
+        """Persists the in-memory theories committed through update_theory; staged edits stay unsaved."""
+        with self.conn:
+            for theory_id, theory in self.hydrated.items():
+                if theory_id not in self.staged: self._write_theory(theory)
+
+    def compact(self):
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def _load_aliases(self):
+        return dict(self.conn.execute("SELECT alias, canonical FROM construct_aliases"))
+
+    def _save_aliases(self):
+        with self.conn:
+            self.conn.execute("DELETE FROM construct_aliases")
+            self.conn.executemany("INSERT INTO construct_aliases VALUES (?, ?)", sorted(self.aliases.items()))
+
+    def _pack(self, theory):
+        return theory  # Hydrated theories are a small working set; they stay plain dicts.
+
+    def theory_count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM theories").fetchone()[0]
+
+    def keep_in_memory(self, theory_id, theory):
+        self.hydrated[theory_id] = theory
+        self.staged.add(theory_id)
+
+    def construct_name_counts(self):
+        counts = Counter()
+        for name, theories in self.conn.execute("SELECT name, COUNT(DISTINCT theory_id) FROM constructs GROUP BY name"): counts[self.canonical(name)] += theories
+        return counts
+
+    def get_theory(self, theory_id):
+        """A copy of the theory; edits reach the store only through update_theory or stage_theory."""
+        return copy.deepcopy(self._stored_theory(theory_id))
+
+    def _stored_theory(self, theory_id):
+        if theory_id not in self.hydrated:
+            row = self.conn.execute("SELECT id, name, description, picture_path, complete FROM theories WHERE id = ?", (theory_id,)).fetchone()
+            if row is None: raise IndexError(theory_id)
+            theory = {"id": row[0], "name": row[1], "description": row[2]}
+            if row[3] is not None: theory["picture_path"] = row[3]
+            self.hydrated[theory_id] = {
+                **theory, "complete": bool(row[4]),
+                "constructs": [{"name": n, "description": d} for n, d in self.conn.execute(
+                    "SELECT name, description FROM constructs WHERE theory_id = ? ORDER BY position", (theory_id,))],
+                "triples": [{"subject": s, "predicate": p, "object": o} for s, p, o in self.conn.execute(
+                    "SELECT subject, predicate, object FROM triples WHERE theory_id = ? ORDER BY position", (theory_id,))],
+                "annotations": [{"construct": c, "relation": r, "value": v, "source": src} for c, r, v, src in self.conn.execute(
+                    "SELECT construct, relation, value, source FROM annotations WHERE theory_id = ? ORDER BY position", (theory_id,))],
+            }
+        return self.hydrated[theory_id]
+
+    def update_theory(self, theory_id, data):
+        self.hydrated[theory_id] = data
+        self.staged.discard(theory_id)
+        with self.conn: self._write_theory(data)
+        self._theory_changed(theory_id)
+
+    def update_theories(self, theories):
+        with self.conn:
+            for theory in theories: self._write_theory(theory)
+        for theory in theories:
+            self.hydrated[theory['id']] = theory
+            self.staged.discard(theory['id'])
+            self._theory_changed(theory['id'])
+
+    def _write_theory(self, theory):
+        theory_id = theory['id']
+        self.conn.execute("INSERT OR REPLACE INTO theories (id, name, description, picture_path, complete) VALUES (?, ?, ?, ?, ?)",
+                          (theory_id, theory.get('name', ''), theory.get('description', ''), theory.get('picture_path'), int(bool(theory.get('complete')))))
+        for table in ("constructs", "triples", "annotations"):
+            self.conn.execute(f"DELETE FROM {table} WHERE theory_id = ?", (theory_id,))
+        self.conn.executemany("INSERT INTO constructs VALUES (?, ?, ?, ?)",
+                              [(theory_id, i, c['name'], c.get('description', '')) for i, c in enumerate(theory.get('constructs', []))])
+        self.conn.executemany("INSERT INTO triples VALUES (?, ?, ?, ?, ?)",
+                              [(theory_id, i, t['subject'], t['predicate'], t['object']) for i, t in enumerate(theory.get('triples', []))])
+        self.conn.executemany("INSERT INTO annotations VALUES (?, ?, ?, ?, ?, ?)",
+                              [(theory_id, i, a['construct'], a['relation'], a.get('value', ''), a.get('source', '')) for i, a in enumerate(theory.get('annotations', []))])
+
+    def import_theories(self, theories):
+        with self.conn:
+            for theory in theories: self._write_theory(theory)
+        self.hydrated, self.staged = {}, set()
+        self._reset_views()
+
+    def import_json(self, path):
+        with open(path, 'r', encoding='utf-8') as f: self.import_theories(json.load(f))
+
+    def export_json(self, path):
+        """Writes the corpus in the original theory_data.json format, one theory at a time, laid out as
+        `json.dump(theories, indent=4)` would lay it out."""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write("[")
+            for i, (theory_id, _, _) in enumerate(self.theory_summaries()):
+                f.write(",\n    " if i else "\n    ")
+                f.write(json.dumps(self._stored_theory(theory_id), indent=4).replace("\n", "\n    "))
+            f.write("\n]")
+        os.replace(tmp_path, path)
+
+    def theory_summaries(self):
+        saved = self.conn.execute("SELECT id, name, complete FROM theories ORDER BY id").fetchall()
+        return [(i, self.hydrated[i]['name'], bool(self.hydrated[i].get('complete'))) if i in self.hydrated else (i, n, bool(c)) for i, n, c in saved]
+
+    def find_theory_id(self, name):
+        # A theory held in memory answers to its current name only, even if the saved row still has an old one.
+        matches = [theory_id for theory_id, theory in self.hydrated.items() if theory['name'] == name]
+        matches += [theory_id for theory_id, in self.conn.execute("SELECT id FROM theories WHERE name = ?", (name,)) if theory_id not in self.hydrated]
+        return min(matches, default=None)
+
+    def annotations_by_construct(self, theory_id):
+        if theory_id in self.hydrated: return super().annotations_by_construct(theory_id)
+        grouped = {}
+        for c, r, v, src in self.conn.execute(
+                "SELECT construct, relation, value, source FROM annotations WHERE theory_id = ? ORDER BY construct, position", (theory_id,)):
+            grouped.setdefault(c, []).append({"construct": c, "relation": r, "value": v, "source": src})
+        return grouped
+
+    def theories_with_construct(self, construct_name):
+        return [row[0] for row in self.conn.execute("SELECT DISTINCT theory_id FROM constructs WHERE name = ? ORDER BY theory_id", (construct_name,))]
+
+    def triples_involving(self, construct_name):
+        return self.conn.execute(
+            "SELECT theory_id, subject, predicate, object FROM triples WHERE subject = ? "
+            "UNION ALL SELECT theory_id, subject, predicate, object FROM triples WHERE object = ? AND subject != ?",
+            (construct_name, construct_name, construct_name)).fetchall()
+
+    def annotations_with_relation(self, relation_id):
+        return self.conn.execute("SELECT theory_id, construct, value, source FROM annotations WHERE relation = ? ORDER BY theory_id, position", (relation_id,)).fetchall()
+
+
+class IndexedTheoryDataManager(TheoryDataManager):
+    """TheoryDataManager that reads theory_data.json through a sidecar index of byte offsets.
+
+    Startup reads only the index (id, name, complete and where each theory's JSON object
+    sits in the main file), so the theory list appears without parsing any bodies.
+    `get_theory` parses one object on demand, keeps the most recent HYDRATED_LIMIT in an
+    LRU and hands out a copy. Edited and journaled theories are pinned in memory until the
+    next save, which copies every unchanged theory's bytes straight across and rewrites
+    the index. The index is rebuilt with one full scan whenever it is missing or the
+    main file's size or modification time no longer match it.
+    """
+    INDEX_SUFFIX = ".index.json"
+    INDEX_VERSION = 1
+    HYDRATED_LIMIT = 64
+
+    def __init__(self, filepath="theory_data.json"):
+        self.index_path = filepath + self.INDEX_SUFFIX
+        self.index = []  # [{"id", "name", "complete", "offset", "length"}], in corpus order
+        self.edited = {}  # theory id -> theory not yet written to the main file
+        self.cache = {}  # theory id -> parsed theory, least recently used first
+        self.lock = threading.Lock()
+        super().__init__(filepath)
+
+    def _pack(self, theory):
+        return theory
+
+    def theory_count(self):
+        return len(self.index)
+
+    def keep_in_memory(self, theory_id, theory):
+        with self.lock:
+            self.cache.pop(theory_id, None)
+            self.edited[theory_id] = theory
+
+    def load_data(self):
+        self._reset_views()
+        self.aliases = self._load_aliases()
+        self.theories = _LazyTheorySequence(self)
+        self.edited, self.cache = {}, {}
+        if not os.path.exists(self.filepath):
+            self.index = [{"id": i, "name": f"Theory {i}", "complete": False, "offset": 0, "length": 0} for i in range(1, 77)]
+            for i in range(1, 77): self.keep_in_memory(i, {"id": i, "name": f"Theory {i}", "description": "", "picture_path": "", "complete": False, "constructs": [], "triples": [], "annotations": []})
+            self.save_data()
+            return
+        with metrics.span("load_index") as span:
+            self.index = self._read_index()
+            if self.index is None:
+                span.set(rebuilt=True)
+                self.index = self._build_index()
+                self._write_index()
+            self._replay_journal()
+            span.set(theories=len(self.index), journal_entries=self.journal_entries)
+
+    def _file_signature(self):
+        stat = os.stat(self.filepath)
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    def _read_index(self):
+        """The saved index if it still describes the main file, else None."""
+        if not os.path.exists(self.index_path): return None
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f: saved = json.load(f)
+        except (OSError, ValueError): return None
+        if saved.get("version") != self.INDEX_VERSION or saved.get("file") != self._file_signature(): return None
+        return saved["theories"]
+
+    def _write_index(self):
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"version": self.INDEX_VERSION, "file": self._file_signature(), "theories": self.index}, f, separators=(',', ':'))
+        os.replace(tmp_path, self.index_path)
+
+    def _build_index(self):
+        """One pass over the main file, recording where each top-level theory object starts and ends."""
+        with open(self.filepath, 'rb') as f: raw = f.read()
+        text = raw.decode('utf-8')
+        ascii_only = len(text) == len(raw)
+        decoder, index = json.JSONDecoder(), []
+        position = text.index('[') + 1
+        counted, byte_position = 0, 0  # Offsets are in bytes; outside plain ASCII, characters and bytes differ.
+        while True:
+            while position < len(text) and text[position] in " \t\r\n,": position += 1
+            if position >= len(text) or text[position] == ']': break
+            theory, end = decoder.raw_decode(text, position)
+            if ascii_only: start, length = position, end - position
+            else:
+                byte_position += len(text[counted:position].encode('utf-8'))
+                start, length = byte_position, len(text[position:end].encode('utf-8'))
+                counted, byte_position = end, byte_position + length
+            index.append({"id": theory['id'], "name": theory['name'], "complete": bool(theory.get('complete')), "offset": start, "length": length})
+            position = end
+        return index
+
+    def get_theory(self, theory_id):
+        """A copy of the theory; edits reach the store only through update_theory or stage_theory."""
+        return copy.deepcopy(self._stored_theory(theory_id))
+
+    def _stored_theory(self, theory_id):
+        with self.lock:
+            if theory_id in self.edited: return self.edited[theory_id]
+            theory = self.cache.pop(theory_id, None)
+            if theory is None:
+                entry = self.index[theory_id - 1]
+                with open(self.filepath, 'rb') as f:
+                    f.seek(entry['offset'])
+                    theory = json.loads(f.read(entry['length']).decode('utf-8'))
+                metrics.count("theories_hydrated_total")
+            self.cache[theory_id] = theory
+            while len(self.cache) > self.HYDRATED_LIMIT: self.cache.pop(next(iter(self.cache)))
+            return theory
+
+    def theory_summaries(self):
+        with self.lock: edited = dict(self.edited)
+        return [(e['id'], edited[e['id']]['name'], bool(edited[e['id']].get('complete'))) if e['id'] in edited else (e['id'], e['name'], e['complete'])
+                for e in self.index]
+
+    def find_theory_id(self, name):
+        return next((theory_id for theory_id, theory_name, _ in self.theory_summaries() if theory_name == name), None)
+
+    def save_data(self):
+        """Rewrites the main file (unchanged theories are copied as raw bytes) and its index; clears the journal."""
+        tmp_path = self.filepath + ".tmp"
+        with self.lock: edited = dict(self.edited)
+        index = []
+        with metrics.span("save_data") as span, open(tmp_path, 'wb') as out:
+            source = open(self.filepath, 'rb') if os.path.exists(self.filepath) else None
+            try:
+                out.write(b"[" if self.index else b"[]")
+                for i, entry in enumerate(self.index):
+                    out.write(b",\n    " if i else b"\n    ")
+                    theory = edited.get(entry['id'])
+                    if theory is None:
+                        source.seek(entry['offset'])
+                        body = source.read(entry['length'])
+                        index.append(dict(entry, offset=out.tell(), length=len(body)))
+                    else:
+                        # Same text json.dump(corpus, indent=4) gives this theory one level down.
+                        body = json.dumps(theory, indent=4).replace("\n", "\n    ").encode('utf-8')
+                        index.append({"id": entry['id'], "name": theory['name'], "complete": bool(theory.get('complete')), "offset": out.tell(), "length": len(body)})
+                    out.write(body)
+                if self.index: out.write(b"\n]")
+            finally:
+                if source: source.close()
+            out.flush()
+            os.fsync(out.fileno())
+            span.set(bytes=out.tell(), rewritten=len(edited))
+        with self.lock:
+            os.replace(tmp_path, self.filepath)
+            self.index = index
+            for theory_id in edited:
+                if self.edited.get(theory_id) is edited[theory_id]: del self.edited[theory_id]
+        self._write_index()
+        if os.path.exists(self.journal_path): os.remove(self.journal_path)
+        self.journal_entries = 0
@@ -0,0 +1,163 @@
+"""Opt-in spans, counters and summaries, with a JSON/Prometheus endpoint."""
+import json
+import threading
+import time
+from collections import deque
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self): return self
+
+    def __exit__(self, *exc): return False
+
+    def set(self, **fields): pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('metrics', 'name', 'labels', 'fields', 'started')
+
+    def __init__(self, metrics, name, labels):
+        self.metrics, self.name, self.labels, self.fields = metrics, name, labels, {}
+
+    def set(self, **fields):
+        """Attaches per-call details (sizes, ids) to the span's log record."""
+        self.fields.update(fields)
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.finish_span(self, time.perf_counter() - self.started, exc_type is not None)
+        return False
+
+
+class Metrics:
+    """Opt-in tracing and metrics for the slow paths: LLM calls, corpus I/O, graph work.
+
+    Disabled (the default), `span` returns a shared no-op and `count`/`observe` return
+    at once, so instrumented code pays one attribute check. Enabled, every finished span
+    updates a per-name summary (count, total, max), joins a ring of recent spans and,
+    given a log path, is appended as one JSON line to a size-rotated log file. Labels
+    are low-cardinality keys (e.g. kind="chat"); span fields only go to the log.
+    """
+    RECENT_SPANS = 200
+    LOG_MAX_BYTES = 1_000_000
+    LOG_BACKUPS = 3
+    PROMETHEUS_PREFIX = "theory_tool_"
+
+    def __init__(self):
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.logger = None
+        self.server = None
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.counters = {}  # (name, labels) -> value
+            self.summaries = {}  # (name, labels) -> [count, total, max]
+            self.recent = deque(maxlen=self.RECENT_SPANS)
+
+    def enable(self, log_path=None):
+        if log_path and self.logger is None:
+            import logging
+            from logging.handlers import RotatingFileHandler
+            handler = RotatingFileHandler(log_path, maxBytes=self.LOG_MAX_BYTES, backupCount=self.LOG_BACKUPS, encoding='utf-8')
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self.logger = logging.getLogger(f"theory_core.trace.{id(self)}")
+            self.logger.propagate = False
+            self.logger.setLevel(logging.INFO)
+            self.logger.addHandler(handler)
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def span(self, name, **labels):
+        """Times a `with` block as `<name>_seconds`; failures also count `<name>_errors_total`."""
+        if not self.enabled: return _NULL_SPAN
+        return _Span(self, name, labels)
+
+    def finish_span(self, span, elapsed, failed):
+        self.observe(f"{span.name}_seconds", elapsed, **span.labels)
+        if failed: self.count(f"{span.name}_errors_total", **span.labels)
+        record = {"span": span.name, "ms": round(elapsed * 1000, 3), "at": round(time.time(), 3), **span.labels, **span.fields}
+        if failed: record["failed"] = True
+        with self.lock: self.recent.append(record)
+        if self.logger: self.logger.info(json.dumps(record, default=str))
+
+    def count(self, name, value=1, **labels):
+        if not self.enabled: return
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock: self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        if not self.enabled: return
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            summary = self.summaries.setdefault(key, [0, 0.0, value])
+            summary[0] += 1
+            summary[1] += value
+            summary[2] = max(summary[2], value)
+
+    def snapshot(self):
+        with self.lock:
+            return {"enabled": self.enabled,
+                    "counters": [{"name": n, "labels": dict(l), "value": v} for (n, l), v in sorted(self.counters.items())],
+                    "summaries": [{"name": n, "labels": dict(l), "count": c, "sum": t, "max": m, "mean": t / c}
+                                  for (n, l), (c, t, m) in sorted(self.summaries.items())],
+                    "recent": list(self.recent)}
+
+    def prometheus_text(self):
+        """The counters and summaries in the Prometheus text exposition format."""
+        def series(name, labels):
+            escape = lambda value: str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+            rendered = ",".join(f'{k}="{escape(v)}"' for k, v in labels.items())
+            return f"{self.PROMETHEUS_PREFIX}{name}{{{rendered}}}" if rendered else f"{self.PROMETHEUS_PREFIX}{name}"
+        snapshot, lines = self.snapshot(), []
+        for counter in snapshot["counters"]: lines.append(f"{series(counter['name'], counter['labels'])} {counter['value']}")
+        for summary in snapshot["summaries"]:
+            lines.append(f"{series(summary['name'] + '_count', summary['labels'])} {summary['count']}")
+            lines.append(f"{series(summary['name'] + '_sum', summary['labels'])} {summary['sum']}")
+            lines.append(f"{series(summary['name'] + '_max', summary['labels'])} {summary['max']}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port, host="127.0.0.1"):
+        """Serves /metrics (Prometheus text) and /metrics.json on a daemon thread; returns the bound port."""
+        from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args): pass
+
+            def do_GET(self):
+                if self.path.startswith("/metrics.json"): body, content_type = json.dumps(metrics.snapshot(), default=str).encode('utf-8'), "application/json"
+                elif self.path.startswith("/metrics"): body, content_type = metrics.prometheus_text().encode('utf-8'), "text/plain; version=0.0.4"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.stop_serving()
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self.server.server_address[1]
+
+    def stop_serving(self):
+        if self.server is None: return
+        self.server.shutdown()
+        self.server.server_close()
+        self.server = None
+
+
+metrics = Metrics()
@@ -0,0 +1,192 @@
+"""Schema and referential-integrity checks over theories."""
+import re
+from collections import Counter
+from collections.abc import Mapping
+
+from .parsing import RawTheoryParser
+from .records import CompactTheory
+from .tracing import metrics
+
+
+class TheoryValidator:
+    """Schema and referential-integrity checks over theories, kept current one theory at a time.
+
+    Each issue is a dict {theory_id, severity ("error" | "warning"), section, row, field,
+    message}; `row` is a 0-based index into the section's list, or None for the theory
+    itself. Errors are data the tool cannot use (missing or mistyped fields, empty names);
+    warnings are references the graph cannot resolve (triple ends and annotations on
+    undeclared constructs), unknown predicates, malformed ontology ids or sources, and
+    ontology ids labelled differently from the rest of the corpus.
+
+    `update` re-checks one theory and folds its ontology labels into a corpus-wide
+    count, so `issues` and `report` only read stored issues and compare labels.
+    CompactTheory records are schema-valid by construction and skip the per-row schema
+    walk; references are checked column-wise with set operations, and only failing
+    values are located row by row.
+    """
+    ROW_FIELDS = CompactTheory.RECORD_FIELDS
+    FIELD_TYPES = {"id": int, "name": str, "description": str, "picture_path": str, "complete": bool,
+                   "constructs": list, "triples": list, "annotations": list}
+    REQUIRED = ("id", "name", "constructs", "triples", "annotations")
+    OPTIONAL_ROW_FIELDS = {"description"}  # LLM output often omits empty construct descriptions.
+    KNOWN_PREDICATES = frozenset(RawTheoryParser.PREDICATES)
+    ONTOLOGY_ID = RawTheoryParser.ANNOTATION_ID
+    SOURCE = re.compile(r"\d+(?: \d+)*")
+
+    def __init__(self):
+        self.local = {}  # theory id -> issues found in the theory alone
+        self.labels = {}  # theory id -> (relations, values): its annotation columns
+        self.label_counts = Counter()  # (ontology id, label) -> annotations across the corpus
+        self.usual_labels = None  # memoized _usual_labels(label_counts), dropped whenever the counts change
+        self.valid = {"predicate": set(), "relation": set(), "source": set()}  # distinct strings already accepted
+
+    def update(self, theory_id, theory):
+        self.remove(theory_id)
+        issues, labels = self._check(theory_id, theory)
+        self.local[theory_id] = issues
+        self.labels[theory_id] = labels
+        self.label_counts.update(zip(*labels))
+        self.usual_labels = None
+
+    def remove(self, theory_id):
+        self.local.pop(theory_id, None)
+        labels = self.labels.pop(theory_id, None)
+        if not labels or not labels[0]: return
+        self.label_counts.subtract(zip(*labels))
+        for pair in set(zip(*labels)):
+            if self.label_counts[pair] <= 0: del self.label_counts[pair]
+        self.usual_labels = None
+
+    def check(self, theory, theory_id=None):
+        """Issues found in `theory` alone, without recording it (e.g. LLM output before it is staged)."""
+        return self._check(theory.get('id') if theory_id is None and isinstance(theory, Mapping) else theory_id, theory)[0]
+
+    def issues(self, theory_id):
+        """Stored issues for one theory plus the corpus-wide label check."""
+        found = list(self.local.get(theory_id, ()))
+        if self.usual_labels is None: self.usual_labels = self._usual_labels(self.label_counts, self.valid["relation"])
+        for row, (ontology_id, label) in enumerate(zip(*self.labels.get(theory_id, ((), ())))):
+            usual = self.usual_labels.get(ontology_id)
+            if usual is None or not label: continue
+            folded, spelling, totals = usual
+            if label.casefold() != folded and totals[label.casefold()] < totals[folded]:
+                found.append(self._issue(theory_id, "warning", "annotations", row, "value",
+                                         f"annotation {row + 1}: {ontology_id} is labelled '{label}' here but '{spelling}' in {totals[folded]} other annotations"))
+        return found
+
+    @staticmethod
+    def _usual_labels(label_counts, valid_ids):
+        """{ontology id: (casefolded label, its commonest spelling, {casefolded label: count})} for ids labelled
+        more than one way; differences in case alone are not flagged."""
+        totals, spellings = {}, {}
+        for (ontology_id, label), n in label_counts.items():
+            if ontology_id not in valid_ids or not label: continue
+            totals.setdefault(ontology_id, Counter())[label.casefold()] += n
+            spellings.setdefault(ontology_id, Counter())[label] += n
+        usual = {}
+        for ontology_id, counts in totals.items():
+            if len(counts) < 2: continue
+            folded = max(counts, key=counts.__getitem__)
+            spelling = max((label for label in spellings[ontology_id] if label.casefold() == folded), key=spellings[ontology_id].__getitem__)
+            usual[ontology_id] = (folded, spelling, counts)
+        return usual
+
+    def report(self):
+        """Every issue in the corpus, by theory id."""
+        with metrics.span("validate_report") as span:
+            issues = [issue for theory_id in sorted(self.local) for issue in self.issues(theory_id)]
+            span.set(theories=len(self.local), issues=len(issues))
+        return issues
+
+    @staticmethod
+    def _issue(theory_id, severity, section, row, field, message):
+        return {"theory_id": theory_id, "severity": severity, "section": section, "row": row, "field": field, "message": message}
+
+    def _check(self, theory_id, theory):
+        issues = []
+        if not isinstance(theory, Mapping):
+            return [self._issue(theory_id, "error", None, None, None, "theory is not a JSON object")], ((), ())
+        header = theory.header if isinstance(theory, CompactTheory) else theory
+        compact = isinstance(theory, CompactTheory)
+        for key, kind in self.FIELD_TYPES.items():
+            if compact and key in self.ROW_FIELDS: continue  # Packed columns exist by construction.
+            value = header.get(key)
+            if value is None and key not in self.REQUIRED: continue
+            if type(value) is not kind: issues.append(self._issue(theory_id, "error", None, None, key, f"{key} is missing or not a {kind.__name__}"))
+        if issues and any(issue["field"] in self.ROW_FIELDS for issue in issues): return issues, ((), ())
+        if theory_id is not None and header.get('id') != theory_id:
+            issues.append(self._issue(theory_id, "error", None, None, "id", f"stored at position {theory_id} but has id {header.get('id')}"))
+        columns = self._columns(theory_id, theory, issues)
+        labels = self._check_references(theory_id, header.get('name'), columns, issues)
+        return issues, labels
+
+    def _columns(self, theory_id, theory, issues):
+        """{section: [values of each field]}, with None in place of rows that fail the schema."""
+        if isinstance(theory, CompactTheory):
+            columns = {}
+            for section, fields in self.ROW_FIELDS.items():
+                decoded = list(map(theory.pool.strings.__getitem__, theory.columns[section]))
+                columns[section] = [decoded[k::len(fields)] for k in range(len(fields))]
+            return columns
+        columns = {}
+        for section, fields in self.ROW_FIELDS.items():
+            values = [[] for _ in fields]
+            for i, row in enumerate(theory[section]):
+                problem = None
+                if type(row) is not dict: problem = "is not an object"
+                else:
+                    missing = [f for f in fields if type(row.get(f)) is not str and not (f in self.OPTIONAL_ROW_FIELDS and f not in row)]
+                    extra = [f for f in row if f not in fields]
+                    if missing: problem = f"lacks text for {', '.join(missing)}"
+                    elif extra: issues.append(self._issue(theory_id, "warning", section, i, extra[0], f"{section[:-1]} {i + 1} has unexpected fields: {', '.join(extra)}"))
+                if problem:
+                    issues.append(self._issue(theory_id, "error", section, i, None, f"{section[:-1]} {i + 1} {problem}"))
+                    for column in values: column.append(None)
+                else:
+                    for column, field in zip(values, fields): column.append(row.get(field, ""))
+            columns[section] = values
+        return columns
+
+    def _check_references(self, theory_id, theory_name, columns, issues):
+        def flag(severity, section, field, column, bad, message):
+            for i, value in enumerate(column):
+                if value in bad: issues.append(self._issue(theory_id, severity, section, i, field, message(i, value)))
+
+        names, _ = columns["constructs"]
+        declared = set(names)
+        declared.discard(None)
+        if "" in declared: flag("error", "constructs", "name", names, {""}, lambda i, v: f"construct {i + 1} has no name")
+        if len(declared) < len(names) - names.count(None):
+            seen = set()
+            for i, name in enumerate(names):
+                if name in seen and name: issues.append(self._issue(theory_id, "warning", "constructs", i, "name", f"construct '{name}' declared more than once"))
+                seen.add(name)
+        declared.discard("")
+        if theory_name: declared.add(theory_name)
+
+        subjects, predicates, objects = columns["triples"]
+        for field, column in (("subject", subjects), ("predicate", predicates), ("object", objects)):
+            if "" in column: flag("error", "triples", field, column, {""}, lambda i, v, field=field: f"triple {i + 1} has no {field}")
+        for field, column in (("subject", subjects), ("object", objects)):
+            undeclared = set(column) - declared - {None, ""}
+            if undeclared: flag("warning", "triples", field, column, undeclared, lambda i, v, field=field: f"triple {i + 1} {field} '{v}' is not a declared construct")
+        unknown = self._invalid("predicate", predicates, lambda p: p.strip().lower() in self.KNOWN_PREDICATES)
+        if unknown: flag("warning", "triples", "predicate", predicates, unknown, lambda i, v: f"triple {i + 1} predicate '{v}' is not a known relationship")
+
+        constructs, relations, values, sources = columns["annotations"]
+        undeclared = set(constructs) - declared - {None}
+        if undeclared: flag("warning", "annotations", "construct", constructs, undeclared, lambda i, v: f"annotation {i + 1} construct '{v}' is not a declared construct")
+        bad_ids = self._invalid("relation", relations, lambda r: self.ONTOLOGY_ID.fullmatch(r) is not None)
+        if bad_ids: flag("warning", "annotations", "relation", relations, bad_ids, lambda i, v: f"annotation {i + 1} relation '{v}' is not an ontology id like BCIO:006075")
+        bad_sources = self._invalid("source", sources, lambda s: self.SOURCE.fullmatch(s) is not None)
+        if bad_sources: flag("warning", "annotations", "source", sources, bad_sources, lambda i, v: f"annotation {i + 1} source '{v}' is not a list of numbers")
+        return relations, values
+
+    def _invalid(self, kind, column, accept):
+        """Distinct values in `column` that fail `accept`; accepted strings are remembered so repeats cost a set difference."""
+        valid, bad = self.valid[kind], set()
+        for value in set(column) - valid:
+            if value is None or value == "": continue
+            if accept(value): valid.add(value)
+            else: bad.add(value)
+        return bad